@@ -38,61 +38,81 @@ else:
         )
 
 
-try:
-    from unittest import IsolatedAsyncioTestCase
-except ImportError:
-    import asyncio
-    from unittest import TestCase
-
-
-    class IsolatedAsyncioTestCase(TestCase):
-
-        def __init__(self, methodName='runTest'):
-            super().__init__(methodName)
-            self._asyncioTestLoop = None
-            self._asyncioCallsQueue = None
-
-        async def _asyncioLoopRunner(self, fut):
-            self._asyncioCallsQueue = queue = asyncio.Queue()
-            fut.set_result(None)
-            while True:
-                query = await queue.get()
-                queue.task_done()
-                assert query is None
-
-        def _setupAsyncioLoop(self):
-            assert self._asyncioTestLoop is None
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            loop.set_debug(True)
-            self._asyncioTestLoop = loop
-            fut = loop.create_future()
-            self._asyncioCallsTask = loop.create_task(self._asyncioLoopRunner(fut))
-            loop.run_until_complete(fut)
-
-        def _tearDownAsyncioLoop(self):
-            assert self._asyncioTestLoop is not None
-            loop = self._asyncioTestLoop
-            self._asyncioTestLoop = None
-            self._asyncioCallsQueue.put_nowait(None)
-            loop.run_until_complete(self._asyncioCallsQueue.join())
-
-            try:
-                # shutdown asyncgens
-                loop.run_until_complete(loop.shutdown_asyncgens())
-            finally:
-                asyncio.set_event_loop(None)
-                loop.close()
-
-        def run(self, result=None):
-            self._setupAsyncioLoop()
-            try:
-                return super().run(result)
-            finally:
-                self._tearDownAsyncioLoop()
-
-
-try:
-    from asyncio import _set_event_loop_policy as set_event_loop_policy
-except ImportError:
-    from asyncio import set_event_loop_policy
+def _asyncio_helpers():
+    # these are only used by the tests and import asyncio, which mock itself
+    # avoids until async mocks are used
+    try:
+        from unittest import IsolatedAsyncioTestCase
+    except ImportError:
+        import asyncio
+        from unittest import TestCase
+
+
+        class IsolatedAsyncioTestCase(TestCase):
+
+            def __init__(self, methodName='runTest'):
+                super().__init__(methodName)
+                self._asyncioTestLoop = None
+                self._asyncioCallsQueue = None
+
+            async def _asyncioLoopRunner(self, fut):
+                self._asyncioCallsQueue = queue = asyncio.Queue()
+                fut.set_result(None)
+                while True:
+                    query = await queue.get()
+                    queue.task_done()
+                    assert query is None
+
+            def _setupAsyncioLoop(self):
+                assert self._asyncioTestLoop is None
+                loop = asyncio.new_event_loop()
+                asyncio.set_event_loop(loop)
+                loop.set_debug(True)
+                self._asyncioTestLoop = loop
+                fut = loop.create_future()
+                self._asyncioCallsTask = loop.create_task(self._asyncioLoopRunner(fut))
+                loop.run_until_complete(fut)
+
+            def _tearDownAsyncioLoop(self):
+                assert self._asyncioTestLoop is not None
+                loop = self._asyncioTestLoop
+                self._asyncioTestLoop = None
+                self._asyncioCallsQueue.put_nowait(None)
+                loop.run_until_complete(self._asyncioCallsQueue.join())
+
+                try:
+                    # shutdown asyncgens
+                    loop.run_until_complete(loop.shutdown_asyncgens())
+                finally:
+                    asyncio.set_event_loop(None)
+                    loop.close()
+
+            def run(self, result=None):
+                self._setupAsyncioLoop()
+                try:
+                    return super().run(result)
+                finally:
+                    self._tearDownAsyncioLoop()
+
+
+    try:
+        from asyncio import _set_event_loop_policy as set_event_loop_policy
+    except ImportError:
+        from asyncio import set_event_loop_policy
+
+    return {
+        'IsolatedAsyncioTestCase': IsolatedAsyncioTestCase,
+        'set_event_loop_policy': set_event_loop_policy,
+    }
+
+
+def __getattr__(name):
+    if name in ('IsolatedAsyncioTestCase', 'set_event_loop_policy'):
+        globals().update(_asyncio_helpers())
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+if sys.version_info[:2] < (3, 7):
+    # modules can't have a __getattr__
+    globals().update(_asyncio_helpers())
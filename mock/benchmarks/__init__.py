@@ -0,0 +1,12 @@
+"""
+Benchmarks for mock.
+
+Each benchmark is run against this package and, where it only uses the API
+the two share, against the `unittest.mock` of the running Python so the
+results can be compared. Run them with::
+
+    python -m mock.benchmarks [--quick] [-k NAME] [--json FILE]
+
+`--json` writes the results, along with the Python and mock versions used,
+in a form suitable for tracking them over time.
+"""
@@ -0,0 +1,7 @@
+import sys
+
+from mock.benchmarks import macro, micro, startup, threads
+from mock.benchmarks.runner import main
+
+
+sys.exit(main())
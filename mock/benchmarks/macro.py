@@ -0,0 +1,125 @@
+"""
+Benchmarks of whole workloads, shaped like the test suites mock is used in.
+"""
+from mock.benchmarks.runner import benchmark
+
+
+class Repository(object):
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def get(self, key):
+        pass
+
+    def save(self, key, value, *, overwrite=False):
+        pass
+
+    def delete(self, key):
+        pass
+
+
+class Service(object):
+
+    def __init__(self, repository, notifier):
+        self.repository = repository
+        self.notifier = notifier
+
+    def rename(self, key, name):
+        item = self.repository.get(key)
+        item['name'] = name
+        self.repository.save(key, item, overwrite=True)
+        self.notifier.send('renamed', key=key, name=name)
+        return item
+
+
+def send_notification(event, **kwargs):
+    pass
+
+
+@benchmark('macro.patch-autospec-suite', macro=True)
+def patch_autospec_suite(mock, quick):
+    """
+    10,000 tests, each patching a function and creating autospecced
+    collaborators, exercising the code under test and asserting on the calls.
+    """
+    patch = mock.patch
+    create_autospec = mock.create_autospec
+    call = mock.call
+    tests = 10 if quick else 10000
+
+    def test(i):
+        with patch('mock.benchmarks.macro.send_notification',
+                   autospec=True) as send:
+            repository = create_autospec(Repository, instance=True)
+            repository.get.return_value = {'name': 'old'}
+            notifier = mock.Mock()
+            notifier.send = send
+            service = Service(repository, notifier)
+            service.rename(i, 'new')
+            repository.get.assert_called_once_with(i)
+            repository.save.assert_called_once_with(
+                i, {'name': 'new'}, overwrite=True)
+            send.assert_called_once_with('renamed', key=i, name='new')
+            repository.assert_has_calls(
+                [call.get(i), call.save(i, {'name': 'new'}, overwrite=True)])
+
+    def run():
+        for i in range(tests):
+            test(i)
+    return run
+
+
+@benchmark('macro.magic-mock-tree', macro=True)
+def magic_mock_tree(mock, quick):
+    """
+    A deep MagicMock standing in for a client library: many attributes are
+    touched once, a few are called repeatedly, then everything is checked.
+    """
+    MagicMock = mock.MagicMock
+    call = mock.call
+    rounds = 1 if quick else 200
+
+    def run():
+        for _ in range(rounds):
+            client = MagicMock()
+            for i in range(20):
+                resource = getattr(client, 'resource%d' % i)
+                for j in range(5):
+                    getattr(resource, 'action%d' % j).return_value = j
+            for i in range(100):
+                client.resource0.action0(i)
+                client.resource1.action1(key=i)
+                with client.session() as session:
+                    session.execute('query', i)
+            client.resource0.action0.assert_called_with(99)
+            client.resource1.action1.assert_any_call(key=50)
+            client.assert_has_calls([call.resource0.action0(0)])
+            client.reset_mock()
+    return run
+
+
+@benchmark('macro.async-suite', macro=True)
+def async_suite(mock, quick):
+    """
+    Tests of async code using AsyncMock collaborators and their magic methods.
+    """
+    import asyncio
+    AsyncMock = mock.AsyncMock
+    MagicMock = mock.MagicMock
+    tests = 10 if quick else 1000
+
+    async def test(i):
+        fetch = AsyncMock(return_value=i)
+        connection = MagicMock()
+        async with connection as conn:
+            await conn.execute(i)
+        assert await fetch(i) == i
+        fetch.assert_awaited_once_with(i)
+        conn.execute.assert_awaited_once_with(i)
+
+    async def suite():
+        for i in range(tests):
+            await test(i)
+
+    return lambda: asyncio.run(suite())
@@ -0,0 +1,456 @@
+"""
+Benchmarks of single operations: creating mocks, getting attributes, calling
+them, asserting on the calls, autospeccing and patching.
+"""
+from mock.benchmarks.runner import benchmark
+
+
+class Target(object):
+    """Something to spec and patch."""
+
+    attribute = None
+
+    def __init__(self, a, b=None):
+        pass
+
+    def method(self, a, b=None, *args, **kwargs):
+        pass
+
+    @classmethod
+    def class_method(cls, a):
+        pass
+
+    @staticmethod
+    def static_method(a):
+        pass
+
+    @property
+    def prop(self):
+        pass
+
+
+def function(a, b, c=None, *, d=None):
+    pass
+
+
+# a class with many methods, like a client for a web API
+BigTarget = type('BigTarget', (object,), {
+    'method%d' % i: lambda self, a, b=None: None for i in range(200)
+})
+
+
+@benchmark('construct.Mock')
+def construct_mock(mock, quick):
+    return mock.Mock
+
+
+@benchmark('construct.NonCallableMock')
+def construct_non_callable(mock, quick):
+    return mock.NonCallableMock
+
+
+@benchmark('construct.MagicMock')
+def construct_magic_mock(mock, quick):
+    return mock.MagicMock
+
+
+@benchmark('construct.AsyncMock')
+def construct_async_mock(mock, quick):
+    return mock.AsyncMock
+
+
+@benchmark('construct.Mock-spec')
+def construct_spec(mock, quick):
+    Mock = mock.Mock
+    return lambda: Mock(spec=BigTarget)
+
+
+@benchmark('construct.MagicMock-spec_set')
+def construct_magic_spec_set(mock, quick):
+    MagicMock = mock.MagicMock
+    return lambda: MagicMock(spec_set=BigTarget)
+
+
+@benchmark('construct.Mock-configure', ops=1)
+def construct_configured(mock, quick):
+    Mock = mock.Mock
+    kwargs = {
+        'method.return_value': 1,
+        'other.side_effect': KeyError,
+        'a.b.c.return_value': 3,
+        'attribute': 4,
+    }
+    return lambda: Mock(**kwargs)
+
+
+@benchmark('attribute.new-child', ops=100)
+def attribute_new(mock, quick):
+    Mock = mock.Mock
+    names = ['attr%d' % i for i in range(100)]
+    def run():
+        m = Mock()
+        for name in names:
+            getattr(m, name)
+    return run
+
+
+@benchmark('attribute.existing-child', ops=100)
+def attribute_existing(mock, quick):
+    m = mock.Mock()
+    m.child
+    def run():
+        for _ in range(100):
+            m.child
+    return run
+
+
+@benchmark('attribute.magic-method', ops=100)
+def attribute_magic(mock, quick):
+    m = mock.MagicMock()
+    def run():
+        for _ in range(100):
+            len(m)
+    return run
+
+
+@benchmark('call.root', ops=100)
+def call_root(mock, quick):
+    m = mock.Mock()
+    def run():
+        for i in range(100):
+            m(i, key=i)
+        m.reset_mock()
+    return run
+
+
+@benchmark('call.record-count', ops=100, stdlib=False)
+def call_record_count(mock, quick):
+    m = mock.Mock(_mock_record='count')
+    def run():
+        for i in range(100):
+            m(i, key=i)
+        m.reset_mock()
+    return run
+
+
+@benchmark('call.record-count-nested', ops=100, stdlib=False)
+def call_record_count_nested(mock, quick):
+    m = mock.Mock(_mock_record='count')
+    method = m.a.b.c.method
+    def run():
+        for i in range(100):
+            method(i, key=i)
+        m.reset_mock()
+    return run
+
+
+@benchmark('call.record-timed', ops=100, stdlib=False)
+def call_record_timed(mock, quick):
+    m = mock.Mock(_mock_record='timed')
+    def run():
+        for i in range(100):
+            m(i, key=i)
+        m.reset_mock()
+    return run
+
+
+@benchmark('call.record-compressed', ops=100, stdlib=False)
+def call_record_compressed(mock, quick):
+    m = mock.Mock(_mock_record='compressed')
+    get = m.cache.get
+    def run():
+        for i in range(100):
+            get('config', default=None)
+        m.reset_mock()
+    return run
+
+
+@benchmark('call.sample-size', ops=100, stdlib=False)
+def call_sample_size(mock, quick):
+    m = mock.Mock(_mock_sample_size=10)
+    def run():
+        for i in range(100):
+            m(i, key=i)
+    return run
+
+
+@benchmark('call.nested', ops=100)
+def call_nested(mock, quick):
+    m = mock.Mock()
+    method = m.a.b.c.method
+    def run():
+        for i in range(100):
+            method(i, key=i)
+        m.reset_mock()
+    return run
+
+
+@benchmark('call.deep', ops=100)
+def call_deep(mock, quick):
+    m = mock.Mock()
+    method = m
+    for i in range(20):
+        method = getattr(method, 'level%d' % i)
+    def run():
+        for i in range(100):
+            method(i, key=i)
+        m.reset_mock()
+    return run
+
+
+@benchmark('call.return_value-chain', ops=100)
+def call_chain(mock, quick):
+    m = mock.Mock()
+    def run():
+        for i in range(100):
+            m.session().query(i).filter(key=i).first()
+        m.reset_mock()
+    return run
+
+
+@benchmark('call.autospec-method', ops=100)
+def call_autospec(mock, quick):
+    m = mock.create_autospec(Target, instance=True)
+    def run():
+        for i in range(100):
+            m.method(i, b=i)
+        m.reset_mock()
+    return run
+
+
+@benchmark('call.async', ops=100)
+def call_async(mock, quick):
+    import asyncio
+    m = mock.AsyncMock()
+    async def calls():
+        for i in range(100):
+            await m(i)
+    def run():
+        asyncio.run(calls())
+        m.reset_mock()
+    return run
+
+
+@benchmark('call.read-wide-tree', ops=100)
+def call_read_wide_tree(mock, quick):
+    # a call then a read of mock_calls, at the top of a tree with many
+    # children already called
+    m = mock.Mock()
+    children = [getattr(m, 'child%d' % i) for i in range(100 if quick else 2000)]
+    for child in children:
+        child()
+    child = children[0]
+    def run():
+        for i in range(100):
+            child(i)
+            m.mock_calls[-1]
+    return run
+
+
+def _history(mock, size):
+    m = mock.Mock()
+    for i in range(size):
+        m.method(i, key=i)
+    return m
+
+
+@benchmark('assert.called_with')
+def assert_called_with(mock, quick):
+    m = _history(mock, 100)
+    return lambda: m.method.assert_called_with(99, key=99)
+
+
+@benchmark('assert.any_call-1k')
+def assert_any_call(mock, quick):
+    m = _history(mock, 1000)
+    return lambda: m.method.assert_any_call(0, key=0)
+
+
+@benchmark('assert.any_call-loop-10k', ops=100)
+def assert_any_call_loop(mock, quick):
+    m = mock.create_autospec(Target, instance=True)
+    size = 10 if quick else 10000
+    for i in range(size):
+        m.method(i, b=i)
+    expected = [i * size // 100 for i in range(100)]
+    def run():
+        for i in expected:
+            m.method.assert_any_call(i, b=i)
+    return run
+
+
+@benchmark('assert.repeated-autospec-10k', ops=50)
+def assert_repeated_autospec(mock, quick):
+    m = mock.create_autospec(Target, instance=True)
+    size = 10 if quick else 10000
+    for i in range(size):
+        m.method(i, b=i)
+    calls = [mock.call.method(i, i) for i in range(size - 10, size)]
+    def run():
+        for _ in range(50):
+            m.assert_has_calls(calls)
+    return run
+
+
+@benchmark('assert.has_calls-1k')
+def assert_has_calls(mock, quick):
+    m = _history(mock, 1000)
+    calls = [mock.call.method(i, key=i) for i in range(900, 910)]
+    return lambda: m.assert_has_calls(calls)
+
+
+@benchmark('assert.has_calls-any_order-1k')
+def assert_has_calls_any_order(mock, quick):
+    m = _history(mock, 1000)
+    calls = [mock.call.method(i, key=i) for i in range(0, 1000, 100)]
+    return lambda: m.assert_has_calls(calls, any_order=True)
+
+
+@benchmark('assert.has_calls-any_order-all-1k')
+def assert_has_calls_any_order_all(mock, quick):
+    size = 100 if quick else 1000
+    m = _history(mock, size)
+    calls = [mock.call.method(i, key=i) for i in reversed(range(size))]
+    return lambda: m.assert_has_calls(calls, any_order=True)
+
+
+@benchmark('assert.has_calls-100k')
+def assert_has_calls_100k(mock, quick):
+    size = 1000 if quick else 100000
+    m = _history(mock, size)
+    calls = [mock.call.method(i, key=i) for i in range(size - 100, size)]
+    return lambda: m.assert_has_calls(calls)
+
+
+@benchmark('contains.calls-100k')
+def contains_calls(mock, quick):
+    size = 1000 if quick else 100000
+    m = _history(mock, size)
+    calls = [mock.call.method(i, key=i) for i in range(size - 100, size)]
+    mock_calls = m.mock_calls
+    return lambda: calls in mock_calls
+
+
+@benchmark('contains.repeated-calls-100k')
+def contains_repeated(mock, quick):
+    size = 100 if quick else 100000
+    m = mock.Mock()
+    for i in range(size):
+        m.poll()
+    m.done()
+    calls = [mock.call.poll()] * 100 + [mock.call.done()]
+    mock_calls = m.mock_calls
+    return lambda: calls in mock_calls
+
+
+@benchmark('eq.mock_calls-100k')
+def eq_mock_calls(mock, quick):
+    size = 1000 if quick else 100000
+    m = _history(mock, size)
+    calls = [mock.call.method(i, key=i) for i in range(size)]
+    mock_calls = m.mock_calls
+    return lambda: mock_calls == calls
+
+
+@benchmark('assert.autospec-called_with')
+def assert_autospec_called_with(mock, quick):
+    m = mock.create_autospec(Target, instance=True)
+    for i in range(100):
+        m.method(i, b=i)
+    return lambda: m.method.assert_called_with(99, 99)
+
+
+@benchmark('call.eq', ops=100)
+def call_eq(mock, quick):
+    call = mock.call
+    one = call.method(1, 2, key='value')
+    other = call.method(1, 2, key='value')
+    def run():
+        for _ in range(100):
+            one == other
+    return run
+
+
+@benchmark('repr.nested')
+def repr_nested(mock, quick):
+    m = mock.Mock(name='client')
+    method = m.session().resource.a.b.c.method
+    return lambda: repr(method)
+
+
+@benchmark('reset_mock.tree')
+def reset_tree(mock, quick):
+    m = mock.MagicMock()
+    for i in range(50):
+        getattr(m, 'a%d' % i).b.c(i)
+    return m.reset_mock
+
+
+@benchmark('autospec.class')
+def autospec_class(mock, quick):
+    create_autospec = mock.create_autospec
+    return lambda: create_autospec(Target)
+
+
+@benchmark('autospec.instance')
+def autospec_instance(mock, quick):
+    create_autospec = mock.create_autospec
+    return lambda: create_autospec(Target, instance=True)
+
+
+@benchmark('autospec.function')
+def autospec_function(mock, quick):
+    create_autospec = mock.create_autospec
+    return lambda: create_autospec(function)
+
+
+@benchmark('autospec.big-class')
+def autospec_big_class(mock, quick):
+    create_autospec = mock.create_autospec
+    return lambda: create_autospec(BigTarget, instance=True)
+
+
+@benchmark('patch.object')
+def patch_object(mock, quick):
+    patch = mock.patch
+    def run():
+        with patch.object(Target, 'attribute'):
+            pass
+    return run
+
+
+@benchmark('patch.string-target')
+def patch_string(mock, quick):
+    patch = mock.patch
+    def run():
+        with patch('mock.benchmarks.micro.function'):
+            pass
+    return run
+
+
+@benchmark('patch.autospec')
+def patch_autospec(mock, quick):
+    patch = mock.patch
+    def run():
+        with patch.object(Target, 'method', autospec=True):
+            pass
+    return run
+
+
+@benchmark('patch.dict')
+def patch_dict(mock, quick):
+    patch = mock.patch
+    values = {'key%d' % i: i for i in range(100)}
+    def run():
+        with patch.dict(values, {'key0': 'new'}):
+            pass
+    return run
+
+
+@benchmark('patch.decorator')
+def patch_decorator(mock, quick):
+    @mock.patch.object(Target, 'attribute')
+    @mock.patch('mock.benchmarks.micro.function')
+    def test(function, attribute):
+        pass
+    return test
@@ -0,0 +1,180 @@
+"""
+Registry of benchmarks and the code that times them.
+
+A benchmark is a function taking the mock module to exercise, either this
+package or `unittest.mock`, and returning the function to time. Anything done
+before returning is setup and isn't timed.
+"""
+import argparse
+import gc
+import json
+import platform
+import statistics
+import sys
+import time
+import timeit
+import unittest.mock
+
+import mock
+
+
+TARGETS = {'mock': mock, 'unittest.mock': unittest.mock}
+
+BENCHMARKS = {}
+
+
+class Benchmark(object):
+
+    def __init__(self, func, name, ops=1, stdlib=True, macro=False):
+        self.func = func
+        self.name = name
+        # operations done by each call to the timed function, so that results
+        # are reported per operation
+        self.ops = ops
+        # whether it only uses API unittest.mock has too
+        self.stdlib = stdlib
+        self.macro = macro
+
+
+    def targets(self, names):
+        return [name for name in names
+                if name == 'mock' or self.stdlib]
+
+
+    def time(self, target, repeat, quick):
+        func = self.func(TARGETS[target], quick)
+        timer = timeit.Timer(func)
+        if self.macro:
+            number = 1
+        elif quick:
+            number = 1
+            timer.timeit(1)
+        else:
+            # aim for runs of at least 0.2s
+            number, _ = timer.autorange()
+        gc.collect()
+        times = [t / number / self.ops
+                 for t in timer.repeat(repeat=repeat, number=number)]
+        return {
+            'name': self.name,
+            'kind': 'macro' if self.macro else 'micro',
+            'target': target,
+            'ops': self.ops,
+            'number': number,
+            'repeat': repeat,
+            'best_ns': min(times) * 1e9,
+            'median_ns': statistics.median(times) * 1e9,
+            'mean_ns': statistics.mean(times) * 1e9,
+        }
+
+
+def benchmark(name, ops=1, stdlib=True, macro=False):
+    """Register the decorated function as the benchmark `name`."""
+    def decorator(func):
+        if name in BENCHMARKS:
+            raise ValueError('duplicate benchmark %r' % name)
+        BENCHMARKS[name] = Benchmark(func, name, ops, stdlib, macro)
+        return func
+    return decorator
+
+
+def select(patterns=()):
+    """Return the benchmarks with a name containing any of `patterns`."""
+    return [bench for name, bench in sorted(BENCHMARKS.items())
+            if not patterns or any(p in name for p in patterns)]
+
+
+def run(benchmarks, targets=tuple(TARGETS), repeat=5, quick=False,
+        report=None):
+    """Time `benchmarks` against each of `targets`, returning the results.
+
+    `report` is called with each result as it becomes available."""
+    results = []
+    for bench in benchmarks:
+        for target in bench.targets(targets):
+            result = bench.time(target, repeat, quick)
+            results.append(result)
+            if report is not None:
+                report(result)
+    return results
+
+
+def metadata(quick=False):
+    return {
+        'python': sys.version,
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'mock_version': mock.__version__,
+        # False on a free-threaded build running without the GIL
+        'gil': getattr(sys, '_is_gil_enabled', lambda: True)(),
+        'timestamp': time.time(),
+        'quick': quick,
+    }
+
+
+def _format_time(ns):
+    for unit, scale in (('s', 1e9), ('ms', 1e6), ('us', 1e3)):
+        if ns >= scale:
+            return '%.3g%s' % (ns / scale, unit)
+    return '%.3gns' % ns
+
+
+def _print_result(result, baseline=None, out=sys.stdout):
+    line = '%-40s %-14s %10s' % (
+        result['name'], result['target'], _format_time(result['best_ns']))
+    if baseline is not None:
+        line += '  x%.2f' % (result['best_ns'] / baseline['best_ns'])
+    print(line, file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m mock.benchmarks',
+        description='Time mock, comparing against unittest.mock.')
+    parser.add_argument(
+        '-k', dest='patterns', action='append', default=[], metavar='NAME',
+        help='only run benchmarks with a name containing NAME')
+    parser.add_argument(
+        '--target', choices=sorted(TARGETS), action='append',
+        help='only run against this module (default: all of them)')
+    parser.add_argument(
+        '--repeat', type=int, default=5,
+        help='times to repeat each measurement (default: 5)')
+    parser.add_argument(
+        '--quick', action='store_true',
+        help='smaller workloads and a single run, to check they work')
+    parser.add_argument(
+        '--json', metavar='FILE',
+        help="write the results as JSON to FILE, or stdout for '-'")
+    parser.add_argument(
+        '--list', action='store_true', help='list the benchmarks and exit')
+    args = parser.parse_args(argv)
+
+    benchmarks = select(args.patterns)
+    if args.list:
+        for bench in benchmarks:
+            print(bench.name)
+        return 0
+
+    repeat = 1 if args.quick else args.repeat
+    out = sys.stderr if args.json == '-' else sys.stdout
+    last = {}
+    def report(result):
+        # compare with the result of unittest.mock for the same benchmark
+        baseline = None
+        if result['target'] == 'mock':
+            baseline = last.get((result['name'], 'unittest.mock'))
+        last[result['name'], result['target']] = result
+        _print_result(result, baseline, out)
+
+    targets = sorted(args.target or TARGETS, reverse=True)
+    results = run(benchmarks, targets, repeat, args.quick, report)
+
+    if args.json:
+        data = {'metadata': metadata(args.quick), 'results': results}
+        if args.json == '-':
+            json.dump(data, sys.stdout, indent=2)
+        else:
+            with open(args.json, 'w') as f:
+                json.dump(data, f, indent=2)
+    return 0
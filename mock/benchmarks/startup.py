@@ -0,0 +1,28 @@
+"""
+Benchmarks of the time taken to import mock in a new interpreter.
+"""
+import os
+import subprocess
+import sys
+
+from mock.benchmarks.runner import benchmark
+
+
+# so that `import mock` picks up this copy of mock
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))))
+
+IMPORTS = 3
+
+
+@benchmark('startup.import', ops=IMPORTS, macro=True)
+def import_mock(mock, quick):
+    """
+    Start Python and import the module, so this includes the time taken for
+    the interpreter to start up.
+    """
+    command = [sys.executable, '-c', 'import ' + mock.__name__]
+    def run():
+        for _ in range(IMPORTS):
+            subprocess.run(command, check=True, cwd=ROOT)
+    return run
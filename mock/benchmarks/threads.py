@@ -0,0 +1,55 @@
+"""
+Benchmarks of mocks used from many threads at once, as in load generators.
+
+They are most telling on a free-threaded build of Python, where the threads
+really run at the same time; the metadata of the results records whether
+the GIL was enabled. With the GIL they show the cost of the locking.
+"""
+import threading
+
+from mock.benchmarks.runner import benchmark
+
+
+THREADS = 8
+
+
+def _in_threads(target, *args):
+    threads = [threading.Thread(target=target, args=(i,) + args)
+               for i in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+@benchmark('threads.call-shared', macro=True)
+def call_shared(mock, quick):
+    """8 threads each making 20,000 calls to one of two mocks in a tree."""
+    calls = 100 if quick else 20000
+    def target(i, client):
+        method = getattr(client, 'method%d' % (i % 2))
+        for j in range(calls):
+            method(j)
+    return lambda: _in_threads(target, mock.Mock())
+
+
+@benchmark('threads.call-separate', macro=True)
+def call_separate(mock, quick):
+    """8 threads each making 20,000 calls to a mock of its own."""
+    calls = 100 if quick else 20000
+    def target(i, mocks):
+        method = mocks[i].method
+        for j in range(calls):
+            method(j)
+    return lambda: _in_threads(
+        target, [mock.Mock() for _ in range(THREADS)])
+
+
+@benchmark('threads.getattr', macro=True)
+def getattr_new(mock, quick):
+    """8 threads each creating 2,000 children of one shared mock."""
+    children = 20 if quick else 2000
+    def target(i, parent):
+        for j in range(children):
+            getattr(parent, 'attr%d_%d' % (i, j))
+    return lambda: _in_threads(target, mock.Mock())
@@ -16,32 +16,41 @@ __all__ = (
     'AsyncMock',
     'ThreadingMock',
     'FILTER_DIR',
+    'SHARE_CLASSES',
     'NonCallableMock',
     'NonCallableMagicMock',
     'mock_open',
     'PropertyMock',
     'seal',
+    'MockTemplate',
+    'timed_calls',
+    'call_intervals',
+    'calls_per_window',
+    'checkpoint',
+    'calls_since',
+    'release_history',
 )
 
 
-import asyncio
+# asyncio, dataclasses, pprint and unittest are comparatively slow to import,
+# so they are only imported once async mocks, dataclass specs or the repr of a
+# call list need them.
 import contextlib
 import io
 import inspect
-import pprint
 import sys
 import threading
+import time
 import builtins
-
-try:
-    from dataclasses import fields, is_dataclass
-    HAS_DATACLASSES = True
-except ImportError:
-    HAS_DATACLASSES = False
-
-from types import CodeType, ModuleType, MethodType
-from unittest.util import safe_repr
-from functools import wraps, partial
+import copy
+import itertools
+import operator
+import weakref
+
+from collections import deque, namedtuple
+from types import CodeType, FunctionType, ModuleType, MethodType
+from bisect import bisect_right
+from functools import lru_cache, wraps, partial
 from threading import RLock
 
 
@@ -49,6 +58,14 @@ from mock import IS_PYPY
 from .backports import iscoroutinefunction
 
 
+def safe_repr(obj):
+    # unittest.util.safe_repr, without importing the rest of unittest
+    try:
+        return repr(obj)
+    except Exception:
+        return object.__repr__(obj)
+
+
 class InvalidSpecError(Exception):
     """Indicates that an invalid value was used as a mock spec."""
 
@@ -57,6 +74,27 @@ _builtins = {name for name in dir(builtins) if not name.startswith('_')}
 
 FILTER_DIR = True
 
+# When True, mocks of the same type share a cached class until one of them
+# needs a class of its own to install a magic method or a signature check on.
+# Anything set directly on `type(mock)` would then be visible on every mock
+# still sharing that class, so the documented `type(mock).attr = PropertyMock()`
+# pattern raises an AttributeError while this is switched on, see
+# _SharedMockClass. It can be switched on here or on the `mock` package, which
+# only has a copy of it.
+SHARE_CLASSES = False
+
+_package = None
+
+def _share_classes():
+    global _package
+    if SHARE_CLASSES:
+        return True
+    if _package is None:
+        # looked up on first use as the package is only loaded once this
+        # module is
+        _package = sys.modules[__name__.rpartition('.')[0]]
+    return _package.SHARE_CLASSES
+
 # Workaround for issue #12370
 # Without this, the __class__ properties wouldn't be set correctly
 _safe_super = super
@@ -98,11 +136,55 @@ def _extract_mock(obj):
         return obj
 
 
+# callables whose __signature__ and __wrapped__ can't be set
+_FixedSignatureTypes = (
+    type(len), type(object.__init__), type(object().__init__),
+    type(str.join),
+)
+
+
+def _signature_sources(func):
+    # the attributes inspect.signature() reads that can be reassigned: the
+    # __signature__ and __wrapped__ of func and of everything it wraps, and
+    # what the signature of a function is made from
+    sources = ()
+    for _ in range(sys.getrecursionlimit()):
+        if type(func) is MethodType:
+            func = func.__func__
+        if type(func) is FunctionType:
+            # the usual case, read without raising AttributeError
+            sources += (func.__code__, func.__defaults__,
+                        func.__kwdefaults__, func.__annotations__)
+            namespace = func.__dict__
+            if not namespace:
+                break
+            signature = namespace.get('__signature__')
+            func = namespace.get('__wrapped__')
+        elif func is None or isinstance(func, _FixedSignatureTypes):
+            break
+        else:
+            signature = getattr(func, '__signature__', None)
+            func = getattr(func, '__wrapped__', None)
+        sources += (signature, func)
+    return sources
+
+
+def _same_sources(first, second):
+    # compared by identity, as the defaults may not compare as a bool
+    return (len(first) == len(second) and
+            all(map(operator.is_, first, second)))
+
+
 def _get_signature_object(func, as_instance, eat_self):
     """
     Given an arbitrary, possibly callable object, try to create a suitable
     signature object.
     Return a (reduced func, signature) tuple, or None.
+
+    Signatures are cached against the reduced func, see
+    `_get_signature_object.cache_info()`, and worked out again when its
+    `__signature__` or `__wrapped__` is reassigned, or the `__code__`,
+    `__defaults__`, `__kwdefaults__` or `__annotations__` of a function.
     """
     if isinstance(func, type) and not as_instance:
         # If it's a type and should be modelled as a type, use __init__.
@@ -122,15 +204,31 @@ def _get_signature_object(func, as_instance, eat_self):
             func = func.__call__
         except AttributeError:
             return None
-    if eat_self:
-        sig_func = partial(func, None)
+
+    # Bound methods are created on each lookup, but their signature only
+    # depends on the function they wrap.
+    if isinstance(func, MethodType):
+        target, key = func.__func__, (True, eat_self)
     else:
-        sig_func = func
-    try:
-        return func, inspect.signature(sig_func)
-    except ValueError:
-        # Certain callable types are not supported by inspect.signature()
+        target, key = func, (False, eat_self)
+    sources = _signature_sources(func)
+    entry = _signature_cache.get(target, key)
+    if entry is not None and _same_sources(entry[0], sources):
+        sig = entry[1]
+    else:
+        if eat_self:
+            sig_func = partial(func, None)
+        else:
+            sig_func = func
+        try:
+            sig = inspect.signature(sig_func)
+        except ValueError:
+            # Certain callable types are not supported by inspect.signature()
+            sig = None
+        _signature_cache.set(target, (sources, sig), key)
+    if sig is None:
         return None
+    return func, sig
 
 
 def _check_signature(func, mock, skipfirst, instance=False):
@@ -141,8 +239,9 @@ def _check_signature(func, mock, skipfirst, instance=False):
     def checksig(_mock_self, *args, **kwargs):
         sig.bind(*args, **kwargs)
     _copy_func_details(func, checksig)
-    type(mock)._mock_check_sig = checksig
-    type(mock).__signature__ = sig
+    klass = _get_own_class(mock)
+    klass._mock_check_sig = checksig
+    klass.__signature__ = sig
 
 
 def _copy_func_details(func, funcopy):
@@ -288,6 +387,7 @@ def _setup_func(funcopy, mock, sig):
 
 
 def _setup_async_mock(mock):
+    import asyncio
     mock._is_coroutine = asyncio.coroutines._is_coroutine
     mock.await_count = 0
     mock.await_args = None
@@ -335,101 +435,1638 @@ class _Sentinel(object):
     def __init__(self):
         self._sentinels = {}
 
-    def __getattr__(self, name):
-        if name == '__bases__':
-            # Without this help(unittest.mock) raises an exception
-            raise AttributeError
-        return self._sentinels.setdefault(name, _SentinelObject(name))
+    def __getattr__(self, name):
+        if name == '__bases__':
+            # Without this help(unittest.mock) raises an exception
+            raise AttributeError
+        return self._sentinels.setdefault(name, _SentinelObject(name))
+
+    def __reduce__(self):
+        return 'sentinel'
+
+
+sentinel = _Sentinel()
+
+DEFAULT = sentinel.DEFAULT
+_missing = sentinel.MISSING
+_deleted = sentinel.DELETED
+
+
+_allowed_names = {
+    'return_value', '_mock_return_value', 'side_effect',
+    '_mock_side_effect', '_mock_parent', '_mock_new_parent',
+    '_mock_name', '_mock_new_name'
+}
+
+
+_lazy_names = set()
+
+
+class _LazyAttribute(object):
+    """
+    Creates the value of an instance attribute on first access and stores it
+    in the instance dict, so that it is only paid for when actually used.
+    Setting or deleting the attribute works as for a plain instance attribute.
+    """
+    def __init__(self, factory):
+        self.factory = factory
+
+    def __set_name__(self, owner, name):
+        self.name = name
+        _lazy_names.add(name)
+
+    def __get__(self, obj, _type=None):
+        if obj is None:
+            raise AttributeError(self.name)
+        value = obj.__dict__[self.name] = self.factory()
+        return value
+
+
+def _delegating_property(name):
+    _allowed_names.add(name)
+    _the_name = '_mock_' + name
+    def _get(self, name=name, _the_name=_the_name):
+        sig = self._mock_delegate
+        if sig is None:
+            return getattr(self, _the_name)
+        return getattr(sig, name)
+    def _set(self, value, name=name, _the_name=_the_name):
+        sig = self._mock_delegate
+        if sig is None:
+            self.__dict__[_the_name] = value
+        else:
+            setattr(sig, name, value)
+
+    return property(_get, _set)
+
+
+
+class _CallList(list):
+
+    def __contains__(self, value):
+        if not isinstance(value, list):
+            return list.__contains__(self, value)
+        len_value = len(value)
+        len_self = list.__len__(self)
+        if len_value > len_self:
+            return False
+        if not len_value:
+            return True
+
+        value = list(value)
+        # comparing in place is linear unless many positions start a partial
+        # match, as in histories of the same few calls over and over
+        found = _find_in_place(self, value, budget=len_self)
+        if found is None:
+            found = _find_by_key(self, value)
+        if found is None:
+            found = _find_in_place(self, value)
+        return found
+
+    def __repr__(self):
+        import pprint
+        return pprint.pformat(list(self))
+
+
+# Each call is recorded once, in the call log of the mock called, along with
+# the lineage of that mock: the mocks above it and the name of the call in
+# their mock_calls and method_calls. Those lists are views that copy calls in
+# from the logs of the mocks below as they are used, so a call to a mock deep
+# in a tree doesn't cost a _Call for every mock above it.
+
+_call_sequence = itertools.count()
+# the sequence number of the last call logged, for checkpoints
+_last_call = None
+
+# changing any of these on a mock invalidates the lineages and dotted names
+# worked out so far for it and the mocks below it
+_lineage_names = frozenset((
+    '_mock_parent', '_mock_new_parent', '_mock_name', '_mock_new_name',
+    '_mock_delegate'
+))
+_lazy_names.update((
+    '_mock_call_log', '_mock_call_lineage', '_mock_calls_since',
+    '_mock_extracted_name', '_mock_signatures', '_mock_matched_calls',
+    '_mock_last_sampled', '_mock_signature_version', '_mock_lineage_version',
+    '_mock_tree_lock'
+))
+
+
+def _lineage_versions(mock):
+    # the lineage version of `mock` and of each mock above it, which only
+    # stay the same while none of them has its parent or name changed
+    versions = []
+    while mock is not None:
+        __dict__ = mock.__dict__
+        versions.append(__dict__.get('_mock_lineage_version', 0))
+        mock = __dict__.get('_mock_new_parent')
+    return tuple(versions)
+
+
+def _lineage_unchanged(mock, versions):
+    # like _lineage_versions(mock) == versions, without building a tuple
+    for version in versions:
+        if mock is None:
+            return False
+        __dict__ = mock.__dict__
+        if __dict__.get('_mock_lineage_version', 0) != version:
+            return False
+        mock = __dict__.get('_mock_new_parent')
+    return mock is None
+
+
+def _signatures_changed(mock):
+    # the signatures a mock looks up by name, and the calls normalized with
+    # them for assertions, come from the mocks below it, so changing the
+    # children or the spec of a mock invalidates its own and those above it
+    while mock is not None:
+        __dict__ = mock.__dict__
+        __dict__['_mock_signature_version'] = (
+            __dict__.get('_mock_signature_version', 0) + 1)
+        mock = __dict__.get('_mock_new_parent')
+
+
+def _tree_root(mock):
+    # the mock at the top of the tree `mock` is in, following the same
+    # _mock_new_parent chain its calls are recorded along
+    while True:
+        parent = mock.__dict__.get('_mock_new_parent')
+        if parent is None:
+            return mock
+        mock = parent
+
+
+def _root_lock(root):
+    lock = root.__dict__.get('_mock_tree_lock')
+    if lock is None:
+        lock = root.__dict__.setdefault('_mock_tree_lock', RLock())
+    return lock
+
+
+class _TreeLock(object):
+    """
+    Holds the lock of the tree `mock` is in while in the with block.
+    Creating children and recording calls only ever touch the tree of the
+    mock involved, so threads using separate trees don't wait on each other.
+
+    A tree is locked at its root. As moving a mock to another tree is done
+    holding the locks of both, see `_TreeLocks`, the root is checked again
+    once its lock is held.
+    """
+    __slots__ = ('mock', 'lock')
+
+    def __init__(self, mock):
+        self.mock = mock
+
+    def __enter__(self):
+        mock = self.mock
+        while True:
+            # _tree_root and _root_lock inlined, as this is taken on each call
+            root = mock
+            while True:
+                parent = root.__dict__.get('_mock_new_parent')
+                if parent is None:
+                    break
+                root = parent
+            lock = root.__dict__.get('_mock_tree_lock')
+            if lock is None:
+                lock = _root_lock(root)
+            lock.acquire()
+            if _tree_root(mock) is root:
+                self.lock = lock
+                return
+            lock.release()
+
+    def __exit__(self, *exc_info):
+        self.lock.release()
+
+
+class _TreeLocks(object):
+    """
+    Holds the locks of the trees each of `mocks` is in while in the with
+    block. They are taken in the order of the ids of the roots of the trees,
+    so that two threads can't each wait for a lock the other holds.
+    """
+    __slots__ = ('mocks', 'locks')
+
+    def __init__(self, *mocks):
+        self.mocks = mocks
+
+    def __enter__(self):
+        mocks = self.mocks
+        while True:
+            roots = {id(root): root for root in map(_tree_root, mocks)}
+            locks = [_root_lock(roots[key]) for key in sorted(roots)]
+            for lock in locks:
+                lock.acquire()
+            if all(id(_tree_root(mock)) in roots for mock in mocks):
+                self.locks = locks
+                return
+            for lock in reversed(locks):
+                lock.release()
+
+    def __exit__(self, *exc_info):
+        for lock in reversed(self.locks):
+            lock.release()
+
+
+class _CallLog(object):
+    """
+    The calls made to a mock, a list per field. With a `maxlen` only that
+    many of the latest calls are kept.
+    """
+    __slots__ = ('seqs', 'lineages', 'args', 'kwargs', 'total')
+
+    def __init__(self, maxlen=None):
+        if maxlen is None:
+            column = list
+        else:
+            column = partial(deque, maxlen=maxlen)
+        self.seqs = column()
+        self.lineages = column()
+        self.args = column()
+        self.kwargs = column()
+        # the calls ever logged, which positions in the log are counted in
+        # so that they stay valid as old calls are dropped
+        self.total = 0
+
+    def append(self, lineage, args, kwargs):
+        global _last_call
+        seq = next(_call_sequence)
+        self.seqs.append(seq)
+        self.lineages.append(lineage)
+        self.args.append(args)
+        self.kwargs.append(kwargs)
+        self.total += 1
+        _last_call = seq
+
+    def first(self):
+        "The position of the oldest call kept."
+        return self.total - len(self.kwargs)
+
+    def after(self, seq):
+        "The position of the first call logged after the call `seq`."
+        return self.first() + bisect_right(self.seqs, seq)
+
+    def columns(self):
+        return self.seqs, self.lineages, self.args, self.kwargs
+
+    def lineages_kept(self):
+        "The distinct lineages of the calls kept."
+        return list({id(lineage): lineage
+                     for lineage in self.lineages}.values())
+
+    def release(self, seq):
+        "Drop the calls logged up to the call `seq`."
+        count = bisect_right(self.seqs, seq)
+        for column in self.columns():
+            if isinstance(column, list):
+                del column[:count]
+            else:
+                for _ in range(count):
+                    column.popleft()
+
+    def entries(self, start):
+        "(seq, lineage, args, kwargs) for each call kept from position `start`."
+        columns = self.seqs, self.lineages, self.args, self.kwargs
+        return self._slice(columns, start)
+
+    def _slice(self, columns, start):
+        start -= self.first()
+        if isinstance(self.seqs, list):
+            return zip(*[column[start:] for column in columns])
+        return itertools.islice(zip(*columns), start, None)
+
+
+class _TimedCallLog(_CallLog):
+    """
+    A call log that also keeps when each call was made, from which thread
+    and from which asyncio task, for mocks created with
+    `_mock_record='timed'`.
+    """
+    __slots__ = ('times', 'threads', 'tasks')
+
+    def __init__(self, maxlen=None):
+        _CallLog.__init__(self, maxlen)
+        if maxlen is None:
+            column = list
+        else:
+            column = partial(deque, maxlen=maxlen)
+        self.times = column()
+        self.threads = column()
+        self.tasks = column()
+
+    def append(self, lineage, args, kwargs):
+        self.times.append(_perf_counter_ns())
+        self.threads.append(threading.get_ident())
+        self.tasks.append(_current_task())
+        _CallLog.append(self, lineage, args, kwargs)
+
+    def columns(self):
+        return _CallLog.columns(self) + (self.times, self.threads, self.tasks)
+
+    def timed_entries(self, start):
+        "(seq, args, kwargs, time, thread, task) for each call from `start`."
+        columns = (self.seqs, self.args, self.kwargs,
+                   self.times, self.threads, self.tasks)
+        return self._slice(columns, start)
+
+
+# the types whose equal values can't be told apart, so that calls passing
+# equal ones can share them
+_interned_types = frozenset((str, bytes, int, bool, type(None)))
+
+# the distinct arguments a compressed call log shares at most
+_MAX_INTERNED = 1024
+
+
+class _CompressedCallLog(_CallLog):
+    """
+    A call log for mocks created with `_mock_record='compressed'`, made of
+    runs of calls with the same arguments logged one after the other, so that
+    a mock called many times with the same arguments only logs them once.
+    Equal arguments are also shared between runs.
+
+    The runs have the sequence number of their first call, the following
+    calls having the next ones, and their position in the log.
+    """
+    __slots__ = ('counts', 'starts', 'interned')
+
+    def __init__(self):
+        _CallLog.__init__(self)
+        self.counts = []
+        self.starts = []
+        self.interned = {}
+
+    def append(self, lineage, args, kwargs):
+        global _last_call
+        seq = next(_call_sequence)
+        args, kwargs = self._intern(args, kwargs)
+        counts = self.counts
+        if (counts and self.args[-1] is args and self.kwargs[-1] is kwargs
+                and self.lineages[-1] is lineage
+                and self.seqs[-1] + counts[-1] == seq):
+            counts[-1] += 1
+        else:
+            self.seqs.append(seq)
+            self.lineages.append(lineage)
+            self.args.append(args)
+            self.kwargs.append(kwargs)
+            counts.append(1)
+            self.starts.append(self.total)
+        self.total += 1
+        _last_call = seq
+
+    def _intern(self, args, kwargs):
+        key = (
+            tuple([(type(value), value) if type(value) in _interned_types
+                   else id(value) for value in args]),
+            tuple([(name, type(value), value)
+                   if type(value) in _interned_types
+                   else (name, id(value)) for name, value in kwargs.items()]),
+        )
+        interned = self.interned
+        found = interned.get(key)
+        if found is not None:
+            return found
+        if len(interned) < _MAX_INTERNED:
+            # holding on to the arguments keeps the ids in the key unique
+            interned[key] = args, kwargs
+        return args, kwargs
+
+    def first(self):
+        if self.starts:
+            return self.starts[0]
+        return self.total
+
+    def columns(self):
+        return _CallLog.columns(self) + (self.counts, self.starts)
+
+    def release(self, seq):
+        # runs are kept whole, so calls up to `seq` can be left in the first
+        run = bisect_right(self.seqs, seq) - 1
+        if run >= 0 and self.seqs[run] + self.counts[run] - 1 > seq:
+            run -= 1
+        for column in self.columns():
+            del column[:run + 1]
+        # the arguments the runs dropped had may be the only ones left
+        self.interned.clear()
+
+    def after(self, seq):
+        run = bisect_right(self.seqs, seq) - 1
+        if run < 0:
+            return self.first()
+        return self.starts[run] + min(self.counts[run], seq - self.seqs[run] + 1)
+
+    def entries(self, start):
+        run = max(bisect_right(self.starts, start) - 1, 0)
+        for seq, lineage, args, kwargs, count, first in zip(
+                self.seqs[run:], self.lineages[run:], self.args[run:],
+                self.kwargs[run:], self.counts[run:], self.starts[run:]):
+            for offset in range(max(start - first, 0), count):
+                yield seq + offset, lineage, args, kwargs
+
+
+try:
+    _perf_counter_ns = time.perf_counter_ns
+except AttributeError:
+    # Py 3.6:
+    def _perf_counter_ns():
+        return int(time.perf_counter() * 1e9)
+
+
+def _current_task():
+    # asyncio is only imported by async code, so if it isn't imported yet
+    # there can't be a task running
+    asyncio = sys.modules.get('asyncio')
+    if asyncio is None:
+        return None
+    loop = asyncio._get_running_loop()
+    if loop is None:
+        # no event loop running in this thread
+        return None
+    try:
+        return asyncio.current_task(loop)
+    except AttributeError:
+        # Py 3.6:
+        return asyncio.Task.current_task(loop)
+
+
+class _CallLineage(object):
+    """
+    The mocks a call to `mock` is recorded by, each with the name of the call
+    in its mock_calls and method_calls, or None where it isn't recorded.
+    """
+    __slots__ = ('versions', 'names', 'eager')
+
+    def __init__(self, mock):
+        self.versions = _lineage_versions(mock)
+        # id of each mock: (mock, mock_calls name, method_calls name), holding
+        # on to the mock so that its id stays unique
+        self.names = {}
+        # mocks delegating mock_calls to an autospecced function, which are
+        # appended to as calls are made, and only listed in names for
+        # calls_since
+        self.eager = ()
+
+        # method_calls follow the _mock_parent chain, mock_calls the
+        # _mock_new_parent one
+        self._add(mock, '', None)
+        do_method_calls = mock._mock_parent is not None
+        method_call_name = mock._mock_name
+        mock_call_name = mock._mock_new_name
+        is_a_call = mock_call_name == '()'
+
+        _new_parent = mock._mock_new_parent
+        while _new_parent is not None:
+            if do_method_calls:
+                self._add(_new_parent, mock_call_name, method_call_name)
+                do_method_calls = _new_parent._mock_parent is not None
+                if do_method_calls:
+                    method_call_name = (_new_parent._mock_name + '.' +
+                                        method_call_name)
+            else:
+                self._add(_new_parent, mock_call_name, None)
+
+            if _new_parent._mock_new_name:
+                if is_a_call:
+                    dot = ''
+                else:
+                    dot = '.'
+                is_a_call = _new_parent._mock_new_name == '()'
+                mock_call_name = _new_parent._mock_new_name + dot + mock_call_name
+
+            _new_parent = _new_parent._mock_new_parent
+
+        for parent, _, _ in self.names.values():
+            parent._mock_call_sources[id(mock)] = mock
+
+    def _add(self, parent, mock_call_name, method_call_name):
+        if parent._mock_delegate is not None:
+            self.eager += ((parent, mock_call_name),)
+        self.names[id(parent)] = (parent, mock_call_name, method_call_name)
+
+
+class _CallView(_CallList):
+    """
+    The call_args_list (kind 0), mock_calls (kind 1) or method_calls (kind 2)
+    of a mock, filled from the call logs of the mock and the mocks below it
+    when first handed out, and added to as calls are made from then on.
+    Once replaced on the mock it stops being updated, like a plain list
+    would.
+    """
+    __slots__ = (
+        '_mock', '_kind', '_since', '_stale', '_cursors', '_evicted', '_index',
+        '_matched', '_sampled'
+    )
+
+    def __init__(self, mock, kind, calls=(), since=None):
+        _CallList.__init__(self, calls)
+        self._mock = mock
+        self._kind = kind
+        # the sequence number of the last call before the view was created
+        self._since = since
+        # whether calls may have been logged that the view wasn't told about,
+        # which is only the case until it is first read: calls made from then
+        # on are pushed to it
+        self._stale = True
+        # how far into the log of each mock below the view is up to date
+        self._cursors = {}
+        # calls dropped because of _mock_max_calls
+        self._evicted = 0
+        # [calls normalized or None for the view itself, {key: position},
+        # calls indexed] for assert_any_call
+        self._index = None
+        # [mock, version, calls normalized or None if all the same, count]
+        self._matched = None
+        # why calls are missing, if calls to a mock below were only sampled
+        self._sampled = None
+
+    def _update(self):
+        mock = self._mock
+        if not self._stale or mock is None:
+            return
+        with _TreeLock(mock):
+            if self._stale:
+                self._add_new_calls(mock)
+                self._stale = False
+
+    def _add_new_calls(self, mock, sources=None):
+        """
+        Copy in the calls logged by the mocks in `sources`, by default all
+        those the view gets calls from, since the view last did.
+        """
+        __dict__ = mock.__dict__
+        kind = self._kind
+        if sources is not None:
+            pass
+        elif kind:
+            sources = __dict__.get('_mock_call_sources')
+        elif '_mock_call_log' in __dict__:
+            sources = {id(mock): mock}
+        if not sources:
+            return
+
+        key = id(mock)
+        cursors = self._cursors
+        new = []
+        compressed = False
+        for source_key, source in list(sources.items()):
+            source_dict = source.__dict__
+            if source_dict.get('_mock_sample') is not None:
+                self._check_sampled(source, key, kind)
+            log = source_dict.get('_mock_call_log')
+            if log is None:
+                # a sampled mock that didn't keep any of its calls
+                continue
+            start = cursors.get(source_key)
+            if start is None:
+                start = 0
+                if self._since is not None:
+                    start = log.after(self._since)
+            if start == log.total:
+                continue
+            first = log.first()
+            if start < first:
+                self._evicted += first - start
+                start = first
+            cursors[source_key] = log.total
+            entries = list(log.entries(start))
+            if isinstance(log, _CompressedCallLog):
+                compressed = True
+            for seq, lineage, args, kwargs in entries:
+                names = lineage.names.get(key)
+                if names is not None and names[kind] is not None:
+                    new.append((seq, names[kind], args, kwargs))
+        # sequence numbers are unique, so only they are compared
+        new.sort()
+        if compressed:
+            # calls with the same arguments share them, and so their calls
+            shared = {}
+            calls = []
+            for _, name, args, kwargs in new:
+                # for call_args_list the name is the mock itself
+                ids = name if kind else None, id(args), id(kwargs)
+                recorded = shared.get(ids)
+                if recorded is None:
+                    if kind:
+                        recorded = _recorded_call((name, args, kwargs))
+                    else:
+                        recorded = _recorded_call((args, kwargs))
+                    shared[ids] = recorded
+                calls.append(recorded)
+        elif kind:
+            calls = [_recorded_call((name, args, kwargs))
+                     for _, name, args, kwargs in new]
+        else:
+            calls = [_recorded_call((args, kwargs))
+                     for _, _, args, kwargs in new]
+        self._extend(calls)
+
+    def _extend(self, calls):
+        list.extend(self, calls)
+        maxlen = self._mock._mock_max_calls
+        if maxlen is not None:
+            excess = list.__len__(self) - maxlen
+            if excess > 0:
+                list.__delitem__(self, slice(0, excess))
+                self._evicted += excess
+                self._index = self._matched = None
+
+    def _push(self, source, log, name, args, kwargs):
+        """
+        Add the call to `source` just logged in `log` under `name`, so that
+        the view stays current without going through the logs of every mock
+        below when read. Called with the lock of the tree held.
+        """
+        mock = self._mock
+        if mock is None or self._stale:
+            # the call is copied in with the others when the view is read
+            return
+        key = id(source)
+        total = log.total
+        if self._cursors.get(key) != total - 1:
+            # behind on that log, or never read it
+            self._add_new_calls(mock, {key: source})
+            return
+        self._cursors[key] = total
+        length = list.__len__(self)
+        if length:
+            # calls with the same arguments share them, as in compressed logs
+            last = list.__getitem__(self, length - 1)
+            if (type(last) is _Call and
+                    last[-2] is args and last[-1] is kwargs and
+                    (name is None or last[0] == name)):
+                self._extend((last,))
+                return
+        if name is None:
+            self._extend((_recorded_call((args, kwargs)),))
+        else:
+            self._extend((_recorded_call((name, args, kwargs)),))
+
+    def _check_sampled(self, source, key, kind):
+        # calls left out of a sample aren't logged, so the view can't have
+        # them
+        source_dict = source.__dict__
+        seq = source_dict.get('_mock_last_sampled')
+        if self._sampled is not None or seq is None:
+            return
+        if self._since is not None and seq <= self._since:
+            return
+        names = source_dict['_mock_call_lineage'].names.get(key)
+        if names is None or names[kind] is None:
+            return
+        self._sampled = (
+            f"the calls to {source._extract_mock_name()} are only sampled "
+            f"({_sample_policy(source_dict['_mock_sample'])})"
+        )
+
+    def _check_complete(self):
+        # the calls kept can be read, but not checked for their order
+        self._update()
+        if self._sampled is not None:
+            raise AssertionError(
+                f"Can't check the order of the "
+                f"{('mock_calls', 'method_calls')[self._kind - 1]} of "
+                f"{self._mock._extract_mock_name()}, {self._sampled}.")
+
+    def _matched_calls(self, mock):
+        """
+        Return what the `_call_matcher` of `mock` makes of each call in the
+        view, working it out only for the calls added since last time. That
+        is the view itself while no signature applies to any of them.
+        """
+        self._update()
+        version = mock.__dict__.get('_mock_signature_version', 0)
+        with _TreeLock(mock):
+            cached = self._matched
+            if (cached is None or cached[0] is not mock or
+                    cached[1] != version):
+                cached = self._matched = [mock, version, None, 0]
+            _, _, matched, count = cached
+            length = list.__len__(self)
+            if count < length:
+                calls = list.__getitem__(self, slice(count, length))
+                matcher = mock._call_matcher
+                new = [matcher(c) for c in calls]
+                if matched is None and not all(map(operator.is_, new, calls)):
+                    matched = cached[2] = list.__getitem__(
+                        self, slice(0, count))
+                if matched is not None:
+                    matched.extend(new)
+                cached[3] = length
+        if matched is None:
+            # without signatures the calls are their own keys
+            return self
+        return matched
+
+    def _find(self, expected, matched):
+        """
+        Return whether a call matching `expected`, as returned by
+        `_call_matcher`, is in `matched`, the calls of the view as returned by
+        `_matched_calls`, looking it up in an index of them kept up to date as
+        it is used. False means it may or may not be there: calls with
+        arguments that have no `_value_key`, such as ANY and mocks, aren't
+        indexed, and of calls whose arguments hash the same only the last one
+        is.
+        """
+        key = _call_key(expected)
+        if key is None:
+            return False
+        # `matched` may be the view itself
+        get = list.__getitem__
+        length = list.__len__(matched)
+        # the calls normalized again start a new index
+        source = None if matched is self else matched
+        index = self._index
+        if index is None or index[0] is not source or index[2] > length:
+            index = self._index = [source, {}, 0]
+        _, positions, indexed = index
+        for position in range(indexed, length):
+            call_key = _call_key(get(matched, position))
+            if call_key is not None:
+                positions[call_key] = position
+        index[2] = length
+
+        position = positions.get(key)
+        if position is None:
+            return False
+        return expected in _AnyComparer([get(matched, position)])
+
+    def _detach(self):
+        self._update()
+        self._mock = self._matched = None
+
+    def __reduce__(self):
+        # copies and pickles are plain lists of the calls
+        return (_CallList, (list(self),))
+
+
+def _updating(name, changes=False):
+    method = getattr(_CallList, name)
+    def updated(self, *args, **kwargs):
+        self._update()
+        if args and isinstance(args[0], _CallView):
+            # list methods read the other list directly
+            args[0]._update()
+        if changes:
+            self._index = self._matched = None
+        return method(self, *args, **kwargs)
+    updated.__name__ = name
+    return updated
+
+
+for _name in (
+    '__len__', '__iter__', '__reversed__', '__getitem__', '__contains__',
+    '__eq__', '__ne__', '__lt__', '__le__', '__gt__', '__ge__', '__add__',
+    '__mul__', '__rmul__', 'index', 'count', 'copy',
+):
+    setattr(_CallView, _name, _updating(_name))
+for _name in (
+    '__setitem__', '__delitem__', '__iadd__', '__imul__', 'append', 'extend',
+    'insert', 'pop', 'remove', 'clear', 'reverse', 'sort',
+):
+    setattr(_CallView, _name, _updating(_name, changes=True))
+del _name
+
+
+def _find_in_place(calls, value, budget=None):
+    """
+    Return whether the calls in the list `value` appear one after the other
+    in `calls`, or None if that takes more than `budget` comparisons past the
+    first call of `value`. The calls made are on the left of the comparisons,
+    as when comparing lists, so that ANY in either list matches anything.
+    """
+    get = list.__getitem__
+    first = value[0]
+    rest = range(1, len(value))
+    for i in range(list.__len__(calls) - len(value) + 1):
+        actual = get(calls, i)
+        if actual is not first and not actual == first:
+            continue
+        for j in rest:
+            actual = get(calls, i + j)
+            expected = value[j]
+            if actual is not expected and not actual == expected:
+                break
+        else:
+            return True
+        if budget is not None:
+            budget -= j
+            if budget < 0:
+                return None
+    return False
+
+
+def _find_by_key(calls, value):
+    """
+    Like `_find_in_place`, in linear time by first finding where the hashes
+    of the arguments of the calls line up, with Knuth-Morris-Pratt, then
+    comparing the calls there. Returns None if any of the calls isn't a
+    `_Call` with arguments that all have a `_value_key`, as with ANY, so
+    that they are compared with every call.
+    """
+    get = list.__getitem__
+    named = _names_hashable(list.__iter__(calls))
+
+    keys = []
+    for expected in value:
+        key = None
+        if isinstance(expected, _Call):
+            key = _call_key(expected, named)
+        if key is None:
+            return None
+        keys.append(key)
+    # the length of the longest proper prefix of keys[:i + 1] that is also
+    # a suffix of it
+    borders = [0] * len(keys)
+    border = 0
+    for i in range(1, len(keys)):
+        while border and keys[i] != keys[border]:
+            border = borders[border - 1]
+        if keys[i] == keys[border]:
+            border += 1
+        borders[i] = border
+
+    matched = 0
+    last = len(keys)
+    for i in range(list.__len__(calls)):
+        actual = get(calls, i)
+        key = _call_key(actual, named) if isinstance(actual, _Call) else None
+        if key is None:
+            return None
+        while matched and key != keys[matched]:
+            matched = borders[matched - 1]
+        if key == keys[matched]:
+            matched += 1
+        if matched == last:
+            start = i - last + 1
+            if all(get(calls, start + j) is expected or
+                   get(calls, start + j) == expected
+                   for j, expected in enumerate(value)):
+                return True
+            matched = borders[matched - 1]
+    return False
+
+
+def _names_hashable(calls):
+    # a call made with a name only matches calls with the same name, so the
+    # names can be part of their keys unless some calls made have none
+    return all(isinstance(actual, _Call) and len(actual) == 3 and actual[0]
+               for actual in calls)
+
+
+def _match_any_order(calls, expected):
+    """
+    Match each of the `expected` calls in turn with the first call left in
+    `calls` it is equal to, as removing them one after the other with
+    `list.remove` does, returning the expected calls left unmatched and the
+    calls not matched with any, in order.
+
+    The calls are bucketed by `_call_key`, so that expected calls that can
+    be hashed only look at the calls with the same key and those, such as
+    calls holding ANY, that have none. The others look at every call. If
+    any call has arguments such as mocks or other objects with their own
+    `__eq__`, whose equality can't be worked out ahead of it, `list.remove`
+    is used as it is.
+    """
+    named = _names_hashable(calls)
+    buckets = {}
+    loose = []
+    for index, actual in enumerate(calls):
+        key = _call_key(actual, named) if isinstance(actual, _Call) else None
+        if key is None:
+            if _compared_opaquely(actual):
+                return _remove_any_order(calls, expected)
+            loose.append(index)
+        else:
+            buckets.setdefault(key, []).append(index)
+    keys = []
+    for kall in expected:
+        key = _call_key(kall, named) if isinstance(kall, _Call) else None
+        if key is None and _compared_opaquely(kall):
+            return _remove_any_order(calls, expected)
+        keys.append(key)
+
+    everything = range(len(calls))
+    taken = bytearray(len(calls))
+    # where the calls not taken yet start in each list of them, so that
+    # matching the same call many times doesn't go over the taken ones again
+    starts = {}
+
+    def left(indexes):
+        start = starts.get(id(indexes), 0)
+        while start < len(indexes) and taken[indexes[start]]:
+            start += 1
+        starts[id(indexes)] = start
+        return itertools.islice(indexes, start, None)
+
+    not_found = []
+    for key, kall in zip(keys, expected):
+        if key is None:
+            options = left(everything)
+        elif loose:
+            from heapq import merge
+            options = merge(left(buckets.get(key, ())), left(loose))
+        else:
+            options = left(buckets.get(key, ()))
+        for index in options:
+            if taken[index]:
+                continue
+            # the call made on the left, as in list.remove
+            actual = calls[index]
+            if actual is kall or actual == kall:
+                taken[index] = 1
+                break
+        else:
+            not_found.append(kall)
+
+    unmatched = [actual for index, actual in enumerate(calls)
+                 if not taken[index]]
+    return not_found, unmatched
+
+
+def _remove_any_order(calls, expected):
+    unmatched = list(calls)
+    not_found = []
+    for kall in expected:
+        try:
+            unmatched.remove(kall)
+        except ValueError:
+            not_found.append(kall)
+    return not_found, unmatched
+
+
+def _call_key(_call, named=False):
+    # a hash of the arguments of a call as returned by _call_matcher, and of
+    # its name if `named`, or None if not all of them have a _value_key
+    if not isinstance(_call, tuple):
+        # the exception raised binding the arguments
+        return None
+    args, kwargs = _call[-2:]
+    try:
+        # calls bound to a signature are call(name, args, kwargs)
+        if _value_types.issuperset(map(type, args)):
+            key = args
+        else:
+            key = tuple([_value_key(arg) for arg in args])
+        if kwargs:
+            if _value_types.issuperset(map(type, kwargs.values())):
+                items = kwargs.items()
+            else:
+                items = [(name, _value_key(value))
+                         for name, value in kwargs.items()]
+            key = key, tuple(sorted(items))
+        if named:
+            return hash((_call[0] if len(_call) == 3 else '', key))
+        return hash(key)
+    except TypeError:
+        return None
+
+
+# types only equal to values with the same hash, whatever they are compared to
+_value_types = frozenset((int, float, complex, str, bytes, bool, type(None)))
+
+
+def _value_key(value):
+    """
+    Return a hashable key for `value`, the same for all the values equal to
+    it, or raise TypeError if there may not be one. Mocks are never hashed,
+    as hashing a MagicMock is recorded as a call to it, and nor are objects
+    with their own `__eq__`, which may be equal to anything, like matchers.
+    """
+    _type = type(value)
+    if _type in _value_types:
+        return value
+    if _type is tuple:
+        return tuple([_value_key(item) for item in value])
+    if _type is list:
+        return list, tuple([_value_key(item) for item in value])
+    if _type is dict:
+        return dict, tuple(sorted([(_value_key(k), _value_key(v))
+                                   for k, v in value.items()]))
+    if (_type.__eq__ is object.__eq__ and _type.__hash__ is object.__hash__
+            and not _is_instance_mock(value)):
+        # only equal to itself
+        return value
+    raise TypeError(f'no key for {_type.__name__}')
+
+
+def _compared_opaquely(_call):
+    # whether a call, as returned by _call_matcher, may be equal to calls
+    # with different keys for reasons other than ANY in its arguments
+    if not isinstance(_call, _Call):
+        return True
+    args, kwargs = _call[-2:]
+    return (any(map(_opaque, args)) or
+            any(map(_opaque, kwargs.values())))
+
+
+def _opaque(value):
+    _type = type(value)
+    if _type in _value_types or value is ANY:
+        return False
+    if _type is tuple or _type is list:
+        return any(map(_opaque, value))
+    if _type is dict:
+        return any(map(_opaque, value)) or any(map(_opaque, value.values()))
+    return _type.__eq__ is not object.__eq__ or _is_instance_mock(value)
+
+
+class _BoundedCallList(_CallList):
+    """A call list that drops its oldest call to stay at `maxlen` calls."""
+
+    def __init__(self, maxlen):
+        _CallList.__init__(self)
+        self.maxlen = maxlen
+        self._evicted = 0
+
+    def append(self, value):
+        _CallList.append(self, value)
+        if len(self) > self.maxlen:
+            del self[0]
+            self._evicted += 1
+
+
+class _SampledCallList(_CallList):
+    """
+    A call list keeping a sample of the calls appended to it, in the order
+    they were made: every `every`th call, of which the last `maxlen` if
+    given, or a uniformly random sample of `size` calls. `total` is the
+    number of calls appended, kept or not, and `append` returns whether the
+    call was kept.
+    """
+
+    def __init__(self, every=None, size=None, maxlen=None):
+        _CallList.__init__(self)
+        self.every = every
+        self.size = size
+        self.maxlen = maxlen
+        self.total = 0
+        if size is not None:
+            import random
+            self._randrange = random.randrange
+
+    @property
+    def policy(self):
+        return self.every, self.size
+
+    def append(self, value):
+        total = self.total
+        self.total = total + 1
+        size = self.size
+        if size is None:
+            if total % self.every:
+                return False
+            _CallList.append(self, value)
+            if self.maxlen is not None and len(self) > self.maxlen:
+                del self[0]
+        elif total < size:
+            _CallList.append(self, value)
+        else:
+            # reservoir sampling: the call replaces a random one of those
+            # kept with probability size / calls so far
+            index = self._randrange(total + 1)
+            if index >= size:
+                return False
+            del self[index]
+            _CallList.append(self, value)
+        return True
+
+    def extend(self, values):
+        for value in values:
+            self.append(value)
+
+
+def _check_sample(every, size, max_calls, record):
+    if every is not None and size is not None:
+        raise ValueError(
+            "only one of _mock_sample_every and _mock_sample_size can be given")
+    if size is None and every < 1:
+        raise ValueError(f'_mock_sample_every must be at least 1, got {every}')
+    if every is None and size < 1:
+        raise ValueError(f'_mock_sample_size must be at least 1, got {size}')
+    if record != 'all':
+        raise ValueError(
+            f"calls can't be sampled with _mock_record={record!r}")
+    if size is not None and max_calls is not None:
+        raise ValueError(
+            "_mock_max_calls can't be combined with _mock_sample_size")
+    return every, size
+
+
+def _sample_policy(sample):
+    every, size = sample
+    if size is None:
+        return f'_mock_sample_every={every}'
+    return f'_mock_sample_size={size}'
+
+
+def _sample_list(mock):
+    every, size = mock._mock_sample
+    return _SampledCallList(every, size, mock._mock_max_calls)
+
+
+def _call_view_property(name, kind, delegate):
+    _allowed_names.add(name)
+    _the_name = '_mock_' + name
+    # recreated on first use
+    _lazy_names.add(_the_name)
+    def _get(self):
+        if delegate:
+            sig = self._mock_delegate
+            if sig is not None:
+                return getattr(sig, name)
+        __dict__ = self.__dict__
+        view = __dict__.get(_the_name)
+        if view is None:
+            if not kind and self._mock_sample is not None:
+                view = __dict__[_the_name] = _sample_list(self)
+            else:
+                view = __dict__[_the_name] = _CallView(
+                    self, kind, since=__dict__.get('_mock_calls_since'))
+        if isinstance(view, _CallView):
+            # from then on it is kept current as calls are made
+            view._update()
+        return view
+    def _set(self, value):
+        if delegate:
+            sig = self._mock_delegate
+            if sig is not None:
+                setattr(sig, name, value)
+                return
+        __dict__ = self.__dict__
+        if value is __dict__.get(_the_name):
+            # as after +=
+            return
+        _detach_call_view(self, _the_name)
+        if not kind and self._mock_sample is not None:
+            calls = __dict__[_the_name] = _sample_list(self)
+            calls.extend(value)
+            return
+        # calls logged before now aren't part of the new list
+        __dict__[_the_name] = _CallView(self, kind, value, since=_last_call)
+
+    return property(_get, _set)
+
+
+def _detach_call_view(mock, name):
+    view = mock.__dict__.pop(name, None)
+    if isinstance(view, _CallView):
+        view._detach()
+
+
+def _push_call(mock, lineage, log, args, kwargs):
+    """
+    Add the call to `mock` just logged in `log` to the views of it and the
+    mocks above it that have been handed out already. Mocks whose views were
+    never read don't have any, so their calls are only logged.
+    """
+    view = mock.__dict__.get('_mock_call_args_list')
+    if isinstance(view, _CallView):
+        view._push(mock, log, None, args, kwargs)
+    for parent, mock_call_name, method_call_name in lineage.names.values():
+        __dict__ = parent.__dict__
+        if mock_call_name is not None:
+            view = __dict__.get('_mock_mock_calls')
+            if isinstance(view, _CallView):
+                view._push(mock, log, mock_call_name, args, kwargs)
+        if method_call_name is not None:
+            view = __dict__.get('_mock_method_calls')
+            if isinstance(view, _CallView):
+                view._push(mock, log, method_call_name, args, kwargs)
+
+
+def _push_sampled(mock, lineage):
+    """
+    Tell the views of the mocks above `mock` that have been handed out
+    already that a call to it was left out of its sample, so they can't
+    hold it.
+    """
+    for parent, _, _ in lineage.names.values():
+        __dict__ = parent.__dict__
+        for name, kind in (('_mock_mock_calls', 1), ('_mock_method_calls', 2)):
+            view = __dict__.get(name)
+            if isinstance(view, _CallView) and not view._stale:
+                view._check_sampled(mock, id(parent), kind)
+
+
+def _update_other_views(log, skip):
+    """
+    Bring the mock_calls and method_calls of the mocks recording the calls in
+    `log`, other than those with an id in `skip`, up to date with it, so that
+    they keep the calls once they are dropped from the log.
+    """
+    for lineage in log.lineages_kept():
+        for parent, mock_call_name, method_call_name in lineage.names.values():
+            if id(parent) in skip:
+                continue
+            if mock_call_name is not None:
+                view = parent.mock_calls
+                if isinstance(view, _CallView):
+                    view._update()
+            if method_call_name is not None:
+                view = parent.method_calls
+                if isinstance(view, _CallView):
+                    view._update()
+
+
+
+def _check_and_set_parent(parent, value, name, new_name):
+    value = _extract_mock(value)
+
+    if not _is_instance_mock(value):
+        return False
+    # checked and set with both trees locked, so that two threads can't each
+    # make a mock the parent of the other
+    with _TreeLocks(parent, value):
+        if ((value._mock_name or value._mock_new_name) or
+            (value._mock_parent is not None) or
+            (value._mock_new_parent is not None)):
+            return False
+
+        _parent = parent
+        while _parent is not None:
+            # setting a mock (value) as a child or return value of itself
+            # should not modify the mock
+            if _parent is value:
+                return False
+            _parent = _parent._mock_new_parent
+
+        if new_name:
+            value._mock_new_parent = parent
+            value._mock_new_name = new_name
+        if name:
+            value._mock_parent = parent
+            value._mock_name = name
+    return True
+
+# Internal class to identify if we wrapped an iterator object or not.
+class _MockIter(object):
+    def __init__(self, obj):
+        self.obj = iter(obj)
+    def __next__(self):
+        return next(self.obj)
+
+# __class__ is a property on mocks, so go through object's own descriptor
+_set_class = object.__dict__['__class__'].__set__
+
+
+class _SharedMockClass(type):
+    """The type of classes shared by mocks while SHARE_CLASSES is on.
+
+    Setting an attribute on `type(mock)`, as done to attach a PropertyMock,
+    would set it on every mock sharing the class, so it is refused."""
+
+    def __setattr__(cls, name, value):
+        if (cls.__dict__.get('_mock_shared_class') and
+                not name.startswith('_mock_')):
+            raise AttributeError(
+                f'Cannot set {name!r} on the class of a mock while '
+                f'mock.SHARE_CLASSES is on, as the class is shared with '
+                f'other mocks. Switch SHARE_CLASSES off to set attributes '
+                f'on type(mock).')
+        type.__setattr__(cls, name, value)
+
+    def __delattr__(cls, name):
+        if (cls.__dict__.get('_mock_shared_class') and
+                not name.startswith('_mock_')):
+            raise AttributeError(
+                f'Cannot delete {name!r} from the class of a mock while '
+                f'mock.SHARE_CLASSES is on, as the class is shared with '
+                f'other mocks.')
+        type.__delattr__(cls, name)
+
+
+def _new_mock_class(bases, shared=False, magics=None):
+    klass = bases[-1]
+    ns = {'__doc__': klass.__doc__}
+    metaclass = type
+    if shared:
+        ns['_mock_shared_class'] = True
+        if issubclass(_SharedMockClass, type(klass)):
+            # mock subclasses with a metaclass of their own go unguarded
+            metaclass = _SharedMockClass
+    if magics is not None:
+        # the magic method proxies are shared by every class using them
+        ns['_mock_magics'] = magics
+        for entry in magics:
+            ns[entry] = _magic_proxies[entry]
+    return _make_mock_class(bases, ns, metaclass)
+
+
+def _make_mock_class(bases, ns, metaclass=type):
+    new = metaclass(bases[-1].__name__, bases, ns)
+    if '__hash__' not in ns and new.__dict__.get('__hash__', 0) is None:
+        # type() sets __hash__ to None when __eq__ is in the namespace
+        type.__delattr__(new, '__hash__')
+    return new
+
+
+def _get_shared_class(bases, magics=None):
+    # The cache lives on the mock type itself so it goes away with that type
+    klass = bases[-1]
+    cache = klass.__dict__.get('_mock_shared_classes')
+    if cache is None:
+        cache = {}
+        setattr(klass, '_mock_shared_classes', cache)
+    key = bases, magics
+    shared = cache.get(key)
+    if shared is None:
+        shared = cache.setdefault(
+            key, _new_mock_class(bases, shared=True, magics=magics))
+    return shared
+
+
+def _get_own_class(mock):
+    """Return the class of `mock`, first giving it a class of its own if it
+    is still using one shared with other mocks."""
+    _type = type(mock)
+    if _type.__dict__.get('_mock_shared_class'):
+        magics = _type.__dict__.get('_mock_magics')
+        _type = _new_mock_class(_type.__bases__, magics=magics)
+        _set_class(mock, _type)
+        if magics is not None:
+            _type._mock_owner = mock
+    return _type
+
+
+def _get_spec_magics(spec):
+    # the magic methods a MagicMock with this spec supports
+    if spec is None or _is_instance_mock(spec):
+        return _proxied_magics
+    if _is_list(spec):
+        return _proxied_magics.intersection(spec)
+    return _get_spec_index(spec).magics
+
+
+_CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+
+class _WeakIdCache(object):
+    """A cache keyed on the identity of an object, plus an optional hashable
+    key, that holds the object weakly so its entries go away with it.
+    With a `maxsize`, the least recently used entries are dropped to stay
+    within it. Objects that can't be weakly referenced, such as builtin
+    methods, are not cached unless `strong_fallback` is set, in which case
+    they are held strongly (this needs a `maxsize` to stay bounded)."""
+
+    def __init__(self, maxsize=None, strong_fallback=False):
+        self.maxsize = maxsize
+        self.strong_fallback = strong_fallback
+        self.hits = self.misses = 0
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, obj, key=None, default=None):
+        data = self._data
+        key = id(obj), key
+        with self._lock:
+            entry = data.get(key)
+            if entry is None or entry[0]() is not obj:
+                self.misses += 1
+                return default
+            self.hits += 1
+            if self.maxsize is not None:
+                # re-insert to make it the most recently used
+                data.pop(key, None)
+                data[key] = entry
+            return entry[1]
+
+    def set(self, obj, value, key=None):
+        data = self._data
+        key = id(obj), key
+        def remove(ref):
+            # may run from the garbage collector while the lock is held, so
+            # this doesn't take it
+            if data.get(key, (None,))[0] is ref:
+                data.pop(key, None)
+        try:
+            ref = weakref.ref(obj, remove)
+        except TypeError:
+            if not self.strong_fallback:
+                return
+            ref = lambda: obj
+        with self._lock:
+            data.pop(key, None)
+            data[key] = (ref, value)
+            if self.maxsize is not None:
+                while len(data) > self.maxsize:
+                    data.pop(next(iter(data)), None)
+
+    def info(self):
+        with self._lock:
+            return _CacheInfo(self.hits, self.misses, self.maxsize,
+                              len(self._data))
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
 
-    def __reduce__(self):
-        return 'sentinel'
 
+# builtins such as object.__init__ can't be weakly referenced but are the
+# most expensive to introspect, so those are kept until evicted
+_signature_cache = _WeakIdCache(maxsize=2048, strong_fallback=True)
+_get_signature_object.cache_info = _signature_cache.info
+_get_signature_object.cache_clear = _signature_cache.clear
 
-sentinel = _Sentinel()
 
-DEFAULT = sentinel.DEFAULT
-_missing = sentinel.MISSING
-_deleted = sentinel.DELETED
+_HEAPTYPE = 1 << 9
 
 
-_allowed_names = {
-    'return_value', '_mock_return_value', 'side_effect',
-    '_mock_side_effect', '_mock_parent', '_mock_new_parent',
-    '_mock_name', '_mock_new_name'
-}
+def _spec_namespaces(spec):
+    """Return the namespaces `dir(spec)` draws the attribute names of `spec`
+    from, or None if they can't be tracked because of a custom `__dir__`."""
+    if isinstance(spec, type):
+        if type(spec).__dir__ is not type.__dir__:
+            return None
+        klasses = spec.__mro__
+        namespaces = []
+    else:
+        klass = type(spec)
+        if klass.__dir__ is not object.__dir__:
+            return None
+        klasses = klass.__mro__
+        try:
+            namespaces = [object.__getattribute__(spec, '__dict__')]
+        except AttributeError:
+            namespaces = []
+    for klass in klasses:
+        # builtin types can't change so don't need tracking
+        if getattr(klass, '__flags__', _HEAPTYPE) & _HEAPTYPE:
+            namespaces.append(klass.__dict__)
+    return namespaces
+
+
+class _SpecIndex(object):
+    """The attribute names of a spec object, which of them are async and
+    which magic methods it supports. Worked out once per spec object and
+    shared by every mock using it, see `_get_spec_index`."""
+
+    def __init__(self, spec, namespaces=None):
+        names = dir(spec)
+        asyncs = []
+        for attr in names:
+            static_attr = inspect.getattr_static(spec, attr, None)
+            unwrapped_attr = static_attr
+            try:
+                unwrapped_attr = inspect.unwrap(unwrapped_attr)
+            except ValueError:
+                pass
+            if iscoroutinefunction(unwrapped_attr):
+                asyncs.append(attr)
+
+        self.names = frozenset(names)
+        self.asyncs = frozenset(asyncs)
+        self.magics = _proxied_magics.intersection(names)
+        self._changed = False
+        self._refs = []
+        self._namespaces = None
+        if namespaces is not None:
+            self._namespaces = [self._snapshot(ns) for ns in namespaces]
+
+    def _snapshot(self, namespace):
+        """
+        Return the names in `namespace`, the ids of their values, and the
+        functions of the staticmethods and classmethods among them. The
+        values are held weakly, and the index is marked changed once one of
+        them goes away, after which its id could be reused. Values that
+        can't be weakly referenced can't be async, other than the
+        staticmethods and classmethods, whose function is held instead.
+        """
+        changed = self._value_gone
+        refs = self._refs
+        funcs = []
+        for position, value in enumerate(namespace.values()):
+            try:
+                refs.append(weakref.ref(value, changed))
+            except TypeError:
+                pass
+            else:
+                continue
+            if isinstance(value, (staticmethod, classmethod)):
+                try:
+                    func = weakref.ref(value.__func__, changed)
+                except TypeError:
+                    pass
+                else:
+                    funcs.append((position, func))
+        return (frozenset(namespace), tuple(map(id, namespace.values())),
+                tuple(funcs))
 
+    def _value_gone(self, ref):
+        self._changed = True
 
-def _delegating_property(name):
-    _allowed_names.add(name)
-    _the_name = '_mock_' + name
-    def _get(self, name=name, _the_name=_the_name):
-        sig = self._mock_delegate
-        if sig is None:
-            return getattr(self, _the_name)
-        return getattr(sig, name)
-    def _set(self, value, name=name, _the_name=_the_name):
-        sig = self._mock_delegate
-        if sig is None:
-            self.__dict__[_the_name] = value
-        else:
-            setattr(sig, name, value)
+    def matches(self, namespaces):
+        """Whether `namespaces` still hold the names and values this was
+        worked out from, compared by identity."""
+        if self._changed or len(namespaces) != len(self._namespaces):
+            return False
+        for namespace, snapshot in zip(namespaces, self._namespaces):
+            names, ids, funcs = snapshot
+            if namespace.keys() != names:
+                return False
+            if tuple(map(id, namespace.values())) != ids:
+                return False
+            if funcs:
+                values = tuple(namespace.values())
+                for position, func in funcs:
+                    if func() is not values[position].__func__:
+                        return False
+        return True
 
-    return property(_get, _set)
 
+_spec_indexes = _WeakIdCache()
 
 
-class _CallList(list):
+def _get_spec_index(spec):
+    namespaces = _spec_namespaces(spec)
+    if namespaces is None:
+        return _SpecIndex(spec)
+    index = _spec_indexes.get(spec)
+    if index is None or not index.matches(namespaces):
+        index = _SpecIndex(spec, namespaces)
+        _spec_indexes.set(spec, index)
+    return index
 
-    def __contains__(self, value):
-        if not isinstance(value, list):
-            return list.__contains__(self, value)
-        len_value = len(value)
-        len_self = len(self)
-        if len_value > len_self:
-            return False
 
-        for i in range(0, len_self - len_value + 1):
-            sub_list = self[i:i+len_value]
-            if sub_list == value:
-                return True
-        return False
+_get_spec_index.cache_info = _spec_indexes.info
+_get_spec_index.cache_clear = _spec_indexes.clear
 
-    def __repr__(self):
-        return pprint.pformat(list(self))
 
+class _ConfigurePlan(object):
+    """
+    The steps `configure_mock` takes for a given set of keyword arguments,
+    worked out once per set: the getattr walks to the mocks being configured,
+    shared between keys with a common prefix, and the attributes to set on
+    each of them in turn.
+    """
 
-def _check_and_set_parent(parent, value, name, new_name):
-    value = _extract_mock(value)
+    def __init__(self, keys):
+        slots = {(): 0}
+        self.steps = steps = []
+        # we sort on the number of dots so that attributes are set before we
+        # set attributes on attributes
+        for key in sorted(keys, key=lambda key: key.count('.')):
+            path = tuple(key.split('.'))
+            path, name = path[:-1], path[-1]
+            for i in range(len(path)):
+                if path[:i + 1] not in slots:
+                    slots[path[:i + 1]] = len(slots)
+                    steps.append((slots[path[:i]], path[i], None))
+            plain = (name not in _allowed_names and
+                     name not in _all_magics and
+                     name not in _unsupported_magics and
+                     name != '__class__')
+            slot = slots[path]
+            if steps and steps[-1][0] == slot and steps[-1][2] is not None:
+                steps[-1][1].add(name)
+                steps[-1][2].append((name, key, plain))
+            else:
+                steps.append((slot, {name}, [(name, key, plain)]))
+
+
+    def apply(self, mock, kwargs):
+        objs = [mock]
+        for slot, names, batch in self.steps:
+            obj = objs[slot]
+            if batch is None:
+                # names is the single attribute to walk down to
+                objs.append(getattr(obj, names))
+            elif _can_set_directly(obj, names):
+                for name, key, plain in batch:
+                    value = kwargs[key]
+                    if plain and not _is_instance_mock(_extract_mock(value)):
+                        # what NonCallableMock.__setattr__ ends up doing
+                        object.__setattr__(obj, name, value)
+                    else:
+                        setattr(obj, name, value)
+            else:
+                for name, key, _ in batch:
+                    setattr(obj, name, kwargs[key])
 
-    if not _is_instance_mock(value):
+
+def _can_set_directly(obj, names):
+    # checks spec_set for all the names at once, leaving anything that
+    # would fail to NonCallableMock.__setattr__ to report
+    if type(obj).__setattr__ is not NonCallableMock.__setattr__:
         return False
-    if ((value._mock_name or value._mock_new_name) or
-        (value._mock_parent is not None) or
-        (value._mock_new_parent is not None)):
+    if obj._mock_sealed:
         return False
+    methods = obj._mock_methods
+    if not obj._spec_set or methods is None:
+        return True
+    return not names.difference(methods).difference(obj.__dict__)
 
-    _parent = parent
-    while _parent is not None:
-        # setting a mock (value) as a child or return value of itself
-        # should not modify the mock
-        if _parent is value:
-            return False
-        _parent = _parent._mock_new_parent
-
-    if new_name:
-        value._mock_new_parent = parent
-        value._mock_new_name = new_name
-    if name:
-        value._mock_parent = parent
-        value._mock_name = name
-    return True
 
-# Internal class to identify if we wrapped an iterator object or not.
-class _MockIter(object):
-    def __init__(self, obj):
-        self.obj = iter(obj)
-    def __next__(self):
-        return next(self.obj)
+@lru_cache(maxsize=256)
+def _get_configure_plan(keys):
+    return _ConfigurePlan(keys)
+
 
 class Base(object):
     _mock_return_value = DEFAULT
@@ -442,12 +2079,10 @@ class Base(object):
 class NonCallableMock(Base):
     """A non-callable version of `Mock`"""
 
-    # Store a mutex as a class attribute in order to protect concurrent access
-    # to mock attributes. Using a class attribute allows all NonCallableMock
-    # instances to share the mutex for simplicity.
-    #
-    # See https://github.com/python/cpython/issues/98624 for why this is
-    # necessary.
+    # Mocks used to share this mutex to protect concurrent access to mock
+    # attributes, see https://github.com/python/cpython/issues/98624. They
+    # now lock the tree they are in instead, see _TreeLock, and it is only
+    # kept for code outside of mock that takes it.
     _lock = RLock()
 
     def __new__(
@@ -455,27 +2090,55 @@ class NonCallableMock(Base):
             parent=None, _spec_state=None, _new_name='', _new_parent=None,
             _spec_as_instance=False, _eat_self=None, unsafe=False, **kwargs
         ):
-        # every instance has its own class
-        # so we can create magic methods on the
-        # class without stomping on other mocks
         bases = (cls,)
         if not issubclass(cls, AsyncMockMixin):
             # Check if spec is an async object or function
             spec_arg = spec_set or spec
             if spec_arg is not None and _is_async_obj(spec_arg):
                 bases = (AsyncMockMixin, cls)
-        new = type(cls.__name__, bases, {'__doc__': cls.__doc__})
+        magics = None
+        if issubclass(cls, MagicMixin):
+            magics = _get_spec_magics(spec if spec_set is None else spec_set)
+        if _share_classes():
+            # the class is only made our own once something is set on it
+            return _safe_super(NonCallableMock, cls).__new__(
+                _get_shared_class(bases, magics))
+        # every instance has its own class
+        # so we can create magic methods on the
+        # class without stomping on other mocks
+        new = _new_mock_class(bases, magics=magics)
         instance = _safe_super(NonCallableMock, cls).__new__(new)
+        if magics is not None:
+            new._mock_owner = instance
         return instance
 
 
     def __init__(
             self, spec=None, wraps=None, name=None, spec_set=None,
             parent=None, _spec_state=None, _new_name='', _new_parent=None,
-            _spec_as_instance=False, _eat_self=None, unsafe=False, **kwargs
+            _spec_as_instance=False, _eat_self=None, unsafe=False,
+            _mock_max_calls=None, _mock_record='all', _mock_sample_every=None,
+            _mock_sample_size=None, **kwargs
         ):
         if _new_parent is None:
             _new_parent = parent
+        max_calls = _mock_max_calls
+        if max_calls is not None and max_calls < 0:
+            raise ValueError(
+                f'_mock_max_calls must not be negative, got {max_calls}')
+        record = _mock_record
+        if record not in ('all', 'count', 'timed', 'compressed'):
+            raise ValueError(
+                f"_mock_record must be 'all', 'count', 'timed' or "
+                f"'compressed', got {record!r}")
+        if record == 'compressed' and max_calls is not None:
+            raise ValueError(
+                "_mock_max_calls can't be combined with "
+                "_mock_record='compressed'")
+        sample = None
+        if _mock_sample_every is not None or _mock_sample_size is not None:
+            sample = _check_sample(
+                _mock_sample_every, _mock_sample_size, max_calls, record)
 
         __dict__ = self.__dict__
         __dict__['_mock_parent'] = parent
@@ -492,18 +2155,16 @@ class NonCallableMock(Base):
 
         self._mock_add_spec(spec, spec_set, _spec_as_instance, _eat_self)
 
-        __dict__['_mock_children'] = {}
         __dict__['_mock_wraps'] = wraps
         __dict__['_mock_delegate'] = None
 
         __dict__['_mock_called'] = False
         __dict__['_mock_call_args'] = None
         __dict__['_mock_call_count'] = 0
-        __dict__['_mock_call_args_list'] = _CallList()
-        __dict__['_mock_mock_calls'] = _CallList()
-
-        __dict__['method_calls'] = _CallList()
         __dict__['_mock_unsafe'] = unsafe
+        __dict__['_mock_max_calls'] = max_calls
+        __dict__['_mock_record'] = record
+        __dict__['_mock_sample'] = sample
 
         if kwargs:
             self.configure_mock(**kwargs)
@@ -545,7 +2206,7 @@ class NonCallableMock(Base):
 
         _spec_class = None
         _spec_signature = None
-        _spec_asyncs = []
+        _spec_asyncs = frozenset()
 
         if spec is not None and not _is_list(spec):
             if isinstance(spec, type):
@@ -556,19 +2217,9 @@ class NonCallableMock(Base):
                                         _spec_as_instance, _eat_self)
             _spec_signature = res and res[1]
 
-            spec_list = dir(spec)
-
-            for attr in spec_list:
-                static_attr = inspect.getattr_static(spec, attr, None)
-                unwrapped_attr = static_attr
-                try:
-                    unwrapped_attr = inspect.unwrap(unwrapped_attr)
-                except ValueError:
-                    pass
-                if iscoroutinefunction(unwrapped_attr):
-                    _spec_asyncs.append(attr)
-
-            spec = spec_list
+            spec_index = _get_spec_index(spec)
+            _spec_asyncs = spec_index.asyncs
+            spec = spec_index.names
 
         __dict__ = self.__dict__
         __dict__['_spec_class'] = _spec_class
@@ -576,6 +2227,7 @@ class NonCallableMock(Base):
         __dict__['_spec_signature'] = _spec_signature
         __dict__['_mock_methods'] = spec
         __dict__['_spec_asyncs'] = _spec_asyncs
+        _signatures_changed(self)
 
     def __get_return_value(self):
         ret = self._mock_return_value
@@ -608,11 +2260,20 @@ class NonCallableMock(Base):
             return type(self)
         return self._spec_class
 
+    # most mocks in a tree are never called or have no children of their own,
+    # so these are only created when first used
+    _mock_children = _LazyAttribute(dict)
+    # the mocks, this one included, with calls logged for it
+    _mock_call_sources = _LazyAttribute(dict)
+    # the live checkpoints taken of this mock
+    _mock_checkpoints = _LazyAttribute(weakref.WeakSet)
+
     called = _delegating_property('called')
     call_count = _delegating_property('call_count')
     call_args = _delegating_property('call_args')
-    call_args_list = _delegating_property('call_args_list')
-    mock_calls = _delegating_property('mock_calls')
+    call_args_list = _call_view_property('call_args_list', 0, delegate=True)
+    mock_calls = _call_view_property('mock_calls', 1, delegate=True)
+    method_calls = _call_view_property('method_calls', 2, delegate=False)
 
 
     def __get_side_effect(self):
@@ -650,16 +2311,34 @@ class NonCallableMock(Base):
         self.called = False
         self.call_args = None
         self.call_count = 0
-        self.mock_calls = _CallList()
-        self.call_args_list = _CallList()
-        self.method_calls = _CallList()
+        __dict__ = self.__dict__
+        if self._mock_delegate is None:
+            _detach_call_view(self, '_mock_call_args_list')
+            _detach_call_view(self, '_mock_mock_calls')
+        else:
+            self.mock_calls = _CallList()
+            self.call_args_list = _CallList()
+        _detach_call_view(self, '_mock_method_calls')
+        __dict__.pop('_mock_matched_calls', None)
+        seq = _last_call
+        if '_mock_call_sources' in __dict__:
+            # views created from now on leave out the calls logged so far
+            __dict__['_mock_calls_since'] = seq
+        log = __dict__.get('_mock_call_log')
+        if log is not None:
+            # mocks above that aren't reset keep the calls, as they would if
+            # they were copied to them as they were made, and the rest is
+            # dropped so that the arguments can be freed
+            _update_other_views(log, visited)
+            with _TreeLock(self):
+                log.release(seq)
 
         if return_value:
             self._mock_return_value = DEFAULT
         if side_effect:
             self._mock_side_effect = None
 
-        for child in self._mock_children.values():
+        for child in __dict__.get('_mock_children', {}).values():
             if isinstance(child, _SpecState) or child is _deleted:
                 continue
             child.reset_mock(visited, return_value=return_value, side_effect=side_effect)
@@ -677,18 +2356,12 @@ class NonCallableMock(Base):
         method call:
 
         >>> attrs = {'method.return_value': 3, 'other.side_effect': KeyError}
-        >>> mock.configure_mock(**attrs)"""
-        for arg, val in sorted(kwargs.items(),
-                               # we sort on the number of dots so that
-                               # attributes are set before we set attributes on
-                               # attributes
-                               key=lambda entry: entry[0].count('.')):
-            args = arg.split('.')
-            final = args.pop()
-            obj = self
-            for entry in args:
-                obj = getattr(obj, entry)
-            setattr(obj, final, val)
+        >>> mock.configure_mock(**attrs)
+
+        The steps taken for a given set of keys are worked out once and reused
+        on later calls with the same keys."""
+        if kwargs:
+            _get_configure_plan(tuple(kwargs)).apply(self, kwargs)
 
 
     def __getattr__(self, name):
@@ -705,22 +2378,26 @@ class NonCallableMock(Base):
                     f"{name!r} is not a valid assertion. Use a spec "
                     f"for the mock if {name!r} is meant to be an attribute.")
 
-        with NonCallableMock._lock:
+        wraps = None
+        if (self._mock_wraps is not None and
+                name not in self._mock_children):
+            # got before taking the lock, as the wrapped object may be a
+            # mock in another tree
+            # XXXX should we get the attribute without triggering code
+            # execution?
+            wraps = getattr(self._mock_wraps, name)
+
+        with _TreeLock(self):
             result = self._mock_children.get(name)
             if result is _deleted:
                 raise AttributeError(name)
             elif result is None:
-                wraps = None
-                if self._mock_wraps is not None:
-                    # XXXX should we get the attribute without triggering code
-                    # execution?
-                    wraps = getattr(self._mock_wraps, name)
-
                 result = self._get_child_mock(
                     parent=self, name=name, wraps=wraps, _new_name=name,
                     _new_parent=self
                 )
                 self._mock_children[name]  = result
+                _signatures_changed(self)
 
             elif isinstance(result, _SpecState):
                 try:
@@ -735,11 +2412,17 @@ class NonCallableMock(Base):
                         f'{target_name!r} as it has already been mocked out. '
                         f'[target={self!r}, attr={result.spec!r}]')
                 self._mock_children[name]  = result
+                _signatures_changed(self)
 
         return result
 
 
     def _extract_mock_name(self):
+        # the dotted name only changes along with the lineage of the mock
+        cached = self.__dict__.get('_mock_extracted_name')
+        if cached is not None and _lineage_unchanged(self, cached[0]):
+            return cached[1]
+
         _name_list = [self._mock_new_name]
         _parent = self._mock_new_parent
         last = self
@@ -764,7 +2447,9 @@ class NonCallableMock(Base):
             if _name_list[1] not in ('()', '().'):
                 _first += '.'
         _name_list[0] = _first
-        return ''.join(_name_list)
+        name = ''.join(_name_list)
+        self.__dict__['_mock_extracted_name'] = (_lineage_versions(self), name)
+        return name
 
     def __repr__(self):
         name = self._extract_mock_name()
@@ -802,10 +2487,29 @@ class NonCallableMock(Base):
         from_type = [e for e in from_type if not e.startswith('_')]
         from_dict = [e for e in from_dict if not e.startswith('_') or
                      _is_magic(e)]
-        return sorted(set(extras + from_type + from_dict + from_child_mocks))
+        return sorted(set(extras).union(from_type, from_dict, from_child_mocks))
 
 
     def __setattr__(self, name, value):
+        if name == '_mock_new_parent':
+            # moves the mock and those below it to the tree of value, so
+            # both trees are locked for it
+            if _is_instance_mock(value):
+                lock = _TreeLocks(self, value)
+            else:
+                lock = _TreeLock(self)
+            with lock:
+                __dict__ = self.__dict__
+                __dict__['_mock_lineage_version'] = (
+                    __dict__.get('_mock_lineage_version', 0) + 1)
+                # the mocks above lose it as it moves
+                _signatures_changed(__dict__.get('_mock_new_parent'))
+                __dict__['_mock_new_parent'] = value
+            return
+        if name in _lineage_names:
+            __dict__ = self.__dict__
+            __dict__['_mock_lineage_version'] = (
+                __dict__.get('_mock_lineage_version', 0) + 1)
         if name in _allowed_names:
             # property setters go through here
             return object.__setattr__(self, name, value)
@@ -820,22 +2524,30 @@ class NonCallableMock(Base):
             if self._mock_methods is not None and name not in self._mock_methods:
                 raise AttributeError("Mock object has no attribute '%s'" % name)
 
+            # a MagicProxy on the class looks the value up on the instance
+            proxied = (type(self).__dict__.get(name) is
+                       _magic_proxies.get(name, _missing))
             if not _is_instance_mock(value):
-                setattr(type(self), name, _get_method(name, value))
+                if not proxied:
+                    setattr(_get_own_class(self), name,
+                            _get_method(name, value))
                 original = value
                 value = lambda *args, **kw: original(self, *args, **kw)
             else:
                 # only set _new_name and not name so that mock_calls is tracked
                 # but not method calls
                 _check_and_set_parent(self, value, None, name)
-                setattr(type(self), name, value)
+                if not proxied:
+                    setattr(_get_own_class(self), name, value)
                 self._mock_children[name] = value
+                _signatures_changed(self)
         elif name == '__class__':
             self._spec_class = value
             return
         else:
             if _check_and_set_parent(self, value, name, name):
                 self._mock_children[name] = value
+                _signatures_changed(self)
 
         if self._mock_sealed and not hasattr(self, name):
             mock_name = f'{self._extract_mock_name()}.{name}'
@@ -849,7 +2561,9 @@ class NonCallableMock(Base):
 
     def __delattr__(self, name):
         if name in _all_magics and name in type(self).__dict__:
-            delattr(type(self), name)
+            _type = _get_own_class(self)
+            delattr(_type, name)
+            _type._mock_magics = None
             if name not in self.__dict__:
                 # for magic methods that are still MagicProxy objects and
                 # not set on the instance itself
@@ -863,6 +2577,7 @@ class NonCallableMock(Base):
         if obj is not _missing:
             del self._mock_children[name]
         self._mock_children[name] = _deleted
+        _signatures_changed(self)
 
 
     def _format_mock_call_signature(self, args, kwargs):
@@ -892,12 +2607,22 @@ class NonCallableMock(Base):
         if not name:
             return self._spec_signature
 
+        # looked up once per name until a child or spec changes
+        __dict__ = self.__dict__
+        version = __dict__.get('_mock_signature_version', 0)
+        cached = __dict__.get('_mock_signatures')
+        if cached is None or cached[0] != version:
+            cached = __dict__['_mock_signatures'] = (version, {})
+        sig = cached[1].get(name, _missing)
+        if sig is not _missing:
+            return sig
+
         sig = None
         names = name.replace('()', '').split('.')
         children = self._mock_children
 
-        for name in names:
-            child = children.get(name)
+        for child_name in names:
+            child = children.get(child_name)
             if child is None or isinstance(child, _SpecState):
                 break
             else:
@@ -908,6 +2633,7 @@ class NonCallableMock(Base):
                 children = child._mock_children
                 sig = child._spec_signature
 
+        cached[1][name] = sig
         return sig
 
 
@@ -938,6 +2664,45 @@ class NonCallableMock(Base):
         else:
             return _call
 
+
+    def _matched_calls(self, calls, name):
+        """
+        Return what `_call_matcher` makes of each of `calls`, the `name` list
+        of the mock, reusing what earlier assertions made of the calls still
+        in it. Views keep it themselves. For other lists it is kept as long as
+        the calls are the same objects, so changing a list other than by
+        adding to it starts over.
+        """
+        if isinstance(calls, _CallView):
+            return calls._matched_calls(self)
+        calls = list(calls)
+        __dict__ = self.__dict__
+        version = __dict__.get('_mock_signature_version', 0)
+        cache = __dict__.get('_mock_matched_calls')
+        if cache is None:
+            cache = __dict__['_mock_matched_calls'] = {}
+        cached = cache.get(name)
+        same = 0
+        if cached is not None and cached[0] == version:
+            _, sources, matched = cached
+            same = min(len(sources), len(calls))
+            same = next(
+                itertools.compress(
+                    itertools.count(),
+                    map(operator.is_not, sources[:same], calls)),
+                same)
+            matched = matched[:same]
+        else:
+            matched = []
+        matcher = self._call_matcher
+        matched.extend([matcher(c) for c in calls[same:]])
+        if all(map(operator.is_, matched, calls)):
+            # without signatures the calls are their own keys
+            matched = calls
+        cache[name] = (version, calls, matched)
+        return matched
+
+
     def assert_not_called(_mock_self):
         """assert that the mock was never called.
         """
@@ -975,6 +2740,7 @@ class NonCallableMock(Base):
         Raises an AssertionError if the args and keyword args passed in are
         different to the last call to the mock."""
         self = _mock_self
+        self._check_recorded()
         if self.call_args is None:
             expected = self._format_mock_call_signature(args, kwargs)
             actual = 'not called.'
@@ -1005,7 +2771,7 @@ class NonCallableMock(Base):
         return self.assert_called_with(*args, **kwargs)
 
 
-    def assert_has_calls(self, calls, any_order=False):
+    def assert_has_calls(self, calls, any_order=False, since=None):
         """assert the mock has been called with the specified calls.
         The `mock_calls` list is checked for the calls.
 
@@ -1014,10 +2780,26 @@ class NonCallableMock(Base):
         specified calls.
 
         If `any_order` is True then the calls can be in any order, but
-        they must all appear in `mock_calls`."""
+        they must all appear in `mock_calls`.
+
+        If `since` is a checkpoint, only the calls made after it was taken
+        are checked."""
+        self._check_recorded(sampled=False)
+        if since is None:
+            mock_calls = self.mock_calls
+        else:
+            mock_calls = _since_view(self, since)
+        if isinstance(mock_calls, _CallView):
+            mock_calls._check_complete()
+        if since is not None:
+            mock_calls = _CallList(mock_calls)
         expected = [self._call_matcher(c) for c in calls]
         cause = next((e for e in expected if isinstance(e, Exception)), None)
-        all_calls = _CallList(self._call_matcher(c) for c in self.mock_calls)
+        if since is None:
+            all_calls = _CallList(
+                self._matched_calls(mock_calls, 'mock_calls'))
+        else:
+            all_calls = _CallList(self._call_matcher(c) for c in mock_calls)
         if not any_order:
             if expected not in all_calls:
                 if cause is None:
@@ -1030,23 +2812,18 @@ class NonCallableMock(Base):
                 raise AssertionError(
                     f'{problem}\n'
                     f'Expected: {_CallList(calls)}\n'
-                    f'  Actual: {safe_repr(self.mock_calls)}'
+                    f'  Actual: {safe_repr(mock_calls)}'
+                    f'{self._evicted_repr(mock_calls)}'
                 ) from cause
             return
 
-        all_calls = list(all_calls)
-
-        not_found = []
-        for kall in expected:
-            try:
-                all_calls.remove(kall)
-            except ValueError:
-                not_found.append(kall)
+        not_found, all_calls = _match_any_order(list(all_calls), expected)
         if not_found:
             raise AssertionError(
                 '%r does not contain all of %r in its call list, '
-                'found %r instead' % (self._mock_name or 'mock',
-                                      tuple(not_found), all_calls)
+                'found %r instead%s' % (self._mock_name or 'mock',
+                                        tuple(not_found), all_calls,
+                                        self._evicted_repr(mock_calls))
             ) from cause
 
 
@@ -1056,13 +2833,20 @@ class NonCallableMock(Base):
         The assert passes if the mock has *ever* been called, unlike
         `assert_called_with` and `assert_called_once_with` that only pass if
         the call is the most recent one."""
+        self._check_recorded()
         expected = self._call_matcher(_Call((args, kwargs), two=True))
         cause = expected if isinstance(expected, Exception) else None
-        actual = [self._call_matcher(c) for c in self.call_args_list]
+        calls = self.call_args_list
+        actual = self._matched_calls(calls, 'call_args_list')
+        if cause is None and isinstance(calls, _CallView):
+            # repeated lookups in long histories go through an index
+            if calls._find(expected, actual):
+                return
         if cause or expected not in _AnyComparer(actual):
             expected_string = self._format_mock_call_signature(args, kwargs)
             raise AssertionError(
-                '%s call not found' % expected_string
+                '%s call not found%s' % (
+                    expected_string, self._evicted_repr(self.call_args_list))
             ) from cause
 
 
@@ -1079,6 +2863,17 @@ class NonCallableMock(Base):
             mock_name = self._extract_mock_name() + attribute
             raise AttributeError(mock_name)
 
+        max_calls = self._mock_max_calls
+        if max_calls is not None:
+            kw.setdefault('_mock_max_calls', max_calls)
+        if self._mock_record != 'all':
+            kw.setdefault('_mock_record', self._mock_record)
+        sample = self._mock_sample
+        if (sample is not None and
+                '_mock_sample_every' not in kw and
+                '_mock_sample_size' not in kw):
+            kw['_mock_sample_every'], kw['_mock_sample_size'] = sample
+
         _new_name = kw.get("_new_name")
         if _new_name in self.__dict__['_spec_asyncs']:
             return AsyncMock(**kw)
@@ -1112,9 +2907,48 @@ class NonCallableMock(Base):
         If self.mock_calls is empty, an empty string is returned. The
         output will be truncated if very long.
         """
+        evicted = self._evicted_repr(self.mock_calls)
         if not self.mock_calls:
+            return evicted
+        return f"\nCalls: {safe_repr(self.mock_calls)}.{evicted}"
+
+
+    def _evicted_repr(self, calls):
+        """Renders the number of calls dropped from `calls` because of
+        _mock_max_calls, or an empty string if there are none."""
+        if isinstance(calls, _CallView):
+            calls._update()
+            if calls._sampled is not None:
+                return f"\nCalls may be missing, {calls._sampled}."
+        if isinstance(calls, _SampledCallList):
+            if len(calls) == calls.total:
+                return ""
+            return (f"\nOnly a sample of {len(calls)} of the {calls.total} "
+                    f"calls is kept ({_sample_policy(calls.policy)}), so it "
+                    f"may have been made anyway.")
+        evicted = getattr(calls, '_evicted', 0)
+        if not evicted:
             return ""
-        return f"\nCalls: {safe_repr(self.mock_calls)}."
+        if self._mock_max_calls is None:
+            return (f"\n{evicted} earlier calls were dropped by "
+                    f"release_history.")
+        return (f"\n{evicted} earlier calls were dropped, only the last "
+                f"{self._mock_max_calls} are kept (_mock_max_calls).")
+
+
+    def _check_recorded(self, what='calls', sampled=True):
+        if self._mock_record == 'count':
+            raise AssertionError(
+                f"Can't check the arguments of the {what} to "
+                f"{self._mock_name or 'mock'}, they are only counted "
+                f"(_mock_record='count')."
+            )
+        if not sampled and self._mock_sample is not None:
+            raise AssertionError(
+                f"Can't check the order of the {what} to "
+                f"{self._mock_name or 'mock'}, only a sample of them is kept "
+                f"({_sample_policy(self._mock_sample)})."
+            )
 
 
 try:
@@ -1194,51 +3028,59 @@ class CallableMixin(Base):
         return _mock_self._execute_mock_call(*args, **kwargs)
 
     def _increment_mock_call(_mock_self, *args, **kwargs):
+        global _last_call
         self = _mock_self
-        self.called = True
-        self.call_count += 1
-
-        # handle call_args
-        # needs to be set here so assertions on call arguments pass before
-        # execution in the case of awaited calls
-        _call = _Call((args, kwargs), two=True)
-        self.call_args = _call
-        self.call_args_list.append(_call)
-
-        # initial stuff for method_calls:
-        do_method_calls = self._mock_parent is not None
-        method_call_name = self._mock_name
-
-        # initial stuff for mock_calls:
-        mock_call_name = self._mock_new_name
-        is_a_call = mock_call_name == '()'
-        self.mock_calls.append(_Call(('', args, kwargs)))
-
-        # follow up the chain of mocks:
-        _new_parent = self._mock_new_parent
-        while _new_parent is not None:
-
-            # handle method_calls:
-            if do_method_calls:
-                _new_parent.method_calls.append(_Call((method_call_name, args, kwargs)))
-                do_method_calls = _new_parent._mock_parent is not None
-                if do_method_calls:
-                    method_call_name = _new_parent._mock_name + '.' + method_call_name
-
-            # handle mock_calls:
-            this_mock_call = _Call((mock_call_name, args, kwargs))
-            _new_parent.mock_calls.append(this_mock_call)
+        with _TreeLock(self):
+            if self._mock_record == 'count':
+                if self._mock_delegate is None:
+                    __dict__ = self.__dict__
+                    __dict__['_mock_called'] = True
+                    __dict__['_mock_call_count'] += 1
+                else:
+                    self.called = True
+                    self.call_count += 1
+                return
 
-            if _new_parent._mock_new_name:
-                if is_a_call:
-                    dot = ''
+            self.called = True
+            self.call_count += 1
+
+            # handle call_args
+            # needs to be set here so assertions on call arguments pass before
+            # execution in the case of awaited calls
+            _call = _recorded_call((args, kwargs))
+            self.call_args = _call
+            __dict__ = self.__dict__
+            lineage = __dict__.get('_mock_call_lineage')
+            if (lineage is None or
+                    not _lineage_unchanged(self, lineage.versions)):
+                lineage = __dict__['_mock_call_lineage'] = _CallLineage(self)
+            if self._mock_sample is not None:
+                # call_args_list keeps a sample of the calls, and only the
+                # calls it keeps are logged for the other views, which are
+                # told about those left out
+                if not self.call_args_list.append(_call):
+                    seq = _last_call = next(_call_sequence)
+                    __dict__['_mock_last_sampled'] = seq
+                    _push_sampled(self, lineage)
+                    return
+            elif self._mock_delegate is not None:
+                self.call_args_list.append(_call)
+
+            log = __dict__.get('_mock_call_log')
+            if log is None:
+                record = self._mock_record
+                if record == 'timed':
+                    log = _TimedCallLog(self._mock_max_calls)
+                elif record == 'compressed':
+                    log = _CompressedCallLog()
                 else:
-                    dot = '.'
-                is_a_call = _new_parent._mock_new_name == '()'
-                mock_call_name = _new_parent._mock_new_name + dot + mock_call_name
+                    log = _CallLog(self._mock_max_calls)
+                __dict__['_mock_call_log'] = log
+            log.append(lineage, args, kwargs)
+            _push_call(self, lineage, log, args, kwargs)
+            for parent, name in lineage.eager:
+                parent.mock_calls.append(_recorded_call((name, args, kwargs)))
 
-            # follow the parental chain:
-            _new_parent = _new_parent._mock_new_parent
 
     def _execute_mock_call(_mock_self, *args, **kwargs):
         self = _mock_self
@@ -1326,6 +3168,40 @@ class Mock(CallableMixin, NonCallableMock):
       mock. This can be useful for debugging. The name is propagated to child
       mocks.
 
+    * `_mock_max_calls`: If not None, only this many of the latest calls are
+      kept in `call_args_list`, `mock_calls` and `method_calls` (and
+      `await_args_list` for async mocks), so that long running tests don't
+      keep every call and its arguments alive. `called`, `call_count` and
+      `call_args` are still exact, and assertions that need calls no longer
+      kept say so. Like `name`, it is propagated to child mocks.
+
+    * `_mock_record`: With `_mock_record='count'` calls are only counted:
+      `called` and `call_count` are kept up to date but the arguments aren't
+      recorded anywhere, nor are the calls added to the `mock_calls` of
+      parents. This is for mocks called very often where only the count
+      matters. Assertions on the arguments of calls fail. With
+      `_mock_record='timed'` calls are recorded as usual along with when they
+      were made, the thread they were made from and the asyncio task, if any,
+      for `timed_calls`, `call_intervals` and `calls_per_window` to query.
+      With `_mock_record='compressed'` repeated calls with the same arguments
+      are stored once, for mocks called many times the same way. Arguments
+      are shared between calls if they are the same objects or equal
+      strings, bytes, integers, booleans or None. It can't be combined with
+      `_mock_max_calls`. The record mode is propagated to child mocks.
+
+    * `_mock_sample_every` and `_mock_sample_size`: For mocks called too
+      often to keep every call, `call_args_list` (and `await_args_list` for
+      async mocks) only keeps a sample of them: every `_mock_sample_every`th
+      call, or a uniformly random sample of `_mock_sample_size` calls.
+      `called`, `call_count` and `call_args` are still exact. `mock_calls`
+      and the `mock_calls` and `method_calls` of parents get each call as it
+      is kept, so with `_mock_sample_size` they can also list calls later
+      replaced in `call_args_list`. `assert_any_call` checks the sample and
+      says so when it fails with calls left out. `assert_has_calls` fails on
+      a mock whose `mock_calls` is missing calls left out of a sample, as
+      their order isn't known, until the mock is reset. Only one of the two
+      can be given, and they are propagated to child mocks.
+
     Mocks can also be called with arbitrary keyword arguments. These will be
     used to set attributes on the mock after it is created.
     """
@@ -2213,30 +4089,42 @@ def _set_return_value(mock, method, name):
 
 class MagicMixin(Base):
     def __init__(self, *args, **kw):
-        self._mock_set_magics()  # make magic work for kwargs in init
+        # the magic methods for the spec are already on the class (see
+        # NonCallableMock.__new__) so they work for kwargs in init
         _safe_super(MagicMixin, self).__init__(*args, **kw)
         self._mock_set_magics()  # fix magic broken by upper level init
 
 
     def _mock_set_magics(self):
-        orig_magics = _magics | _async_method_magics
-        these_magics = orig_magics
+        these_magics = _proxied_magics
 
         if getattr(self, "_mock_methods", None) is not None:
-            these_magics = orig_magics.intersection(self._mock_methods)
-            remove_magics = orig_magics - these_magics
+            these_magics = these_magics.intersection(self._mock_methods)
 
-            for entry in remove_magics:
-                if entry in type(self).__dict__:
-                    # remove unneeded magic methods
-                    delattr(self, entry)
+        _type = type(self)
+        current = _type.__dict__.get('_mock_magics')
+        if current is these_magics or current == these_magics:
+            return
 
-        # don't overwrite existing attributes if called a second time
-        these_magics = these_magics - set(type(self).__dict__)
+        if _type.__dict__.get('_mock_shared_class'):
+            # drop unneeded magic methods configured on the instance and
+            # move to the shared class proxying the right ones
+            for entry in (current - these_magics).intersection(self.__dict__):
+                del self.__dict__[entry]
+                self._mock_children[entry] = _deleted
+                _signatures_changed(self)
+            _set_class(self, _get_shared_class(_type.__bases__, these_magics))
+            return
 
-        _type = type(self)
-        for entry in these_magics:
-            setattr(_type, entry, MagicProxy(entry, self))
+        for entry in _proxied_magics - these_magics:
+            if entry in _type.__dict__:
+                # remove unneeded magic methods
+                delattr(self, entry)
+
+        # don't overwrite existing attributes if called a second time
+        for entry in these_magics - set(_type.__dict__):
+            setattr(_type, entry, _magic_proxies[entry])
+        _type._mock_magics = these_magics
 
 
 
@@ -2290,13 +4178,14 @@ class MagicMock(MagicMixin, Mock):
 
 
 class MagicProxy(Base):
-    def __init__(self, name, parent):
+    def __init__(self, name, parent=None):
         self.name = name
         self.parent = parent
 
-    def create_mock(self):
+    def create_mock(self, parent=None):
         entry = self.name
-        parent = self.parent
+        if parent is None:
+            parent = self.parent
         m = parent._get_child_mock(name=entry, _new_name=entry,
                                    _new_parent=parent)
         setattr(parent, entry, m)
@@ -2304,17 +4193,83 @@ class MagicProxy(Base):
         return m
 
     def __get__(self, obj, _type=None):
-        return self.create_mock()
+        parent = self.parent
+        if parent is None:
+            # An unbound proxy is shared between mocks, the magic method it
+            # creates lives on the mock it was looked up on (or the one owning
+            # the class) from then on.
+            parent = obj
+            if parent is None:
+                parent = _type.__dict__.get('_mock_owner')
+                if parent is None:
+                    return self
+            try:
+                return parent.__dict__[self.name]
+            except KeyError:
+                pass
+        return self.create_mock(parent)
 
 
-try:
-    _CODE_SIG = inspect.signature(partial(CodeType.__init__, None))
-    _CODE_ATTRS = dir(CodeType)
-except ValueError:  # pragma: no cover - backport is only tested against builds with docstrings
-    _CODE_SIG = None
+_magic_proxies = {
+    entry: MagicProxy(entry) for entry in _magics | _async_method_magics
+}
+_proxied_magics = frozenset(_magic_proxies)
+
+
+_CODE_ATTRS = dir(CodeType)
+
+
+@lru_cache(maxsize=None)
+def _get_code_signature():
+    # parsing the signature takes longer than the rest of the import, so it is
+    # only done once an async mock's __code__ is first used
+    try:
+        return inspect.signature(partial(CodeType.__init__, None))
+    except ValueError:  # pragma: no cover - backport is only tested against builds with docstrings
+        return None
+
+
+def _async_code_mock():
+    code_sig = _get_code_signature()
+    if code_sig:
+        code_mock = NonCallableMock(spec_set=_CODE_ATTRS)
+        code_mock.__dict__["_spec_class"] = CodeType
+        code_mock.__dict__["_spec_signature"] = code_sig
+    else:  # pragma: no cover - backport is only tested against builds with docstrings
+        code_mock = NonCallableMock(spec_set=CodeType)
+    code_mock.co_flags = (
+        inspect.CO_COROUTINE
+        + inspect.CO_VARARGS
+        + inspect.CO_VARKEYWORDS
+    )
+    code_mock.co_argcount = 0
+    code_mock.co_varnames = ('args', 'kwargs')
+    try:
+        code_mock.co_posonlyargcount = 0
+    except AttributeError:
+        # Python 3.7 and earlier.
+        pass
+    code_mock.co_kwonlyargcount = 0
+    return code_mock
+
+
+def _iterator_code_mock():
+    code_mock = NonCallableMock(spec_set=CodeType)
+    code_mock.co_flags = inspect.CO_ITERABLE_COROUTINE
+    return code_mock
+
+
+def _await_list(mock):
+    if mock._mock_sample is not None:
+        return _sample_list(mock)
+    maxlen = mock._mock_max_calls
+    if maxlen is None:
+        return _CallList()
+    return _BoundedCallList(maxlen)
 
 
 class AsyncMockMixin(Base):
+    __code__ = _LazyAttribute(_async_code_mock)
     await_count = _delegating_property('await_count')
     await_args = _delegating_property('await_args')
     await_args_list = _delegating_property('await_args_list')
@@ -2327,30 +4282,11 @@ class AsyncMockMixin(Base):
         # AsyncMock).
         # It is set through __dict__ because when spec_set is True, this
         # attribute is likely undefined.
+        import asyncio
         self.__dict__['_is_coroutine'] = asyncio.coroutines._is_coroutine
         self.__dict__['_mock_await_count'] = 0
         self.__dict__['_mock_await_args'] = None
-        self.__dict__['_mock_await_args_list'] = _CallList()
-        if _CODE_SIG:
-            code_mock = NonCallableMock(spec_set=_CODE_ATTRS)
-            code_mock.__dict__["_spec_class"] = CodeType
-            code_mock.__dict__["_spec_signature"] = _CODE_SIG
-        else:  # pragma: no cover - backport is only tested against builds with docstrings
-            code_mock = NonCallableMock(spec_set=CodeType)
-        code_mock.co_flags = (
-            inspect.CO_COROUTINE
-            + inspect.CO_VARARGS
-            + inspect.CO_VARKEYWORDS
-        )
-        code_mock.co_argcount = 0
-        code_mock.co_varnames = ('args', 'kwargs')
-        try:
-            code_mock.co_posonlyargcount = 0
-        except AttributeError:
-            # Python 3.7 and earlier.
-            pass
-        code_mock.co_kwonlyargcount = 0
-        self.__dict__['__code__'] = code_mock
+        self.__dict__['_mock_await_args_list'] = _await_list(self)
         self.__dict__['__name__'] = 'AsyncMock'
         self.__dict__['__defaults__'] = tuple()
         self.__dict__['__kwdefaults__'] = {}
@@ -2361,10 +4297,12 @@ class AsyncMockMixin(Base):
         # This is nearly just like super(), except for special handling
         # of coroutines
 
-        _call = _Call((args, kwargs), two=True)
-        self.await_count += 1
-        self.await_args = _call
-        self.await_args_list.append(_call)
+        with _TreeLock(self):
+            self.await_count += 1
+            if self._mock_record != 'count':
+                _call = _recorded_call((args, kwargs))
+                self.await_args = _call
+                self.await_args_list.append(_call)
 
         effect = self.side_effect
         if effect is not None:
@@ -2421,6 +4359,7 @@ class AsyncMockMixin(Base):
         Assert that the last await was with the specified arguments.
         """
         self = _mock_self
+        self._check_recorded('awaits')
         if self.await_args is None:
             expected = self._format_mock_call_signature(args, kwargs)
             raise AssertionError(f'Expected await: {expected}\nNot awaited')
@@ -2452,13 +4391,15 @@ class AsyncMockMixin(Base):
         Assert the mock has ever been awaited with the specified arguments.
         """
         self = _mock_self
+        self._check_recorded('awaits')
         expected = self._call_matcher(_Call((args, kwargs), two=True))
         cause = expected if isinstance(expected, Exception) else None
-        actual = [self._call_matcher(c) for c in self.await_args_list]
+        actual = self._matched_calls(self.await_args_list, 'await_args_list')
         if cause or expected not in _AnyComparer(actual):
             expected_string = self._format_mock_call_signature(args, kwargs)
             raise AssertionError(
-                '%s await not found' % expected_string
+                '%s await not found%s' % (
+                    expected_string, self._evicted_repr(self.await_args_list))
             ) from cause
 
     def assert_has_awaits(_mock_self, calls, any_order=False):
@@ -2474,9 +4415,11 @@ class AsyncMockMixin(Base):
         they must all appear in :attr:`await_args_list`.
         """
         self = _mock_self
+        self._check_recorded('awaits', sampled=False)
         expected = [self._call_matcher(c) for c in calls]
         cause = cause = next((e for e in expected if isinstance(e, Exception)), None)
-        all_awaits = _CallList(self._call_matcher(c) for c in self.await_args_list)
+        all_awaits = _CallList(
+            self._matched_calls(self.await_args_list, 'await_args_list'))
         if not any_order:
             if expected not in all_awaits:
                 if cause is None:
@@ -2490,20 +4433,15 @@ class AsyncMockMixin(Base):
                     f'{problem}\n'
                     f'Expected: {_CallList(calls)}\n'
                     f'Actual: {self.await_args_list}'
+                    f'{self._evicted_repr(self.await_args_list)}'
                 ) from cause
             return
 
-        all_awaits = list(all_awaits)
-
-        not_found = []
-        for kall in expected:
-            try:
-                all_awaits.remove(kall)
-            except ValueError:
-                not_found.append(kall)
+        not_found, _ = _match_any_order(list(all_awaits), expected)
         if not_found:
             raise AssertionError(
-                '%r not all found in await list' % (tuple(not_found),)
+                '%r not all found in await list%s' % (
+                    tuple(not_found), self._evicted_repr(self.await_args_list))
             ) from cause
 
     def assert_not_awaited(_mock_self):
@@ -2523,7 +4461,7 @@ class AsyncMockMixin(Base):
         super().reset_mock(*args, **kwargs)
         self.await_count = 0
         self.await_args = None
-        self.await_args_list = _CallList()
+        self.await_args_list = _await_list(self)
 
 
 class AsyncMock(AsyncMockMixin, AsyncMagicMixin, Mock):
@@ -2622,6 +4560,11 @@ class _Call(tuple):
 
     If the _Call has no name then it will match any name.
     """
+    # what the calls mocks record are left with, see _recorded_call
+    _mock_name = None
+    _mock_parent = None
+    _mock_from_kall = True
+
     def __new__(cls, value=(), name='', parent=None, two=False,
                 from_kall=True):
         args = ()
@@ -2662,6 +4605,35 @@ class _Call(tuple):
 
 
     def __eq__(self, other):
+        if isinstance(other, _Call):
+            # both already have the shape __new__ gives calls, so there is
+            # nothing to work out before comparing. Attributes are looked up
+            # past __getattribute__, which is slow.
+            parent = _call_attribute(self, '_mock_parent')
+            if parent:
+                other_parent = _call_attribute(other, '_mock_parent')
+                if (other_parent and other_parent is not parent and
+                        parent != other_parent):
+                    return False
+            if len(self) == 2:
+                self_args, self_kwargs = self
+                if len(other) == 2:
+                    other_args, other_kwargs = other
+                else:
+                    _, other_args, other_kwargs = other
+            else:
+                self_name, self_args, self_kwargs = self
+                if len(other) == 2:
+                    if self_name:
+                        return False
+                    other_args, other_kwargs = other
+                else:
+                    other_name, other_args, other_kwargs = other
+                    if self_name and other_name != self_name:
+                        return False
+            # this order is important for ANY to work!
+            return (other_args, other_kwargs) == (self_args, self_kwargs)
+
         try:
             len_other = len(other)
         except TypeError:
@@ -2788,6 +4760,19 @@ class _Call(tuple):
         return _CallList(reversed(vals))
 
 
+def _recorded_call(value):
+    """
+    Return a call as recorded by a mock, from `(args, kwargs)` for the calls
+    made to the mock itself or `(name, args, kwargs)` for its mock_calls and
+    method_calls. It has no name or parent to chain further calls from, so it
+    is left with the class defaults for them and doesn't need an instance
+    dict, which about halves its size.
+    """
+    return tuple.__new__(_Call, value)
+
+
+_call_attribute = tuple.__getattribute__
+
 call = _Call(from_kall=False)
 
 
@@ -2826,8 +4811,10 @@ def create_autospec(spec, spec_set=False, instance=False, _parent=None,
     is_async_func = _is_async_func(spec)
 
     entries = [(entry, _missing) for entry in dir(spec)]
-    if is_type and instance and HAS_DATACLASSES and is_dataclass(spec):
-        dataclass_fields = fields(spec)
+    dataclass_fields = None
+    if is_type and instance:
+        dataclass_fields = _get_dataclass_fields(spec)
+    if dataclass_fields is not None:
         entries.extend((f.name, f.type) for f in dataclass_fields)
         _kwargs = {'spec': [f.name for f in dataclass_fields]}
     else:
@@ -2881,6 +4868,7 @@ def create_autospec(spec, spec_set=False, instance=False, _parent=None,
 
     if _parent is not None and not instance:
         _parent._mock_children[_name] = mock
+        _signatures_changed(_parent)
 
     # Pop wraps from kwargs because it must not be passed to configure_mock.
     wrapped = kwargs.pop('wraps', None)
@@ -2942,6 +4930,8 @@ def create_autospec(spec, spec_set=False, instance=False, _parent=None,
         # setting as an instance attribute?
         if isinstance(new, FunctionTypes):
             setattr(mock, entry, new)
+    # once for all the children added
+    _signatures_changed(_extract_mock(mock))
     # kwargs are passed with respect to the parent mock so, they are not used
     # for creating return_value of the parent mock. So, this condition
     # should be true only for the parent mock if kwargs are given.
@@ -2951,6 +4941,14 @@ def create_autospec(spec, spec_set=False, instance=False, _parent=None,
     return mock
 
 
+def _get_dataclass_fields(spec):
+    # dataclasses has to have been imported already to make a dataclass
+    dataclasses = sys.modules.get('dataclasses')
+    if dataclasses is None or not dataclasses.is_dataclass(spec):
+        return None
+    return dataclasses.fields(spec)
+
+
 def _must_skip(spec, entry, is_type):
     """
     Return whether we should skip the first argument on spec's `entry`
@@ -3228,15 +5226,390 @@ def seal(mock):
             seal(m)
 
 
+TimedCall = namedtuple('TimedCall', 'call time thread task')
+
+
+def timed_calls(mock):
+    """Return the calls made to `mock` as `TimedCall` tuples, oldest first.
+
+    `mock` must have been created with `_mock_record='timed'`. Each tuple has the
+    `call`, as in `call_args_list`, the `time` it was made at from
+    `time.perf_counter_ns()` (`time.perf_counter()` in nanoseconds on Python
+    3.6), the identifier of the `thread` it was made from
+    and the asyncio `task` it was made from, or None. Like `call_args_list`
+    it starts over on `reset_mock` and is limited by `_mock_max_calls`.
+    """
+    mock = _extract_mock(mock)
+    if mock._mock_record != 'timed':
+        raise ValueError(
+            f"{mock._extract_mock_name()} doesn't record when it is called, "
+            f"create it with _mock_record='timed'")
+    __dict__ = mock.__dict__
+    log = __dict__.get('_mock_call_log')
+    if log is None:
+        return []
+    since = __dict__.get('_mock_calls_since')
+    with _TreeLock(mock):
+        entries = list(log.timed_entries(log.first()))
+    return [TimedCall(_recorded_call((args, kwargs)), at, thread, task)
+            for seq, args, kwargs, at, thread, task in entries
+            if since is None or seq > since]
+
+
+def call_intervals(mock):
+    """Return the nanoseconds between each call made to `mock` and the next.
+
+    `mock` must have been created with `_mock_record='timed'`.
+    """
+    times = [timed.time for timed in timed_calls(mock)]
+    return [b - a for a, b in zip(times, times[1:])]
+
+
+def calls_per_window(mock, window):
+    """Return the number of calls made to `mock` in each `window` nanoseconds.
+
+    The result is a dict from the index of each window to its count, in
+    order. The windows are consecutive and start with the first call, so the
+    first index is 0, and windows with no calls are left out. `mock` must have
+    been created with `_mock_record='timed'`.
+    """
+    if window <= 0:
+        raise ValueError(f'window must be positive, got {window}')
+    counts = {}
+    start = None
+    for timed in timed_calls(mock):
+        if start is None:
+            start = timed.time
+        index = (timed.time - start) // window
+        counts[index] = counts.get(index, 0) + 1
+    return counts
+
+
+class _Checkpoint(object):
+    """A point in the calls made to a mock, returned by `checkpoint`."""
+    __slots__ = ('mock', 'seq', '__weakref__')
+
+    def __init__(self, mock, seq):
+        self.mock = mock
+        # the sequence number of the last call logged before it was taken
+        self.seq = seq
+
+    def __repr__(self):
+        return f'<checkpoint of {self.mock._extract_mock_name()!r}>'
+
+
+def _later(seq, other):
+    # sequence numbers, None being before any call
+    if seq is None:
+        return other
+    if other is None:
+        return seq
+    return max(seq, other)
+
+
+def checkpoint(mock):
+    """Return a checkpoint of the calls made so far to `mock`.
+
+    Pass it to `calls_since` or as the `since` argument of `assert_has_calls`
+    to only look at the calls made after it, or to `release_history`, which
+    keeps the calls made after the oldest checkpoint still in use."""
+    mock = _extract_mock(mock)
+    point = _Checkpoint(mock, _last_call)
+    mock._mock_checkpoints.add(point)
+    return point
+
+
+def calls_since(mock, point):
+    """Return the calls in the `mock_calls` of `mock` made after `point`.
+
+    `point` is a checkpoint returned by `checkpoint`, of this or any other
+    mock."""
+    return _CallList(_since_view(_extract_mock(mock), point))
+
+
+def _since_view(mock, point):
+    since = _later(point.seq, mock.__dict__.get('_mock_calls_since'))
+    return _CallView(mock, 1, since=since)
+
+
+def release_history(mock):
+    """Drop the calls made to `mock` and the mocks below it before the oldest
+    live checkpoint of `mock`, so that the memory they use can be reclaimed.
+
+    The call lists of these mocks only keep the calls made after it, like
+    after `reset_mock` but leaving `called` and `call_count` alone. The
+    `mock_calls` and `method_calls` of the mocks above `mock` keep all the
+    calls, as they would if the calls were copied to them as they were made:
+    release the history of the mock at the top to drop them everywhere.
+    Without a live checkpoint nothing is dropped."""
+    mock = _extract_mock(mock)
+    points = mock.__dict__.get('_mock_checkpoints')
+    if not points:
+        return
+    seqs = [point.seq for point in points]
+    if None in seqs:
+        # taken before any call
+        return
+    seq = min(seqs)
+
+    nodes = {}
+    stack = [mock]
+    while stack:
+        node = stack.pop()
+        if id(node) in nodes:
+            continue
+        nodes[id(node)] = node
+        for child in node.__dict__.get('_mock_children', {}).values():
+            if isinstance(child, _SpecState) or child is _deleted:
+                continue
+            stack.append(_extract_mock(child))
+        ret = node._mock_return_value
+        if _is_instance_mock(ret):
+            stack.append(ret)
+
+    for node in nodes.values():
+        __dict__ = node.__dict__
+        log = __dict__.get('_mock_call_log')
+        if log is not None:
+            _update_other_views(log, nodes)
+            with _TreeLock(node):
+                log.release(seq)
+        if '_mock_call_sources' in __dict__:
+            __dict__['_mock_calls_since'] = _later(
+                seq, __dict__.get('_mock_calls_since'))
+            if node._mock_delegate is None:
+                _detach_call_view(node, '_mock_call_args_list')
+                _detach_call_view(node, '_mock_mock_calls')
+            _detach_call_view(node, '_mock_method_calls')
+
+
+def _template_nodes(root):
+    """
+    Return the mocks making up the tree under `root` keyed by id, or None if
+    the tree holds something that can't be copied.
+    """
+    if not _is_instance_mock(root):
+        return None
+    nodes = {id(root): root}
+    stack = [root]
+    while stack:
+        mock = stack.pop()
+        if mock._mock_delegate is not None:
+            # delegates are functions wrapping the mock
+            return None
+        if _is_iterator_side_effect(mock):
+            try:
+                copy.copy(mock._mock_side_effect)
+            except TypeError:
+                # such as generators
+                return None
+        found = []
+        for name, value in mock.__dict__.items():
+            if name in _all_magics and not _is_instance_mock(value):
+                # a function bound to this mock
+                return None
+            if name == '_mock_children':
+                found.extend(value.values())
+            elif name not in ('_mock_parent', '_mock_new_parent'):
+                found.append(value)
+        _type = type(mock)
+        if not _type.__dict__.get('_mock_shared_class'):
+            for name, value in _type.__dict__.items():
+                if name != '_mock_owner' and _is_instance_mock(value):
+                    nodes.setdefault(id(value), value)
+                    stack.append(value)
+        for value in found:
+            if id(value) in nodes:
+                continue
+            if not _is_instance_mock(value):
+                wrapped = _extract_mock(value)
+                if wrapped is not value and (
+                        wrapped._mock_new_parent is mock or
+                        wrapped._mock_parent is mock):
+                    # a function made by create_autospec for a child
+                    return None
+                continue
+            if (value._mock_new_parent is mock or
+                    value._mock_parent is mock):
+                nodes[id(value)] = value
+                stack.append(value)
+    return nodes
+
+
+def _is_iterator_side_effect(mock):
+    # iterables set as side_effect are stored as an iterator over them
+    side_effect = mock.__dict__.get('_mock_side_effect')
+    return (not _is_instance_mock(side_effect) and
+            hasattr(type(side_effect), '__next__'))
+
+
+def _empty_copy(calls):
+    new = copy.copy(calls)
+    new.clear()
+    return new
+
+
+_template_copiers = {
+    '_mock_await_args_list': _empty_copy,
+    '__kwdefaults__': dict,
+    '_mock_calls_events': list,
+    '_mock_calls_events_lock': lambda lock: threading.Lock(),
+}
+
+# copies start with no calls recorded, whatever was done to the template
+_template_resets = {
+    '_mock_called': False,
+    '_mock_call_count': 0,
+    '_mock_call_args': None,
+    '_mock_await_count': 0,
+    '_mock_await_args': None,
+}
+
+
+class _TemplateNode(object):
+    """How to copy one mock of a template, worked out once up front."""
+
+    def __init__(self, mock, nodes):
+        self.id = id(mock)
+        _type = type(mock)
+        type_dict = _type.__dict__
+        self.type = self.bases = self.ns = None
+        self.class_mocks = []
+        if type_dict.get('_mock_shared_class'):
+            self.type = _type
+        else:
+            self.bases = _type.__bases__
+            self.ns = {}
+            for name, value in type_dict.items():
+                if name in ('__dict__', '__weakref__', '_mock_owner'):
+                    continue
+                if id(value) in nodes:
+                    # may refer back to this mock, so set once it exists
+                    self.class_mocks.append((name, id(value)))
+                else:
+                    self.ns[name] = value
+        self.owner = '_mock_owner' in type_dict
+
+        self.values = {}
+        self.mocks = []
+        self.copied = []
+        self.children = None
+        for name, value in mock.__dict__.items():
+            if name == '_mock_children':
+                self.children = [
+                    (key, id(child) if id(child) in nodes else None, child)
+                    for key, child in value.items()
+                ]
+            elif name in _lazy_names:
+                # recreated on first use
+                continue
+            elif id(value) in nodes:
+                self.mocks.append((name, id(value)))
+            elif name in _template_resets:
+                self.values[name] = _template_resets[name]
+            elif name in _template_copiers:
+                self.copied.append((name, _template_copiers[name], value))
+            elif (name == '_mock_side_effect' and
+                    _is_iterator_side_effect(mock)):
+                self.copied.append((name, copy.copy, value))
+            else:
+                self.values[name] = value
+
+
+    def copy(self, plan, memo):
+        _type = self.type
+        if _type is None:
+            _type = _make_mock_class(self.bases, self.ns)
+        new = object.__new__(_type)
+        memo[self.id] = new
+        if self.owner and self.type is None:
+            _type._mock_owner = new
+
+        def get(node_id):
+            if node_id in memo:
+                return memo[node_id]
+            return plan[node_id].copy(plan, memo)
+
+        __dict__ = new.__dict__
+        __dict__.update(self.values)
+        for name, node_id in self.mocks:
+            __dict__[name] = get(node_id)
+        for name, copier, value in self.copied:
+            __dict__[name] = copier(value)
+        if self.children is not None:
+            children = __dict__['_mock_children'] = {}
+            for key, node_id, child in self.children:
+                if node_id is not None:
+                    child = get(node_id)
+                elif isinstance(child, _SpecState):
+                    parent = child.parent
+                    if id(parent) in plan:
+                        parent = get(id(parent))
+                    child = _SpecState(
+                        child.spec, child.spec_set, parent,
+                        child.name, child.ids, child.instance
+                    )
+                children[key] = child
+        for name, node_id in self.class_mocks:
+            setattr(_type, name, get(node_id))
+        return new
+
+
+class MockTemplate(object):
+    """
+    Build a configured mock once and make independent copies of it.
+
+    The template is given a mock class, or anything else returning a mock
+    such as `create_autospec`, along with the arguments to create the mock
+    with:
+
+    >>> template = MockTemplate(MagicMock, spec=SomeClass,
+    ...                         **{'method.return_value': 3})
+    >>> mock = template.instantiate()
+
+    Each call to `instantiate` returns a new mock with the same spec, child
+    mocks and configuration as the one built by the template, and with no
+    calls recorded. Copying is much faster than creating the mocks again.
+    The copies share configured values, such as return values that are not
+    mocks, but nothing else. Each copy iterates over iterables set as a
+    `side_effect` from the start.
+
+    Some mocks can't be copied, such as the functions `create_autospec`
+    returns for a function spec, mocks with magic methods set to plain
+    functions and mocks with a generator as `side_effect`. For those
+    `instantiate` creates the mock again from the arguments."""
+
+    def __init__(self, factory, *args, **kwargs):
+        self.factory = factory
+        self.args = args
+        self.kwargs = kwargs
+        mock = factory(*args, **kwargs)
+        nodes = _template_nodes(mock)
+        if nodes is None:
+            self._plan = None
+        else:
+            self._plan = {
+                node_id: _TemplateNode(node, nodes)
+                for node_id, node in nodes.items()
+            }
+            self._root = self._plan[id(mock)]
+
+
+    def instantiate(self):
+        """Return a new copy of the mock."""
+        if self._plan is None:
+            return self.factory(*self.args, **self.kwargs)
+        return self._root.copy(self._plan, {})
+
+
 class _AsyncIterator:
     """
     Wraps an iterator in an asynchronous iterator.
     """
+    __code__ = _LazyAttribute(_iterator_code_mock)
+
     def __init__(self, iterator):
         self.iterator = iterator
-        code_mock = NonCallableMock(spec_set=CodeType)
-        code_mock.co_flags = inspect.CO_ITERABLE_COROUTINE
-        self.__dict__['__code__'] = code_mock
 
     async def __anext__(self):
         try:
@@ -5,13 +5,20 @@ import inspect
 import re
 import unittest
 from contextlib import contextmanager
+from types import CodeType
 
 from mock import (ANY, call, AsyncMock, patch, MagicMock, Mock,
-                  create_autospec, sentinel, seal)
+                  create_autospec, sentinel, seal, timed_calls)
 from mock.backports import IsolatedAsyncioTestCase, iscoroutinefunction, set_event_loop_policy
 from mock.mock import _CallList
 
 
+try:
+    from asyncio import current_task
+except ImportError:
+    current_task = asyncio.Task.current_task
+
+
 try:
     from asyncio import run
 except ImportError:
@@ -201,6 +208,30 @@ class AsyncMockTest(unittest.TestCase):
         self.assertTrue(iscoroutinefunction(mock))
         self.assertTrue(inspect.iscoroutinefunction(mock))
 
+    def test_code_created_on_access(self):
+        mock = AsyncMock()
+        self.assertNotIn('__code__', mock.__dict__)
+        code = mock.__code__
+        self.assertIs(mock.__code__, code)
+        self.assertIsInstance(code, CodeType)
+        self.assertTrue(code.co_flags & inspect.CO_COROUTINE)
+        self.assertEqual(code.co_varnames, ('args', 'kwargs'))
+        self.assertIsNot(AsyncMock().__code__, code)
+
+        mock.__code__ = sentinel.code
+        self.assertIs(mock.__code__, sentinel.code)
+        del mock.__code__
+        self.assertIsNot(mock.__code__, code)
+        self.assertRaises(AttributeError, getattr, AsyncMock, '__code__')
+
+    def test_iterator_code_created_on_access(self):
+        iterator = MagicMock().__aiter__()
+        self.assertNotIn('__code__', iterator.__dict__)
+        code = iterator.__code__
+        self.assertIs(iterator.__code__, code)
+        self.assertTrue(code.co_flags & inspect.CO_ITERABLE_COROUTINE)
+        self.assertIsNot(MagicMock().__aiter__().__code__, code)
+
     def test_future_isfuture(self):
         loop = asyncio.new_event_loop()
         fut = loop.create_future()
@@ -580,6 +611,67 @@ class AsyncArguments(IsolatedAsyncioTestCase):
         self.assertEqual(async_mock.await_args_list, [call(1), call(2)])
         self.assertEqual(async_mock.call_args_list, [call(2), call(1)])
 
+    async def test_max_calls(self):
+        mock = AsyncMock(_mock_max_calls=2)
+        for i in range(4):
+            await mock(i)
+        self.assertEqual(mock.await_count, 4)
+        self.assertEqual(mock.await_args, call(3))
+        self.assertEqual(mock.await_args_list, [call(2), call(3)])
+        mock.assert_any_await(2)
+        with self.assertRaisesRegex(AssertionError, '2 earlier calls'):
+            mock.assert_any_await(0)
+        with self.assertRaisesRegex(AssertionError, '2 earlier calls'):
+            mock.assert_has_awaits([call(1), call(2)])
+        mock.reset_mock()
+        await mock(5)
+        self.assertEqual(mock.await_args_list, [call(5)])
+
+    async def test_record_count(self):
+        mock = AsyncMock(_mock_record='count')
+        await mock(1)
+        await mock(2)
+        self.assertEqual(mock.await_count, 2)
+        self.assertEqual(mock.call_count, 2)
+        self.assertIsNone(mock.await_args)
+        self.assertEqual(mock.await_args_list, [])
+        mock.assert_awaited()
+        with self.assertRaisesRegex(AssertionError, "_mock_record='count'"):
+            mock.assert_awaited_with(2)
+        with self.assertRaisesRegex(AssertionError, "_mock_record='count'"):
+            mock.assert_any_await(1)
+
+    async def test_sample_every(self):
+        mock = AsyncMock(_mock_sample_every=2)
+        for i in range(5):
+            await mock(i)
+        self.assertEqual(mock.await_count, 5)
+        self.assertEqual(mock.await_args_list, [call(0), call(2), call(4)])
+        self.assertEqual(mock.call_args_list, [call(0), call(2), call(4)])
+        mock.assert_awaited_with(4)
+        mock.assert_any_await(2)
+        with self.assertRaisesRegex(AssertionError, '_mock_sample_every=2'):
+            mock.assert_any_await(1)
+        with self.assertRaisesRegex(AssertionError, '_mock_sample_every=2'):
+            mock.assert_has_awaits([call(0)])
+
+    async def test_record_timed(self):
+        mock = AsyncMock(_mock_record='timed')
+        first = asyncio.ensure_future(mock(1))
+        second = asyncio.ensure_future(mock(2))
+        await first
+        await second
+        timed = timed_calls(mock)
+        self.assertEqual([t.call for t in timed], [call(1), call(2)])
+        self.assertEqual([t.task for t in timed], [current_task()] * 2)
+        await asyncio.ensure_future(self._call(mock, 3))
+        task = timed_calls(mock)[-1].task
+        self.assertIsNotNone(task)
+        self.assertIsNot(task, current_task())
+
+    async def _call(self, mock, arg):
+        await mock(arg)
+
 
 class AsyncMagicMethods(unittest.TestCase):
     def test_async_magic_methods_return_async_mocks(self):
@@ -1130,6 +1222,38 @@ class AsyncMockAssert(unittest.TestCase):
             self.mock.assert_has_awaits([call(), call(1, 2)])
         self.assertIsInstance(cm.exception.__cause__, TypeError)
 
+    def test_awaits_matched_once(self):
+        async def f(a, b=None): pass
+
+        self.mock = AsyncMock(spec=f)
+        for i in range(10):
+            run(self._runnable_test(i, b=i))
+
+        matched = []
+        matcher = self.mock._call_matcher
+        def counting(_call):
+            matched.append(_call)
+            return matcher(_call)
+        self.mock._call_matcher = counting
+
+        self.mock.assert_any_await(a=3, b=3)
+        self.mock.assert_has_awaits([call(1, 1), call(2, 2)])
+        self.mock.assert_has_awaits([call(a=9, b=9)], any_order=True)
+        self.mock.assert_awaited_with(9, 9)
+        self.mock.assert_awaited_with(a=9, b=9)
+        # await_args_list is matched once, then only what is expected, and
+        # await_args along with it each time, as for a single call that is
+        # no slower than looking it up
+        self.assertEqual(len(matched), 10 + 1 + 2 + 1 + 2 * 2)
+
+        del matched[:]
+        run(self._runnable_test(10))
+        self.mock.assert_any_await(a=10)
+        self.assertEqual(len(matched), 2)
+        self.mock.reset_mock()
+        with self.assertRaises(AssertionError):
+            self.mock.assert_any_await(10)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,76 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from mock.benchmarks import macro, micro, runner, startup, threads
+
+
+# one or two of each kind, the full set is run by python -m mock.benchmarks
+SMOKE = [
+    'construct.MagicMock',
+    'call.nested',
+    'assert.any_call-loop-10k',
+    'contains.repeated-calls-100k',
+    'patch.object',
+    'threads.call-shared',
+    'macro.magic-mock-tree',
+]
+
+
+class BenchmarkTest(unittest.TestCase):
+
+    def test_benchmarks_run(self):
+        benchmarks = [runner.BENCHMARKS[name] for name in SMOKE]
+        for bench in benchmarks:
+            with self.subTest(bench=bench.name):
+                results = runner.run([bench], repeat=1, quick=True)
+                targets = ['mock', 'unittest.mock'] if bench.stdlib else ['mock']
+                self.assertEqual([r['target'] for r in results], targets)
+                for result in results:
+                    self.assertEqual(result['name'], bench.name)
+                    self.assertGreater(result['best_ns'], 0)
+
+
+    def test_benchmarks_registered(self):
+        names = [bench.name for bench in runner.select()]
+        for name in SMOKE + ['macro.patch-autospec-suite', 'startup.import']:
+            self.assertIn(name, names)
+
+
+    def test_select(self):
+        names = [bench.name for bench in runner.select(['construct.'])]
+        self.assertIn('construct.Mock', names)
+        self.assertTrue(all(name.startswith('construct.') for name in names))
+        self.assertEqual(names, sorted(names))
+
+
+    def test_duplicate_name(self):
+        with self.assertRaises(ValueError):
+            runner.benchmark('construct.Mock')(lambda mock, quick: None)
+
+
+    def test_main_json(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'results.json')
+            out = io.StringIO()
+            with contextlib.redirect_stdout(out):
+                runner.main(['-k', 'construct.Mock', '--quick',
+                             '--target', 'mock', '--json', path])
+            with open(path) as f:
+                data = json.load(f)
+
+        self.assertIn('construct.Mock ', out.getvalue())
+        self.assertEqual(data['metadata']['quick'], True)
+        self.assertIn('python', data['metadata'])
+        results = data['results']
+        self.assertEqual({r['target'] for r in results}, {'mock'})
+        self.assertIn('construct.Mock', [r['name'] for r in results])
+        for key in 'best_ns', 'median_ns', 'mean_ns', 'ops', 'kind':
+            self.assertIn(key, results[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
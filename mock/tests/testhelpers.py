@@ -1,13 +1,21 @@
+import asyncio
+import copy
 import inspect
+import pickle
+import threading
 import time
 import types
 import unittest
+from functools import wraps
 
 from mock import (
-    call, create_autospec, MagicMock,
-    Mock, ANY, patch, PropertyMock
+    call, create_autospec, MagicMock, AsyncMock,
+    Mock, ANY, patch, PropertyMock, MockTemplate, sentinel
+)
+from mock.mock import (
+    _Call, _CallList, _recorded_call, _callable, _get_signature_object,
+    _WeakIdCache
 )
-from mock.mock import _Call, _CallList, _callable
 from mock import IS_PYPY
 
 try:
@@ -15,6 +23,17 @@ try:
 except ImportError:
     pass
 
+try:
+    from asyncio import run
+except ImportError:
+    def run(main):
+        loop = asyncio.new_event_loop()
+        try:
+            return_value = loop.run_until_complete(main)
+        finally:
+            loop.close()
+        return return_value
+
 from datetime import datetime
 from functools import partial
 from typing import ClassVar
@@ -366,6 +385,61 @@ class CallTest(unittest.TestCase):
         self.assertEqual(_Call((('bar', 'barz'),),)[0], '')
         self.assertEqual(_Call((('bar', 'barz'), {'hello': 'world'}),)[0], '')
 
+    def test_recorded_call(self):
+        m = Mock()
+        m(1, a=2)
+        m.foo(3)
+        for recorded, expected in [(m.call_args, call(1, a=2)),
+                                   (m.call_args_list[0], call(1, a=2)),
+                                   (m.mock_calls[1], call.foo(3)),
+                                   (m.method_calls[0], call.foo(3))]:
+            self.assertIs(type(recorded), _Call)
+            self.assertEqual(vars(recorded), {})
+            self.assertEqual(recorded, expected)
+            self.assertEqual(expected, recorded)
+            self.assertEqual(recorded.args, expected.args)
+            self.assertEqual(recorded.kwargs, expected.kwargs)
+            self.assertEqual(repr(recorded), repr(expected))
+            self.assertEqual(copy.copy(recorded), expected)
+            self.assertEqual(pickle.loads(pickle.dumps(recorded)), expected)
+        self.assertEqual(m.call_args, ((1,), {'a': 2}))
+        self.assertEqual(m.mock_calls[1], ('foo', (3,), {}))
+        self.assertEqual(m.call_args.call_list(), [call(1, a=2)])
+
+    def test_recorded_call_compared_on_the_right(self):
+        m = Mock()
+        m.a(1)
+        # the call on the left decides, as for any other _Call
+        self.assertTrue(call(1) == m.mock_calls[0])
+        self.assertEqual(call(1), m.method_calls[0])
+        self.assertFalse(call.a(1) == m.a.call_args)
+        self.assertTrue(m.a.call_args == call.a(1))
+
+    def test_call_eq_shapes(self):
+        calls = [
+            _Call(((), {}), two=True), _Call(((1,), {}), two=True),
+            _Call(((), {'a': 1}), two=True), _Call(('', (1,), {})),
+            _Call(('foo', (), {})), _Call(('foo', (1,), {})),
+            _Call(('bar', (1,), {})), _Call(('foo', (1,), {'a': 1})),
+            _recorded_call(((1,), {})), _recorded_call(('foo', (1,), {})),
+            _recorded_call(('', (), {'a': 1})),
+        ]
+        for one in calls:
+            for other in calls:
+                # the same as comparing with a tuple of the same shape
+                self.assertEqual(_Call.__eq__(one, other),
+                                 _Call.__eq__(one, tuple(other)),
+                                 (one, other))
+
+        self.assertEqual(_Call(('foo', (ANY,), {'a': ANY})),
+                         _recorded_call(('foo', (1,), {'a': 2})))
+        self.assertEqual(_recorded_call(('foo', (1,), {'a': 2})),
+                         _Call(('foo', (ANY,), {'a': ANY})))
+        self.assertEqual(call.foo(1), call.foo(1))
+        self.assertNotEqual(call.foo(1).bar(2), call.baz(1).bar(2))
+        self.assertEqual(call.foo(1).bar(2),
+                         _recorded_call(('foo().bar', (2,), {})))
+
     def test_dunder_call(self):
         m = MagicMock()
         m().foo()['bar']()
@@ -1050,6 +1124,133 @@ class SpecSignatureTest(unittest.TestCase):
         self.assertEqual(mock.mock_calls, [])
         self.assertEqual(rv.mock_calls, [])
 
+    def test_signature_cache(self):
+        def f(a, b): pass
+        _get_signature_object.cache_clear()
+        self.addCleanup(_get_signature_object.cache_clear)
+
+        create_autospec(f)
+        info = _get_signature_object.cache_info()
+        self.assertEqual((info.misses, info.currsize), (1, 1))
+        mock = create_autospec(f)
+        second = _get_signature_object.cache_info()
+        self.assertEqual((second.misses, second.currsize), (1, 1))
+        self.assertGreater(second.hits, info.hits)
+        self.assertRaises(TypeError, mock, 1)
+
+        # a signature changed in place is picked up
+        f.__signature__ = inspect.signature(lambda a: None)
+        create_autospec(f)(1)
+        del f.__signature__
+        self.assertRaises(TypeError, create_autospec(f), 1)
+
+        # as are changes to what the signature of a function is made from
+        f.__defaults__ = (5,)
+        create_autospec(f)(1)
+        f.__defaults__ = None
+        self.assertRaises(TypeError, create_autospec(f), 1)
+        f.__kwdefaults__ = {'c': 1}
+        f.__code__ = (lambda a, b, *, c: None).__code__
+        create_autospec(f)(1, 2)
+        f.__annotations__ = {'a': int}
+        self.assertEqual(
+            str(_get_signature_object(f, False, False)[1]),
+            '(a: int, b, *, c=1)')
+        f.__code__ = (lambda a, b: None).__code__
+        f.__kwdefaults__ = None
+        f.__annotations__ = {}
+
+        # as is one that comes from what is wrapped
+        @wraps(f)
+        def g(*args): pass
+        self.assertRaises(TypeError, create_autospec(g), 1)
+        g.__wrapped__ = lambda a: None
+        create_autospec(g)(1)
+        f.__wrapped__ = lambda: None
+        g.__wrapped__ = f
+        create_autospec(g)()
+
+        _get_signature_object.cache_clear()
+        self.assertEqual(_get_signature_object.cache_info().currsize, 0)
+
+    def test_signature_cache_threads(self):
+        def f(a, b): pass
+        _get_signature_object.cache_clear()
+        self.addCleanup(_get_signature_object.cache_clear)
+        errors = []
+        def autospec():
+            try:
+                for _ in range(200):
+                    create_autospec(f)(1, 2)
+                    _get_signature_object(f, False, False)
+            except Exception as e:  # pragma: no cover
+                errors.append(e)
+        threads = [threading.Thread(target=autospec) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(_get_signature_object.cache_info().currsize, 1)
+
+
+    def test_signature_cache_keys(self):
+        class Foo(object):
+            def meth(self, a): pass
+        _get_signature_object.cache_clear()
+        self.addCleanup(_get_signature_object.cache_clear)
+
+        # bound methods are keyed on their function
+        first = _get_signature_object(Foo().meth, False, False)
+        second = _get_signature_object(Foo().meth, False, False)
+        self.assertIs(first[1], second[1])
+        self.assertEqual(_get_signature_object.cache_info().hits, 1)
+
+        # skipping the first argument is cached separately
+        self.assertEqual(str(_get_signature_object(Foo.meth, False, True)[1]),
+                         '(a)')
+        self.assertEqual(str(_get_signature_object(Foo.meth, False, False)[1]),
+                         '(self, a)')
+
+        # so are builtins, which can't be weakly referenced
+        hits = _get_signature_object.cache_info().hits
+        _get_signature_object(Foo, False, False)
+        _get_signature_object(Foo, False, False)
+        self.assertEqual(_get_signature_object.cache_info().hits, hits + 1)
+
+
+    def test_weak_id_cache(self):
+        class Foo(object): pass
+        cache = _WeakIdCache(maxsize=2)
+        one, two, three, four = Foo(), Foo(), Foo(), object()
+        cache.set(one, 1)
+        cache.set(one, 'key', key='key')
+        self.assertEqual(cache.get(one), 1)
+        self.assertEqual(cache.get(one, 'key'), 'key')
+        self.assertIsNone(cache.get(two))
+
+        # least recently used entries are evicted
+        cache.get(one)
+        cache.set(two, 2)
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get(one, 'key'))
+        self.assertEqual(cache.get(one), 1)
+
+        # entries go away with the object
+        del one
+        self.assertEqual(len(cache), 1)
+
+        # objects that can't be weakly referenced are skipped
+        cache.set(four, 3)
+        self.assertIs(cache.get(four, default=three), three)
+        strong = _WeakIdCache(maxsize=2, strong_fallback=True)
+        strong.set(four, 3)
+        self.assertEqual(strong.get(four), 3)
+
+        self.assertEqual(cache.info(), (4, 3, 2, 1))
+        cache.clear()
+        self.assertEqual(cache.info(), (0, 0, 2, 0))
+
     @pytest.mark.skipif(sys.version_info < (3, 7), reason="requires python 3.7 or higher")
     def test_dataclass_post_init(self):
         @dataclass
@@ -1152,6 +1353,64 @@ class TestCallList(unittest.TestCase):
         self.assertNotIn([call('fish')], mock.call_args_list)
 
 
+    def test_contains_subsequence(self):
+        calls = _CallList([call(1), call(2), call(1), call(2), call(3)])
+        self.assertIn([], calls)
+        self.assertIn([call(1), call(2), call(3)], calls)
+        self.assertIn([call(2), call(1)], calls)
+        self.assertNotIn([call(1), call(3)], calls)
+        self.assertNotIn([call(3), call(4)], calls)
+        self.assertNotIn(list(calls) + [call(4)], calls)
+
+        # ANY matches on either side, calls made being compared first
+        self.assertIn([call(ANY), call(3)], calls)
+        self.assertIn([call(2), call(1)], _CallList([call(2), call(ANY)]))
+        compared = []
+        class Item:
+            def __eq__(self, other):
+                compared.append(other)
+                return True
+        made = Item()
+        self.assertIn([1, 2], _CallList([made, made, 3]))
+        self.assertEqual(compared, [1, 2])
+        # whatever they hash as, even past the comparisons made in place
+        class Two(object):
+            def __eq__(self, other):
+                return other == 2
+            __hash__ = object.__hash__
+        ones = [call(1)] * 1000
+        self.assertIn(ones[:50] + [call(Two())], _CallList(ones + [call(2)]))
+        self.assertIn(ones[:50] + [call(2)], _CallList(ones + [call(Two())]))
+        self.assertNotIn(ones[:50] + [call(Two())], _CallList(ones))
+        arg = MagicMock()
+        self.assertIn(ones[:50] + [call(arg)], _CallList(ones + [call(arg)]))
+        self.assertNotIn(call.__hash__(), arg.mock_calls)
+
+        # histories of the same calls over and over
+        polls = _CallList([call.poll() for _ in range(1000)] + [call.done()])
+        self.assertIn([call.poll()] * 50 + [call.done()], polls)
+        self.assertNotIn([call.poll()] * 50 + [call.done(), call.poll()], polls)
+        self.assertNotIn([call.poll()] * 50 + [call.done(1)], polls)
+        self.assertNotIn([call.poll()] * 50 + [call.close()], polls)
+        self.assertIn([ANY] * 50 + [call.done()], polls)
+        self.assertNotIn([ANY] * 50 + [call.close()], polls)
+        # calls made without a name match calls with any name
+        polls = _CallList([call() for _ in range(1000)] + [call.done()])
+        self.assertIn([call()] * 50 + [call.done()], polls)
+        self.assertIn([call.poll()] * 50 + [call.done()], polls)
+        self.assertNotIn([call()] * 50 + [call.done(1)], polls)
+
+        # a view compared with another
+        mock = Mock()
+        for i in range(3):
+            mock(i)
+        self.assertIn(mock.call_args_list[1:], mock.call_args_list)
+        other = Mock()
+        other(1)
+        other(2)
+        self.assertIn(other.call_args_list, mock.call_args_list)
+
+
     def test_call_list_str(self):
         mock = Mock()
         mock(1, 2)
@@ -1260,5 +1519,144 @@ class TestCallablePredicate(unittest.TestCase):
         self.assertFalse(_callable(BadClassMethod.not_callable))
 
 
+class TestMockTemplate(unittest.TestCase):
+
+    def test_instantiate(self):
+        template = MockTemplate(MagicMock, name='foo', **{
+            'method.return_value': 3,
+            'other.side_effect': [1, 2],
+            'a.b.c.return_value.d.return_value': 4,
+            '__len__.return_value': 5,
+        })
+        one, two = template.instantiate(), template.instantiate()
+        self.assertIsNot(one, two)
+        self.assertIsNot(type(one), type(two))
+        self.assertIn("name='foo'", repr(one))
+        for mock in one, two:
+            self.assertEqual(mock.method(), 3)
+            self.assertEqual(mock.other(), 1)
+            self.assertEqual(mock.other(), 2)
+            self.assertEqual(mock.a.b.c().d(), 4)
+            self.assertEqual(len(mock), 5)
+        self.assertIsNot(one.a.b.c, two.a.b.c)
+        self.assertIs(one.a.b.c._mock_parent, one.a.b)
+        self.assertEqual(
+            one.mock_calls,
+            [call.method(), call.other(), call.other(),
+             call.a.b.c(), call.a.b.c().d(), call.__len__()]
+        )
+        self.assertEqual(one.method_calls, two.method_calls)
+
+        one.method.return_value = 6
+        one.__len__.return_value = 7
+        one.reset_mock()
+        self.assertEqual(two.method(), 3)
+        self.assertEqual(len(two), 5)
+        self.assertEqual(len(two.mock_calls), 8)
+        self.assertEqual(template.instantiate().mock_calls, [])
+
+
+    def test_instantiate_called(self):
+        def factory():
+            mock = MagicMock()
+            mock(1)
+            mock.method(2)
+            return mock
+
+        template = MockTemplate(factory)
+        mock = template.instantiate()
+        for m in mock, mock.method:
+            self.assertFalse(m.called)
+            self.assertEqual(m.call_count, 0)
+            self.assertIsNone(m.call_args)
+            self.assertEqual(m.call_args_list, [])
+        self.assertEqual(mock.mock_calls, [])
+        mock.method(3)
+        mock.method.assert_called_once_with(3)
+        self.assertEqual(mock.mock_calls, [call.method(3)])
+
+        def async_factory():
+            mock = AsyncMock()
+            run(mock(1))
+            return mock
+
+        mock = MockTemplate(async_factory).instantiate()
+        mock.assert_not_called()
+        mock.assert_not_awaited()
+        self.assertIsNone(mock.await_args)
+        self.assertEqual(mock.await_args_list, [])
+
+
+    def test_instantiate_with_spec(self):
+        class Foo(object):
+            attr = None
+            def __init__(self, a=None): pass  # pragma: no cover
+            def method(self, a, b=None): pass  # pragma: no cover
+
+        template = MockTemplate(MagicMock, spec_set=Foo,
+                                **{'method.return_value': 3})
+        mock = template.instantiate()
+        self.assertIsInstance(mock, Foo)
+        self.assertEqual(mock.method(1), 3)
+        self.assertRaises(AttributeError, getattr, mock, 'other')
+        self.assertRaises(AttributeError, setattr, mock, 'other', 1)
+
+        template = MockTemplate(create_autospec, Foo, instance=True,
+                                **{'method.return_value': 3})
+        one, two = template.instantiate(), template.instantiate()
+        self.assertEqual(one.method(1), 3)
+        self.assertRaises(TypeError, one.method)
+        one.method.assert_called_once_with(1)
+        two.method.assert_not_called()
+        self.assertEqual(two.mock_calls, [])
+        self.assertIsNot(one.attr, two.attr)
+
+        klass = MockTemplate(create_autospec, Foo).instantiate()
+        klass().method(1)
+        self.assertEqual(klass.mock_calls, [call(), call().method(1)])
+        with self.assertRaises(TypeError):
+            klass(1, 2)
+
+
+    @patch('mock.mock.SHARE_CLASSES', True)
+    def test_instantiate_shared_classes(self):
+        template = MockTemplate(MagicMock, **{'a.return_value': 1})
+        one, two = template.instantiate(), template.instantiate()
+        self.assertIs(type(one), type(two))
+        self.assertIs(type(one.a), type(two.a))
+        one.__len__.return_value = 3
+        self.assertEqual(len(one), 3)
+        self.assertEqual(len(two), 0)
+        self.assertEqual(two.a(), 1)
+
+
+    def test_instantiate_async(self):
+        template = MockTemplate(AsyncMock, return_value=sentinel.result)
+        one, two = template.instantiate(), template.instantiate()
+        self.assertEqual(run(one()), sentinel.result)
+        one.assert_awaited_once()
+        two.assert_not_awaited()
+        self.assertIsNot(one.__kwdefaults__, two.__kwdefaults__)
+
+
+    def test_instantiate_recreates(self):
+        def f(a): pass  # pragma: no cover
+        def values():
+            yield 1  # pragma: no cover
+        for template in [
+            MockTemplate(create_autospec, f),
+            MockTemplate(Mock, side_effect=values()),
+            MockTemplate(MagicMock, __str__=lambda self: 'foo'),
+        ]:
+            with self.subTest(template=template):
+                self.assertIsNone(template._plan)
+                self.assertIsNot(template.instantiate(),
+                                 template.instantiate())
+
+        mock = MockTemplate(MagicMock, __str__=lambda self: 'foo').instantiate()
+        self.assertEqual(str(mock), 'foo')
+        self.assertRaises(TypeError, MockTemplate(create_autospec, f).instantiate())
+
+
 if __name__ == '__main__':
     unittest.main()
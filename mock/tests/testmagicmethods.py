@@ -419,6 +419,24 @@ class TestMockingMagicMethods(unittest.TestCase):
         self.assertRaises(AttributeError, set_int)
 
 
+    def test_magic_methods_spec_without_hash(self):
+        mock = MagicMock(spec=['__eq__'])
+        self.assertEqual(hash(mock), object.__hash__(mock))
+        self.assertEqual(mock, mock)
+        self.assertRaises(TypeError, len, mock)
+
+
+    def test_magic_methods_configured_per_instance(self):
+        one, two = MagicMock(), MagicMock()
+        one.__len__.return_value = 3
+        one.__iter__ = lambda self: iter([self])
+        self.assertEqual(len(one), 3)
+        self.assertEqual(list(one), [one])
+        self.assertEqual(len(two), 0)
+        self.assertEqual(list(two), [])
+        self.assertIs(type(one).__len__, one.__len__)
+
+
     def test_setting_unsupported_magic_method(self):
         mock = MagicMock()
         def set_setattr():
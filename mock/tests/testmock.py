@@ -1,16 +1,22 @@
 import copy
+import gc
+import os
 import re
+import subprocess
 import sys
 import tempfile
+import threading
+import weakref
 
 import unittest
 from mock.tests.support import ALWAYS_EQ
 from mock.tests.support import is_instance
 from mock import (
-    call, DEFAULT, patch, sentinel,
+    ANY, call, DEFAULT, patch, sentinel,
     MagicMock, Mock, NonCallableMock,
-    NonCallableMagicMock, AsyncMock,
-    create_autospec, mock
+    NonCallableMagicMock, AsyncMock, PropertyMock,
+    create_autospec, mock, seal, timed_calls, call_intervals,
+    calls_per_window, checkpoint, calls_since, release_history
 )
 from mock.mock import _Call, _CallList, InvalidSpecError
 import mock.mock as mock_module
@@ -373,6 +379,80 @@ class MockTest(unittest.TestCase):
         self.assertFalse(mock.something.called, "child not reset")
 
 
+    def test_call_lists_created_on_use(self):
+        lazy = {'_mock_children', '_mock_call_args_list',
+                '_mock_mock_calls', '_mock_method_calls'}
+        mock = Mock()
+        self.assertFalse(lazy & set(mock.__dict__))
+
+        calls = mock.mock_calls
+        self.assertIsInstance(calls, _CallList)
+        self.assertIs(mock.mock_calls, calls)
+        mock.method_calls.append(call.foo())
+        self.assertEqual(mock.method_calls, [call.foo()])
+
+        mock()
+        self.assertEqual(calls, [call()])
+        call_args_list = mock.call_args_list
+        self.assertEqual(call_args_list, [call()])
+        method_calls = mock.method_calls
+
+        mock.reset_mock()
+        for name, old in [('mock_calls', calls),
+                          ('call_args_list', call_args_list),
+                          ('method_calls', method_calls)]:
+            new = getattr(mock, name)
+            self.assertEqual(new, [])
+            self.assertIsNot(new, old)
+            self.assertIs(getattr(mock, name), new)
+        self.assertEqual(calls, [call()])
+
+        strict = Mock(spec_set=['foo'])
+        strict.method_calls = [call.foo()]
+        self.assertEqual(strict.method_calls, [call.foo()])
+        strict.reset_mock()
+        self.assertEqual(strict.method_calls, [])
+
+
+    def test_reset_mock_frees_arguments(self):
+        class Arg(object):
+            pass
+
+        for kwargs in ({}, {'_mock_record': 'timed'},
+                       {'_mock_record': 'compressed'},
+                       {'_mock_max_calls': 2}):
+            with self.subTest(**kwargs):
+                mock = Mock(**kwargs)
+                arg = Arg()
+                ref = weakref.ref(arg)
+                mock(arg)
+                mock.child(arg)
+                mock.child().method(key=arg)
+                mock.mock_calls
+                mock.reset_mock()
+                del arg
+                gc.collect()
+                self.assertIsNone(ref())
+                self.assertEqual(mock.mock_calls, [])
+                mock(1)
+                self.assertEqual(mock.mock_calls, [call(1)])
+
+        # mocks above that aren't reset keep the calls, whether or not their
+        # lists were read before
+        for read in False, True:
+            mock = Mock()
+            mock.child(1)
+            if read:
+                mock.mock_calls
+            mock.child.reset_mock()
+            self.assertEqual(mock.child.mock_calls, [])
+            mock.child(2)
+            self.assertEqual(mock.mock_calls, [call.child(1), call.child(2)])
+            self.assertEqual(mock.method_calls,
+                             [call.child(1), call.child(2)])
+            self.assertEqual(mock.child.call_args_list, [call(2)])
+
+
     def test_reset_mock_recursion(self):
         mock = Mock()
         mock.return_value = mock
@@ -1088,6 +1168,20 @@ class MockTest(unittest.TestCase):
         self.assertEqual(dir(mock).count('version'), 1)
 
 
+    def test_import_defers_modules(self):
+        deferred = {'dataclasses', 'pprint', 'unittest'}
+        if sys.version_info[:2] >= (3, 10):
+            # older versions need it for iscoroutinefunction
+            deferred.add('asyncio')
+        code = ('import sys, mock; '
+                'print(sorted(set(sys.modules).intersection(%r)))' % deferred)
+        root = os.path.dirname(os.path.dirname(
+            os.path.abspath(mock_module.__file__)))
+        output = subprocess.check_output([sys.executable, '-c', code],
+                                         cwd=root, universal_newlines=True)
+        self.assertEqual(output.strip(), '[]')
+
+
     def test_filter_dir(self):
         patcher = patch.object(mock, 'FILTER_DIR', False)
         patcher.start()
@@ -1101,6 +1195,121 @@ class MockTest(unittest.TestCase):
             patcher.stop()
 
 
+    def test_own_class_by_default(self):
+        self.assertIsNot(type(Mock()), type(Mock()))
+        self.assertIsNot(type(MagicMock()), type(MagicMock()))
+
+
+    @patch.object(mock, 'SHARE_CLASSES', True)
+    def test_share_classes(self):
+        for Klass in Mock, NonCallableMock, MagicMock, AsyncMock:
+            with self.subTest(Klass=Klass):
+                one, two = Klass(), Klass()
+                self.assertIs(type(one).__mro__[1], Klass)
+                self.assertIsInstance(one, Klass)
+                self.assertIs(type(one), type(two))
+                self.assertIs(type(one.child), type(two.child))
+
+        async def meth(): pass  # pragma: no cover
+        one, two = Mock(spec=meth), Mock(spec=meth)
+        self.assertIs(type(one), type(two))
+        self.assertTrue(issubclass(type(one), mock.AsyncMockMixin))
+        self.assertIsNot(type(one), type(Mock()))
+
+
+    def test_share_classes_set_on_package(self):
+        import mock as package
+        with patch.object(package, 'SHARE_CLASSES', True):
+            self.assertIs(type(Mock()), type(Mock()))
+            self.assertIs(type(MagicMock()), type(MagicMock()))
+        self.assertIsNot(type(Mock()), type(Mock()))
+
+
+    @patch.object(mock, 'SHARE_CLASSES', True)
+    def test_share_classes_until_magic_set(self):
+        one, two = Mock(), Mock()
+        one.__iter__ = Mock(return_value=iter([1, 2]))
+        self.assertIsNot(type(one), type(two))
+        self.assertIs(type(one).__mro__[1], Mock)
+        self.assertEqual(list(one), [1, 2])
+        self.assertRaises(TypeError, iter, two)
+        self.assertIs(type(two), type(Mock()))
+
+        del one.__iter__
+        self.assertRaises(TypeError, iter, one)
+
+
+    @patch.object(mock, 'SHARE_CLASSES', True)
+    def test_share_classes_magic_methods(self):
+        one, two = MagicMock(), MagicMock()
+        one.__len__.return_value = 3
+        one.__iter__ = lambda self: iter([1])
+        self.assertIs(type(one), type(two))
+        self.assertEqual(len(one), 3)
+        self.assertEqual(list(one), [1])
+        self.assertEqual(len(two), 0)
+        self.assertEqual(list(two), [])
+
+        class Sized(object):
+            def __len__(self): pass  # pragma: no cover
+
+        one, two = MagicMock(spec=Sized), MagicMock(spec=Sized)
+        self.assertIs(type(one), type(two))
+        self.assertIsNot(type(one), type(MagicMock()))
+        self.assertEqual(len(one), 0)
+        self.assertRaises(TypeError, iter, one)
+
+        plain = MagicMock()
+        plain.__iter__.return_value = [1]
+        plain.mock_add_spec(Sized)
+        self.assertIs(type(plain), type(one))
+        self.assertRaises(TypeError, iter, plain)
+        self.assertRaises(AttributeError, getattr, plain, '__iter__')
+
+
+    @patch.object(mock, 'SHARE_CLASSES', True)
+    def test_share_classes_refuse_class_attributes(self):
+        one, two = Mock(), Mock()
+        with self.assertRaisesRegex(AttributeError, 'SHARE_CLASSES'):
+            type(one).prop = PropertyMock(return_value=3)
+        with self.assertRaisesRegex(AttributeError, 'SHARE_CLASSES'):
+            del type(one).__call__
+        self.assertIsInstance(two.prop, Mock)
+        self.assertEqual(two(), two.return_value)
+
+        # set once the mock has a class of its own
+        one.__iter__ = Mock(return_value=iter([]))
+        type(one).prop = PropertyMock(return_value=3)
+        self.assertEqual(one.prop, 3)
+        self.assertIsInstance(two.prop, Mock)
+
+        class Meta(type):
+            pass
+        class Custom(Mock, metaclass=Meta):
+            pass
+        custom = Custom()
+        self.assertIs(type(custom), type(Custom()))
+        self.assertIs(type(type(custom)), Meta)
+
+
+    @patch.object(mock, 'SHARE_CLASSES', True)
+    def test_share_classes_until_signature_checked(self):
+        def f(a, b): pass  # pragma: no cover
+        class Foo(object):
+            def meth(self, a): pass  # pragma: no cover
+
+        foo = create_autospec(Foo)
+        self.assertIsNot(type(foo.meth), type(MagicMock()))
+        foo.meth(1)
+        self.assertRaises(TypeError, foo.meth, 1, 2)
+
+        plain = Mock()
+        mock._check_signature(f, plain, False)
+        self.assertIsNot(type(plain), type(Mock()))
+        self.assertRaises(TypeError, plain, 1)
+        Mock()(1)
+
+
     def test_dir_does_not_include_deleted_attributes(self):
         mock = Mock()
         mock.child.return_value = 1
@@ -1131,6 +1340,703 @@ class MockTest(unittest.TestCase):
         self.assertIsInstance(mock.foo, MagicMock)
 
 
+    def test_call_views(self):
+        mock = Mock()
+        child = mock.a.b
+        child(1)
+        # calls are only made into _Call objects for the mocks looked at
+        self.assertNotIn('_mock_mock_calls', mock.__dict__)
+        self.assertNotIn('_mock_mock_calls', mock.a.__dict__)
+
+        mock_calls = mock.mock_calls
+        method_calls = mock.a.method_calls
+        mock.c(2)
+        child(3)
+        mock.a.b.c(4)()
+        self.assertEqual(mock_calls, [call.a.b(1), call.c(2), call.a.b(3),
+                                      call.a.b.c(4), call.a.b.c()()])
+        self.assertEqual(method_calls, [call.b(1), call.b(3), call.b.c(4)])
+        self.assertEqual(child.mock_calls,
+                         [call(1), call(3), call.c(4), call.c()()])
+
+        # resetting part of the tree leaves the calls above it alone
+        mock.a.reset_mock()
+        self.assertEqual(mock.a.mock_calls, [])
+        self.assertEqual(child.mock_calls, [])
+        self.assertEqual(len(mock.mock_calls), 5)
+        child(5)
+        self.assertEqual(mock.a.mock_calls, [call.b(5)])
+        self.assertEqual(mock_calls[-1], call.a.b(5))
+        self.assertEqual(method_calls, [call.b(1), call.b(3), call.b.c(4)])
+
+        # calls made before being attached elsewhere stay where they were
+        other = Mock()
+        other.attach_mock(child, 'child')
+        child(6)
+        self.assertEqual(other.mock_calls, [call.child(6)])
+        self.assertEqual(mock_calls[-1], call.a.b(5))
+        self.assertEqual(child.mock_calls, [call(5), call(6)])
+
+        # a list that is set is added to
+        mock.mock_calls = [call.x()]
+        mock.c()
+        self.assertEqual(mock.mock_calls, [call.x(), call.c()])
+        self.assertEqual(mock_calls[-1], call.a.b(5))
+        self.assertEqual(copy.copy(mock.mock_calls), [call.x(), call.c()])
+        self.assertIs(type(copy.copy(mock.mock_calls)), _CallList)
+
+
+    def test_call_views_not_rebuilt_on_read(self):
+        root = Mock()
+        children = [getattr(root, 'child%d' % i) for i in range(10)]
+        for child in children:
+            child()
+        self.assertEqual(len(root.mock_calls), 10)
+        self.assertEqual(len(root.method_calls), 10)
+
+        original = mock_module._CallView._add_new_calls
+        with patch.object(mock_module._CallView, '_add_new_calls',
+                          autospec=True, side_effect=original) as add:
+            children[0](1)
+            self.assertEqual(root.mock_calls[-1], call.child0(1))
+            children[1](2)
+            self.assertEqual(root.method_calls[-1], call.child1(2))
+            add.assert_not_called()
+
+            # only the log of a mock calling for the first time is read
+            root.other(3)
+            self.assertEqual(root.mock_calls[-1], call.other(3))
+            other = {id(root.other): root.other}
+            self.assertEqual(add.call_args_list, [
+                call(root.mock_calls, root, other),
+                call(root.method_calls, root, other),
+            ])
+
+    def test_call_views_read_as_lists(self):
+        # list methods implemented in C read the views without updating them
+        mock = Mock()
+        mock_calls = mock.mock_calls
+        call_args_list = mock.a.call_args_list
+        method_calls = mock.method_calls
+        mock(1)
+        mock.a(2)
+        expected = [call(1), call.a(2)]
+        self.assertEqual([call.x()] + mock_calls, [call.x()] + expected)
+        self.assertEqual([call.x()] + call_args_list, [call.x(), call(2)])
+        self.assertEqual([] + method_calls, [call.a(2)])
+
+        copied = [call.x()]
+        copied[:] = mock_calls
+        self.assertEqual(copied, expected)
+        copied = [call.x()]
+        list.extend(copied, mock_calls)
+        self.assertEqual(copied, [call.x()] + expected)
+
+        # as do views looked at for the first time
+        other = Mock()
+        other.a.b(3)
+        self.assertEqual([] + other.mock_calls, [call.a.b(3)])
+        self.assertEqual([] + other.a.method_calls, [call.b(3)])
+
+
+    def test_mock_name_cached(self):
+        mock = Mock(name='root')
+        child = mock.a.b()
+        self.assertEqual(repr(child).split()[1], "name='root.a.b()'")
+        self.assertEqual(child._extract_mock_name(), 'root.a.b()')
+        self.assertIn('_mock_extracted_name', child.__dict__)
+
+        other = Mock(name='other')
+        other.attach_mock(mock.a, 'x')
+        self.assertEqual(child._extract_mock_name(), 'other.x.b()')
+        other.y = new = Mock()
+        self.assertEqual(new.c._extract_mock_name(), 'other.y.c')
+        mock.a.b.return_value = returned = Mock()
+        self.assertEqual(returned._extract_mock_name(), 'other.x.b()')
+
+        # changing the tree of one mock leaves the names cached for others
+        cached = child.__dict__['_mock_extracted_name']
+        unrelated = Mock(name='unrelated')
+        unrelated.attach_mock(Mock(), 'z')
+        unrelated.w = Mock()
+        self.assertIs(child.__dict__['_mock_extracted_name'], cached)
+        self.assertEqual(child._extract_mock_name(), 'other.x.b()')
+        self.assertIs(child.__dict__['_mock_extracted_name'], cached)
+        other._mock_name = 'renamed'
+        self.assertEqual(child._extract_mock_name(), 'renamed.x.b()')
+
+
+    def test_history_options_leave_attributes_free(self):
+        # keyword arguments with these names still configure attributes
+        mock = Mock(max_calls=3, record=1, sample_every=2, sample_size=None)
+        self.assertEqual(mock.max_calls, 3)
+        self.assertEqual(mock.record, 1)
+        self.assertEqual(mock.sample_every, 2)
+        self.assertIsNone(mock.sample_size)
+        self.assertIsNone(mock._mock_max_calls)
+        self.assertEqual(mock._mock_record, 'all')
+        self.assertIsNone(mock._mock_sample)
+
+        mock = Mock()
+        mock.configure_mock(record='count', sample_size=10)
+        self.assertEqual(mock.record, 'count')
+        self.assertEqual(mock.sample_size, 10)
+        self.assertEqual(mock._mock_record, 'all')
+
+        mock = Mock(_mock_max_calls=2)
+        for i in range(3):
+            mock(i)
+        self.assertEqual(mock.call_args_list, [call(1), call(2)])
+        self.assertRaises(ValueError, Mock, _mock_record=object())
+        self.assertRaises(ValueError, Mock, _mock_sample_size=0)
+
+
+    def test_max_calls(self):
+        class Arg(object):
+            pass
+        first = Arg()
+        ref = weakref.ref(first)
+
+        mock = MagicMock(_mock_max_calls=3)
+        mock.method(first)
+        del first
+        for i in range(5):
+            mock.method(i)
+        gc.collect()
+        self.assertIsNone(ref())
+
+        method = mock.method
+        self.assertEqual(method.call_count, 6)
+        self.assertTrue(method.called)
+        self.assertEqual(method.call_args, call(4))
+        self.assertEqual(method.call_args_list, [call(2), call(3), call(4)])
+        self.assertEqual(mock.mock_calls,
+                         [call.method(2), call.method(3), call.method(4)])
+        self.assertEqual(mock.method_calls, mock.mock_calls)
+        self.assertEqual(method.return_value._mock_max_calls, 3)
+
+        method.assert_any_call(2)
+        with self.assertRaisesRegex(AssertionError,
+                                    r'3 earlier calls .* last 3 .*_mock_max_calls'):
+            method.assert_any_call(0)
+        with self.assertRaisesRegex(AssertionError, 'earlier calls'):
+            mock.assert_has_calls([call.method(1), call.method(2)])
+        with self.assertRaisesRegex(AssertionError, 'earlier calls'):
+            method.assert_called_once()
+
+        mock.reset_mock()
+        self.assertEqual(method.call_count, 0)
+        method(1)
+        self.assertEqual(method.call_args_list, [call(1)])
+        with self.assertRaises(AssertionError) as cm:
+            method.assert_any_call(0)
+        self.assertNotIn('earlier calls', str(cm.exception))
+
+        self.assertRaises(ValueError, Mock, _mock_max_calls=-1)
+        nothing = Mock(_mock_max_calls=0)
+        nothing(1)
+        self.assertEqual(nothing.call_args, call(1))
+        self.assertEqual(nothing.call_args_list, [])
+        self.assertEqual(nothing.mock_calls, [])
+
+
+    def test_record_count(self):
+        mock = MagicMock(_mock_record='count')
+        for i in range(3):
+            mock.metrics.send(i, key=i)
+        send = mock.metrics.send
+        self.assertTrue(send.called)
+        self.assertEqual(send.call_count, 3)
+        send.assert_called()
+        self.assertIsNone(send.call_args)
+        self.assertEqual(send.call_args_list, [])
+        self.assertEqual(mock.mock_calls, [])
+        self.assertEqual(mock.method_calls, [])
+        self.assertEqual(send.return_value._mock_record, 'count')
+
+        with self.assertRaisesRegex(AssertionError, "_mock_record='count'"):
+            send.assert_called_with(2, key=2)
+        with self.assertRaisesRegex(AssertionError, "_mock_record='count'"):
+            send.assert_any_call(0, key=0)
+        with self.assertRaisesRegex(AssertionError, "_mock_record='count'"):
+            mock.assert_has_calls([call.metrics.send(0, key=0)])
+
+        mock.reset_mock()
+        self.assertEqual(send.call_count, 0)
+        self.assertFalse(send.called)
+
+        self.assertRaises(ValueError, Mock, _mock_record='args')
+
+
+    def test_sample_every(self):
+        mock = Mock(_mock_sample_every=10, _mock_max_calls=3)
+        send = mock.send
+        for i in range(100):
+            send(i)
+        self.assertEqual(send.call_count, 100)
+        send.assert_called_with(99)
+        self.assertEqual(send.call_args_list, [call(70), call(80), call(90)])
+        self.assertEqual(send.call_args_list.total, 100)
+        # the other lists the calls would be in get the calls in the sample
+        kept = [call.send(70), call.send(80), call.send(90)]
+        self.assertEqual(mock.mock_calls, kept)
+        self.assertEqual(mock.method_calls, kept)
+        self.assertEqual(send.mock_calls, [call(70), call(80), call(90)])
+        with self.assertRaisesRegex(
+                AssertionError,
+                r"Calls may be missing, the calls to mock.send are only "
+                r"sampled \(_mock_sample_every=10\)"):
+            send.assert_not_called()
+        with self.assertRaisesRegex(
+                AssertionError,
+                r"Can't check the order of the calls to mock, only a sample "
+                r"of them is kept \(_mock_sample_every=10\)"):
+            mock.assert_has_calls([])
+        send.assert_any_call(80)
+        with self.assertRaisesRegex(
+                AssertionError,
+                r'Only a sample of 3 of the 100 calls is kept '
+                r'\(_mock_sample_every=10\)'):
+            send.assert_any_call(81)
+        with self.assertRaisesRegex(AssertionError, '_mock_sample_every=10'):
+            send.assert_has_calls([call(70)])
+
+        send.reset_mock()
+        self.assertEqual(send.call_args_list, [])
+        send(1)
+        send(2)
+        self.assertEqual(send.call_args_list, [call(1)])
+        send.call_args_list = [call(0)]
+        send(3)
+        self.assertEqual(send.call_args_list, [call(0)])
+
+        # parents that aren't sampled get the calls in the sample too, and
+        # fail to check the order of calls once some are left out
+        parent = Mock()
+        parent.child = Mock(_mock_sample_every=2)
+        parent.other(1)
+        self.assertEqual(parent.mock_calls, [call.other(1)])
+        parent.child(1)
+        self.assertEqual(parent.mock_calls, [call.other(1), call.child(1)])
+        parent.assert_has_calls([call.other(1), call.child(1)])
+        parent.child(2)
+        parent.other(3)
+        self.assertEqual(parent.mock_calls,
+                         [call.other(1), call.child(1), call.other(3)])
+        self.assertEqual(parent.child.mock_calls, [call(1)])
+        self.assertRaisesRegex(
+            AssertionError,
+            r"Can't check the order of the mock_calls of mock, the calls to "
+            r"mock.child are only sampled \(_mock_sample_every=2\)",
+            parent.assert_has_calls, [call.other(1)])
+        cp = checkpoint(parent)
+        parent.child(3)
+        parent.assert_has_calls([call.child(3)], since=cp)
+        parent.child(4)
+        self.assertRaisesRegex(AssertionError, 'calls to mock.child are only',
+                               parent.assert_has_calls, [], since=cp)
+        parent.child.reset_mock()
+        self.assertEqual(parent.method_calls,
+                         [call.other(1), call.child(1), call.other(3),
+                          call.child(3)])
+        self.assertRaises(AssertionError, parent.assert_has_calls, [])
+        parent.reset_mock()
+        self.assertEqual(parent.mock_calls, [])
+        parent.other(2)
+        self.assertEqual(parent.method_calls, [call.other(2)])
+
+
+    def test_sample_size(self):
+        mock = Mock(_mock_sample_size=50)
+        for i in range(10):
+            mock(i)
+        self.assertEqual(mock.call_args_list, [call(i) for i in range(10)])
+        mock.assert_any_call(5)
+        with self.assertRaisesRegex(AssertionError, 'call not found$'):
+            mock.assert_any_call(10)
+
+        for i in range(10, 10000):
+            mock(i)
+        calls = mock.call_args_list
+        self.assertEqual(len(calls), 50)
+        self.assertEqual(calls.total, 10000)
+        kept = [c.args[0] for c in calls]
+        self.assertEqual(kept, sorted(kept))
+        # all but impossible to keep only the first or last calls
+        self.assertGreater(kept[-1], 5000)
+        self.assertLess(kept[0], 5000)
+        self.assertEqual(mock.call_count, 10000)
+        mock.assert_called_with(9999)
+        self.assertEqual(mock.child._mock_sample, (None, 50))
+        # mock_calls gets each call as it is kept, including those later
+        # replaced in call_args_list
+        mock_calls = mock.mock_calls
+        self.assertEqual(mock_calls[:10], [call(i) for i in range(10)])
+        self.assertGreater(len(mock_calls), 50)
+        self.assertLess(len(mock_calls), 1000)
+        self.assertTrue(all(c in mock_calls for c in calls))
+        self.assertEqual(mock_calls, sorted(mock_calls, key=lambda c: c.args))
+
+        self.assertRaises(ValueError, Mock, _mock_sample_size=0)
+        self.assertRaises(ValueError, Mock, _mock_sample_every=0)
+        self.assertRaises(ValueError, Mock, _mock_sample_every=2, _mock_sample_size=2)
+        self.assertRaises(ValueError, Mock, _mock_sample_size=2,
+                          _mock_max_calls=2)
+        self.assertRaises(ValueError, Mock, _mock_sample_size=2, _mock_record='count')
+
+
+    def test_record_compressed(self):
+        mock = Mock(_mock_record='compressed')
+        get, put = mock.cache.get, mock.cache.put
+        for i in range(100):
+            get('config')
+        for i in range(3):
+            put('key', [i])
+            get('config', default=None)
+        get('config')
+
+        log = get.__dict__['_mock_call_log']
+        self.assertEqual(log.total, 104)
+        self.assertEqual(log.counts, [100, 1, 1, 1, 1])
+        self.assertEqual(len(log.interned), 2)
+        self.assertIs(log.kwargs[1], log.kwargs[3])
+
+        expected = (
+            [call('config')] * 100 +
+            [call('config', default=None)] * 3 + [call('config')]
+        )
+        self.assertEqual(get.call_args_list, expected)
+        self.assertEqual(get.call_count, 104)
+        self.assertIs(get.call_args_list[0], get.call_args_list[99])
+        self.assertEqual(put.call_args_list,
+                         [call('key', [0]), call('key', [1]), call('key', [2])])
+        self.assertEqual(mock.mock_calls[98:104], [
+            call.cache.get('config'),
+            call.cache.get('config'),
+            call.cache.put('key', [0]),
+            call.cache.get('config', default=None),
+            call.cache.put('key', [1]),
+            call.cache.get('config', default=None),
+        ])
+        mock.assert_has_calls([call.cache.get('config')] * 100)
+        self.assertEqual(put._mock_record, 'compressed')
+
+        mock.reset_mock()
+        get('config')
+        get('config')
+        # the calls from before are dropped
+        self.assertEqual(log.counts, [2])
+        self.assertEqual(get.call_args_list, [call('config')] * 2)
+        self.assertEqual(mock.mock_calls, [call.cache.get('config')] * 2)
+
+        # equal but distinct arguments of other types aren't shared
+        mock = Mock(_mock_record='compressed')
+        mock(1.0)
+        mock(1)
+        mock(True)
+        self.assertEqual([type(c.args[0]) for c in mock.call_args_list],
+                         [float, int, bool])
+
+        self.assertRaises(ValueError, Mock, _mock_record='compressed',
+                          _mock_max_calls=1)
+
+
+    def test_checkpoint(self):
+        mock = Mock()
+        start = checkpoint(mock)
+        mock.setup(1)
+        phase = checkpoint(mock.child)
+        mock.child.run(2)
+        mock(3)
+
+        self.assertEqual(calls_since(mock, start),
+                         [call.setup(1), call.child.run(2), call(3)])
+        self.assertEqual(calls_since(mock, phase), [call.child.run(2), call(3)])
+        self.assertEqual(calls_since(mock.child, start), [call.run(2)])
+        mock.assert_has_calls([call.child.run(2), call(3)], since=phase)
+        mock.assert_has_calls([call(3), call.child.run(2)], any_order=True,
+                              since=phase)
+        with self.assertRaisesRegex(AssertionError, 'Calls not found'):
+            mock.assert_has_calls([call.setup(1)], since=phase)
+        with self.assertRaises(AssertionError):
+            mock.assert_has_calls([call.setup(1)], any_order=True, since=phase)
+        self.assertIn('child', repr(phase))
+
+        mock.reset_mock()
+        mock.after()
+        self.assertEqual(calls_since(mock, start), [call.after()])
+
+
+    def test_checkpoint_autospec(self):
+        def f(a): pass
+        class Foo(object):
+            def method(self, a): pass
+
+        func = create_autospec(f)
+        func(0)
+        point = checkpoint(func)
+        func(1)
+        self.assertEqual(calls_since(func, point), [call(1)])
+        self.assertEqual(calls_since(func.mock, point), [call(1)])
+        func.mock.assert_has_calls([call(1)], since=point)
+        func.assert_has_calls([call(1)], since=point)
+        with self.assertRaises(AssertionError):
+            func.assert_has_calls([call(0)], since=point)
+
+        klass = create_autospec(Foo)
+        point = checkpoint(klass)
+        klass.method(1)
+        klass().method(2)
+        self.assertEqual(calls_since(klass, point),
+                         [call.method(1), call(), call().method(2)])
+        self.assertEqual(calls_since(klass.method, point), [call(1)])
+        klass.method.assert_has_calls([call(1)], since=point)
+
+
+    def test_release_history(self):
+        for record in 'all', 'compressed':
+            with self.subTest(record=record):
+                mock = MagicMock(_mock_record=record)
+                old = checkpoint(mock)
+                for i in range(3):
+                    mock.child.method(i)
+                    mock.other('same')
+                calls = mock.mock_calls
+                latest = checkpoint(mock)
+                mock.child.method(3)
+                mock.other('same')
+
+                release_history(mock)
+                self.assertEqual(len(calls), 8)
+                self.assertEqual(len(mock.mock_calls), 8)
+                self.assertEqual(len(mock.other.call_args_list), 4)
+
+                del old
+                gc.collect()
+                release_history(mock)
+                self.assertEqual(mock.mock_calls,
+                                 [call.child.method(3), call.other('same')])
+                self.assertEqual(mock.child.method.call_args_list, [call(3)])
+                self.assertEqual(mock.child.method_calls, [call.method(3)])
+                self.assertEqual(mock.other.call_count, 4)
+                log = mock.child.method.__dict__['_mock_call_log']
+                self.assertEqual(len(log.args), 1)
+                mock.assert_has_calls([call.other('same')], since=latest)
+
+        mock = Mock()
+        mock(1)
+        release_history(mock)
+        checkpoint(mock)
+        release_history(mock)
+        self.assertEqual(mock.call_args_list, [call(1)])
+
+
+    def test_release_history_of_child(self):
+        # the mocks above keep the calls whether or not they were looked at
+        for read in False, True:
+            with self.subTest(read=read):
+                mock = Mock()
+                mock.child.method(1)
+                if read:
+                    self.assertEqual(len(mock.mock_calls), 1)
+                point = checkpoint(mock.child)
+                mock.child.method(2)
+
+                release_history(mock.child)
+                self.assertEqual(mock.child.method_calls, [call.method(2)])
+                self.assertEqual(mock.mock_calls,
+                                 [call.child.method(1), call.child.method(2)])
+                self.assertEqual(mock.method_calls,
+                                 [call.child.method(1), call.child.method(2)])
+                self.assertEqual(
+                    calls_since(mock, point), [call.child.method(2)])
+
+                point = checkpoint(mock)
+                release_history(mock)
+                self.assertEqual(mock.mock_calls, [])
+                self.assertEqual(mock.child.method.call_args_list, [])
+
+
+    def test_record_timed(self):
+        mock = Mock(_mock_record='timed', _mock_max_calls=3)
+        send = mock.metrics.send
+        for i in range(4):
+            send(i, key=i)
+        self.assertEqual(send.call_args_list,
+                         [call(i, key=i) for i in range(1, 4)])
+        self.assertEqual(mock.mock_calls[-1], call.metrics.send(3, key=3))
+        send.assert_called_with(3, key=3)
+
+        timed = timed_calls(send)
+        self.assertEqual([t.call for t in timed],
+                         [call(i, key=i) for i in range(1, 4)])
+        self.assertEqual({t.thread for t in timed}, {threading.get_ident()})
+        self.assertEqual({t.task for t in timed}, {None})
+        times = [t.time for t in timed]
+        self.assertEqual(times, sorted(times))
+        self.assertEqual(call_intervals(send),
+                         [times[1] - times[0], times[2] - times[1]])
+        self.assertEqual(calls_per_window(send, 10**12), {0: 3})
+        self.assertEqual(calls_per_window(send, 1),
+                         {at - times[0]: times.count(at) for at in times})
+        # windows with no calls aren't counted, however many there are
+        with patch('mock.mock._perf_counter_ns',
+                   side_effect=[0, 10**15, 10**15 + 1]):
+            far = Mock(_mock_record='timed')
+            far(1)
+            far(2)
+            far(3)
+        self.assertEqual(calls_per_window(far, 1),
+                         {0: 1, 10**15: 1, 10**15 + 1: 1})
+        self.assertEqual(calls_per_window(far, 10), {0: 1, 10**14: 2})
+        self.assertRaises(ValueError, calls_per_window, send, 0)
+
+        mock.reset_mock()
+        self.assertEqual(timed_calls(send), [])
+        self.assertEqual(calls_per_window(send, 1), {})
+        send(4)
+        self.assertEqual([t.call for t in timed_calls(send)],
+                         [call(4)])
+
+        untimed = Mock()
+        untimed()
+        self.assertRaises(ValueError, timed_calls, untimed)
+        self.assertNotIsInstance(untimed.__dict__['_mock_call_log'],
+                                 mock_module._TimedCallLog)
+
+
+    def test_record_timed_threads(self):
+        mock = Mock(_mock_record='timed')
+        workers = [threading.Thread(target=mock, args=(i,)) for i in range(3)]
+        for worker in workers:
+            worker.start()
+            worker.join()
+        timed = timed_calls(mock)
+        self.assertEqual([t.call for t in timed], [call(0), call(1), call(2)])
+        self.assertEqual([t.thread for t in timed],
+                         [worker.ident for worker in workers])
+
+
+    def test_concurrent_calls(self):
+        mock = Mock()
+        child = mock.shared.child
+        threads, calls = 8, 5000
+        def target(i):
+            for j in range(calls):
+                child(i, j)
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            workers = [threading.Thread(target=target, args=(i,))
+                       for i in range(threads)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+        finally:
+            sys.setswitchinterval(interval)
+
+        self.assertEqual(child.call_count, threads * calls)
+        self.assertEqual(len(child.call_args_list), threads * calls)
+        self.assertEqual(
+            sorted(mock.mock_calls),
+            sorted(call.shared.child(i, j)
+                   for i in range(threads) for j in range(calls)))
+
+
+    def test_tree_lock(self):
+        one, two = Mock(), Mock()
+        def call_in_thread(mock, timeout):
+            worker = threading.Thread(target=mock)
+            worker.start()
+            worker.join(timeout)
+            return worker
+
+        with mock_module._TreeLock(one.a.b):
+            # other trees aren't held up
+            self.assertFalse(call_in_thread(two, 5).is_alive())
+            waiting = call_in_thread(one.c, 0.1)
+            self.assertTrue(waiting.is_alive())
+        waiting.join()
+        self.assertEqual(one.mock_calls, [call.c()])
+
+        # a mock moved to another tree is locked with it
+        one.attach_mock(two, 'two')
+        with mock_module._TreeLock(one):
+            waiting = call_in_thread(two, 0.1)
+            self.assertTrue(waiting.is_alive())
+        waiting.join()
+        self.assertEqual(one.mock_calls, [call.c(), call.two()])
+
+        # the lock kept for code outside of mock isn't taken
+        with NonCallableMock._lock:
+            self.assertFalse(call_in_thread(one.d, 5).is_alive())
+
+
+    def test_wrapped_attribute_got_without_lock(self):
+        blocked = []
+        class Wrapped(object):
+            def other(self):
+                pass
+            @property
+            def attr(self):
+                worker = threading.Thread(target=mock.other)
+                worker.start()
+                worker.join(5)
+                blocked.append(worker.is_alive())
+        mock = Mock(wraps=Wrapped())
+        mock.attr
+        self.assertEqual(blocked, [False])
+
+
+    def test_configure_mock_reuses_plan(self):
+        kwargs = {'a.b.return_value': 1, 'a.c': 2, 'd': 3,
+                  'a.b.side_effect': None, 'e.f.g': 4}
+        plan = mock_module._get_configure_plan(tuple(kwargs))
+        self.assertIs(mock_module._get_configure_plan(tuple(kwargs)), plan)
+        # each mock is walked to once, attributes on it are set together
+        self.assertEqual(
+            [name for _, name, batch in plan.steps if batch is None],
+            ['a', 'b', 'e', 'f']
+        )
+        self.assertEqual(
+            [len(batch) for _, _, batch in plan.steps if batch is not None],
+            [1, 1, 2, 1]
+        )
+
+        for value in 1, 2:
+            kwargs['d'] = value
+            mock = Mock()
+            mock.configure_mock(**kwargs)
+            self.assertEqual(mock.a.b(), 1)
+            self.assertEqual(mock.a.c, 2)
+            self.assertEqual(mock.d, value)
+            self.assertEqual(mock.e.f.g, 4)
+            self.assertIs(mock.a.b._mock_parent, mock.a)
+
+
+    def test_configure_mock_spec_set(self):
+        class Foo(object):
+            a = b = c = None
+
+        mock = Mock(spec_set=Foo)
+        mock.configure_mock(a=1, b=Mock(), **{'c.return_value': 3})
+        self.assertEqual(mock.a, 1)
+        self.assertEqual(mock.b._mock_name, 'b')
+        self.assertEqual(mock.c(), 3)
+
+        mock = Mock(spec_set=Foo)
+        self.assertRaisesRegex(AttributeError, "no attribute 'd'",
+                               mock.configure_mock, a=1, d=2, b=3)
+        # attributes are set in order until the bad one
+        self.assertEqual(mock.a, 1)
+        self.assertIsInstance(mock.b, Mock)
+
+        mock = Mock()
+        seal(mock)
+        self.assertRaises(AttributeError, mock.configure_mock, a=1)
+
+
     def assertRaisesWithMsg(self, exception, message, func, *args, **kwargs):
         # needed because assertRaisesRegex doesn't work easily with newlines
         with self.assertRaises(exception) as context:
@@ -1508,6 +2414,110 @@ class MockTest(unittest.TestCase):
                 kall_list, any_order=True
             )
 
+    def test_assert_has_calls_any_order_matching(self):
+        mock = Mock()
+        mock.method(1)
+        mock.method(2)
+        mock.other([1])
+        # as with list.remove, ANY takes method(1), the first call it matches
+        mock.assert_has_calls(
+            [call.method(1), call.method(ANY)], any_order=True)
+        mock.assert_has_calls(
+            [call.other(ANY), call.method(1), call.method(ANY)],
+            any_order=True)
+        with self.assertRaisesRegex(
+                AssertionError,
+                r"does not contain all of \(call.method\(1\),\) in its call "
+                r"list, found \[call.method\(2\), call.other\(\[1\]\)\]"):
+            mock.assert_has_calls(
+                [call.method(ANY), call.method(1)], any_order=True)
+        mock.assert_has_calls([call.other([1]), call.method(2)],
+                              any_order=True)
+        with self.assertRaisesRegex(
+                AssertionError,
+                r"does not contain all of \(call.method\(<ANY>\),\) in its "
+                r"call list, found \[call.other\(\[1\]\)\] instead"):
+            mock.assert_has_calls(
+                [call.method(ANY), call.method(ANY), call.method(ANY)],
+                any_order=True)
+
+        mock = Mock()
+        for i in range(2000):
+            mock.method(i % 1000)
+        expected = [call.method(i) for i in range(1000)] * 2
+        mock.assert_has_calls(expected, any_order=True)
+        mock.assert_has_calls(expected[:-1] + [call.method(ANY)],
+                              any_order=True)
+        self.assertRaises(AssertionError, mock.assert_has_calls,
+                          expected + [call.method(ANY)], any_order=True)
+
+
+    def test_assert_has_calls_any_order_as_list_remove(self):
+        # the outcome doesn't depend on whether the calls can be bucketed
+        cases = [
+            ((1, 2), [call(ANY), call(1)], False),
+            ((1, 2), [call(1), call(ANY)], True),
+            ((1, 2, ANY), [call(ANY), call(1)], True),
+            ((1, 2, ANY), [call(2), call(ANY), call(1)], True),
+            ((1, 2, ANY), [call(3), call(1)], True),
+            ((1, 2, ANY), [call(3), call(3)], False),
+        ]
+        for made, expected, passes in cases:
+            for extra in (), (Mock(),):
+                with self.subTest(made=made, extra=extra, expected=expected):
+                    mock = Mock()
+                    for arg in made:
+                        mock(arg)
+                    mock(*extra)
+                    calls = list(mock.mock_calls)
+                    removed = True
+                    for kall in expected:
+                        if kall not in calls:
+                            removed = False
+                            break
+                        calls.remove(kall)
+                    self.assertEqual(removed, passes)
+                    if passes:
+                        mock.assert_has_calls(expected, any_order=True)
+                    else:
+                        self.assertRaises(AssertionError,
+                                          mock.assert_has_calls, expected,
+                                          any_order=True)
+
+
+    def test_assert_has_calls_any_order_opaque(self):
+        # calls with arguments that may be equal to anything are matched in
+        # order with list.remove, as they can't be bucketed
+        class AnyInt(object):
+            def __eq__(self, other):
+                return isinstance(other, int)
+            __hash__ = object.__hash__
+
+        mock = Mock()
+        mock(1)
+        mock(2)
+        mock.assert_has_calls([call(AnyInt())], any_order=True)
+        mock.assert_has_calls([call(2), call(AnyInt())], any_order=True)
+        with self.assertRaisesRegex(AssertionError, 'found \\[\\] instead'):
+            mock.assert_has_calls([call(AnyInt())] * 3, any_order=True)
+
+        mock = Mock()
+        mock(AnyInt())
+        mock(ANY)
+        mock.assert_has_calls([call(5), call('a')], any_order=True)
+
+        mock = Mock()
+        arg = MagicMock()
+        mock(1)
+        mock(arg)
+        mock.assert_has_calls([call(arg), call(1)], any_order=True)
+        self.assertRaises(AssertionError, mock.assert_has_calls,
+                          [call(arg), call(arg)], any_order=True)
+        self.assertNotIn(call.__hash__(), arg.mock_calls)
+        # making the same comparisons as list.remove
+        self.assertEqual(arg.mock_calls, [call.__eq__(1)] * 3)
+
+
     def test_assert_has_calls(self):
         kalls1 = [
                 call(1, 2), ({'a': 3},),
@@ -1697,6 +2707,168 @@ class MockTest(unittest.TestCase):
         )
 
 
+    def test_assert_any_call_index(self):
+        def f(a, b=None, **kwargs): pass
+        mock = Mock(spec=f)
+        for i in range(100):
+            mock(i, b=[i] if i % 10 == 0 else i, key=str(i))
+
+        matched = []
+        matcher = mock._call_matcher
+        def counting(_call):
+            matched.append(_call)
+            return matcher(_call)
+        mock._call_matcher = counting
+
+        mock.assert_any_call(5, 5, key='5')
+        mock.assert_any_call(a=6, b=6, key='6')
+        # each call made is only matched once
+        self.assertEqual(len(matched), 102)
+        del matched[:]
+        for i in range(1, 10):
+            mock.assert_any_call(i, b=i, key=str(i))
+        # only the expected calls
+        self.assertEqual(len(matched), 9)
+
+        # lists are indexed too, but not ANY and missing calls
+        mock.assert_any_call(10, b=[10], key='10')
+        mock.assert_any_call(20, b=ANY, key='20')
+        self.assertRaises(AssertionError, mock.assert_any_call, 5, 6)
+
+        mock(200, 200)
+        mock.assert_any_call(200, 200)
+        mock.call_args_list.pop()
+        self.assertRaises(AssertionError, mock.assert_any_call, 200, 200)
+        mock.assert_any_call(99, 99, key='99')
+
+        mock = Mock(_mock_max_calls=2)
+        for i in range(5):
+            mock(i)
+            mock.assert_any_call(i)
+        self.assertRaises(AssertionError, mock.assert_any_call, 2)
+        mock.assert_any_call(3)
+
+
+    def test_matching_calls_not_hashed(self):
+        # matchers may hash like object but be equal to other values, and
+        # hashing a MagicMock is recorded, so neither is looked up by hash
+        class AnyInt(object):
+            def __eq__(self, other):
+                return isinstance(other, int)
+            __hash__ = object.__hash__
+
+        mock = Mock()
+        mock(1)
+        mock(2)
+        mock.assert_any_call(AnyInt())
+        mock.assert_has_calls([call(AnyInt())])
+        mock.assert_has_calls([call(AnyInt()), call(2)])
+        self.assertIn([call(AnyInt()), call(2)], mock.mock_calls)
+        # the calls made can be matchers too
+        mock = Mock()
+        mock(AnyInt())
+        mock.assert_any_call(5)
+        mock.assert_has_calls([call(5)])
+
+        mock = Mock()
+        arg = MagicMock()
+        mock(arg)
+        mock(1)
+        mock.assert_any_call(arg)
+        mock.assert_has_calls([call(arg), call(1)])
+        self.assertNotIn(call.__hash__(), arg.mock_calls)
+
+        # objects only equal to themselves are still looked up by hash
+        token = object()
+        mock = Mock()
+        for i in range(100):
+            mock(i, token)
+        mock.assert_any_call(50, token)
+        self.assertRaises(AssertionError, mock.assert_any_call, 50, object())
+
+
+    def test_matched_calls_memoized(self):
+        def f(a, b=None): pass
+        mock = Mock()
+        mock.method = create_autospec(f)
+        for i in range(10):
+            mock.method(i, b=i)
+            mock.other(i)
+
+        matched = []
+        matcher = mock._call_matcher
+        def counting(_call):
+            matched.append(_call)
+            return matcher(_call)
+        mock._call_matcher = counting
+
+        expected = [call.method(a=8, b=8), call.other(8), call.method(9, 9)]
+        for _ in range(3):
+            mock.assert_has_calls(expected)
+            mock.assert_has_calls(expected, any_order=True)
+        # the calls made are matched once, then only the expected ones
+        self.assertEqual(len(matched), 20 + 6 * 3)
+
+        del matched[:]
+        mock.method(10)
+        mock.assert_has_calls([call.method(a=10)])
+        self.assertEqual(len(matched), 2)
+
+        # signatures are looked up again when the children change
+        self.assertRaises(AssertionError, mock.assert_has_calls,
+                          [call.other(a=9)])
+        mock.other.mock_add_spec(lambda a: None)
+        mock.assert_has_calls([call.other(a=9)])
+        mock.other = Mock()
+        self.assertRaises(AssertionError, mock.assert_has_calls,
+                          [call.other(a=9)])
+
+        # plain lists are matched again from the first call changed
+        mock.mock_calls = [call.method(1), call.method(2)]
+        mock.method = create_autospec(f)
+        mock.assert_has_calls([call.method(a=2)])
+        del matched[:]
+        mock.mock_calls[0] = call.method(3)
+        mock.assert_has_calls([call.method(a=3), call.method(a=2)])
+        self.assertEqual(len(matched), 2 + 2)
+
+
+    def test_matched_calls_kept_per_tree(self):
+        def f(a, b=None): pass
+        mock = Mock()
+        mock.method = create_autospec(f)
+        for i in range(10):
+            mock.method(i, b=i)
+
+        matched = []
+        matcher = mock._call_matcher
+        def counting(_call):
+            matched.append(_call)
+            return matcher(_call)
+        mock._call_matcher = counting
+        mock.assert_has_calls([call.method(a=9, b=9)])
+        mock.method.assert_any_call(a=9, b=9)
+
+        # other mocks changing doesn't match the calls again
+        del matched[:]
+        other = Mock()
+        other.child.grandchild.mock_add_spec(f)
+        other.attribute = Mock()
+        del other.child
+        create_autospec(f)
+        mock.assert_has_calls([call.method(a=9, b=9)])
+        self.assertEqual(len(matched), 1)
+
+        # changes below the mock do, however far down
+        del matched[:]
+        mock.child.grandchild(1)
+        self.assertRaises(AssertionError, mock.assert_has_calls,
+                          [call.child.grandchild(a=1)])
+        mock.child.grandchild.mock_add_spec(f)
+        mock.assert_has_calls([call.child.grandchild(a=1)])
+        self.assertEqual(len(matched), 2 * 12)
+
+
     def test_assert_any_call_with_function_spec(self):
         def f(a, b, c, d=None): pass
 
@@ -1907,6 +3079,83 @@ class MockTest(unittest.TestCase):
         m.reset_mock(side_effect=True)
         self.assertEqual(m.f.side_effect, None)
 
+    def test_spec_index_shared_between_mocks(self):
+        class Foo(object):
+            def meth(self): pass  # pragma: no cover
+            async def ameth(self): pass  # pragma: no cover
+
+        one, two = Mock(spec=Foo), MagicMock(spec_set=Foo)
+        self.assertIs(one._mock_methods, two._mock_methods)
+        self.assertIn('meth', one._mock_methods)
+        self.assertEqual(one._spec_asyncs, {'ameth'})
+        self.assertIsInstance(one.ameth, AsyncMock)
+        self.assertIsInstance(two.meth, MagicMock)
+
+    def test_spec_index_follows_changes_to_spec(self):
+        class Foo(object):
+            def meth(self): pass  # pragma: no cover
+
+        self.assertRaises(AttributeError, getattr, Mock(spec=Foo), 'other')
+        async def other(self): pass  # pragma: no cover
+        Foo.other = other
+        self.assertIsInstance(Mock(spec=Foo).other, AsyncMock)
+        del Foo.meth
+        self.assertRaises(AttributeError, getattr, Mock(spec=Foo), 'meth')
+
+        foo = Foo()
+        self.assertRaises(AttributeError, getattr, Mock(spec=foo), 'attr')
+        foo.attr = 1
+        self.assertIsInstance(Mock(spec=foo).attr, Mock)
+
+    def test_spec_index_follows_patched_spec(self):
+        class Foo(object):
+            def meth(self): pass  # pragma: no cover
+        class Bar(Foo):
+            pass
+        async def meth(self): pass  # pragma: no cover
+
+        self.assertNotIsInstance(Mock(spec=Bar).meth, AsyncMock)
+        with patch.object(Foo, 'meth', meth):
+            self.assertIsInstance(Mock(spec=Bar).meth, AsyncMock)
+        self.assertNotIsInstance(Mock(spec=Bar).meth, AsyncMock)
+
+        # values swapped without patch are picked up as well
+        original = Foo.meth
+        Foo.meth = meth
+        self.assertIsInstance(Mock(spec=Foo).meth, AsyncMock)
+        Foo.meth = original
+        self.assertNotIsInstance(Mock(spec=Foo).meth, AsyncMock)
+        Foo.meth = staticmethod(meth)
+        self.assertIsInstance(Mock(spec=Bar).meth, AsyncMock)
+        Foo.meth = staticmethod(original)
+        self.assertNotIsInstance(Mock(spec=Bar).meth, AsyncMock)
+
+        foo = Bar()
+        foo.attr = original
+        self.assertNotIsInstance(Mock(spec=foo).attr, AsyncMock)
+        foo.attr = meth
+        self.assertIsInstance(Mock(spec=foo).attr, AsyncMock)
+
+    def test_spec_index_kept_while_patching_other_specs(self):
+        class Foo(object):
+            def meth(self): pass  # pragma: no cover
+        class Other(object):
+            attr = None
+
+        index = mock_module._get_spec_index(Foo)
+        with patch.object(Other, 'attr', 1):
+            pass
+        self.assertIs(mock_module._get_spec_index(Foo), index)
+
+    def test_spec_index_does_not_keep_spec_alive(self):
+        class Foo(object):
+            pass
+        mock = Mock(spec=Foo)
+        ref = weakref.ref(Foo)
+        del Foo, mock
+        gc.collect()
+        self.assertIsNone(ref())
+
     def test_mock_add_spec(self):
         class _One(object):
             one = 1